@@ -0,0 +1,258 @@
+"""
+Leveled, rate-limited logging written by a background thread (RTMaps-independent).
+
+The components log instead of calling print(): a call below the configured
+level costs one comparison, and an enabled one only checks its rate limit and
+queues the message. Formatting (msg % args), timestamps, the log file and the
+console are all handled by one writer thread per process, so Core() never waits
+on a console or the file system.
+
+    - levels: DEBUG, INFO, WARNING, ERROR
+    - rate limit: each log statement (call site, or `key`) is emitted at most once per
+      `interval` seconds (default 1 s); the number of suppressed messages is appended
+      to the next one that gets through. Warnings and errors are limited per statement
+      and arguments, so only repeats of the same message are suppressed
+    - backpressure: when the queue is full new messages are dropped and counted
+
+Settings come from the environment (EAD_LOG_LEVEL: log file level, EAD_LOG_FILE,
+EAD_LOG_CONSOLE: console level) or configure(). Defaults: INFO and above, to the
+console only. Set EAD_LOG_FILE to a path (e.g. logs/ead.log) to also write a log file,
+and EAD_LOG_CONSOLE to OFF to keep the console quiet. Pending messages are flushed at exit.
+
+Example:
+    log = AsyncLog.get_logger("DM")
+    log.debug("Calculated d_0=%s, t_cr=%s", d_0, t_cr)   # formatted on the writer thread
+    log.warning("Undecodable SPaT message: %s", e)
+"""
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR, "OFF": OFF}
+LEVEL_NAMES = {level: name for name, level in LEVELS.items()}
+
+DEFAULT_INTERVAL = 1.0  # s
+MAX_RATE_LIMIT_KEYS = 4096  # Rate limit entries kept per logger before they are reset
+
+
+def parse_level(value, default=INFO) -> int:
+    if value is None or value == "":
+        return default
+    if isinstance(value, str) and not value.strip().isdigit():
+        return LEVELS.get(value.strip().upper(), default)
+    return int(value)
+
+
+class LogWriter:
+    """
+    Queue and thread shared by all the loggers of the process.
+
+    Attributes:
+        file_level: Messages at or above this level are written to the log file
+        console_level: Messages at or above this level are printed to stdout
+        level: Lowest of the two, messages below it are not queued
+        path: Log file, or None for console only
+        written, dropped: Message counters
+    """
+
+    def __init__(self, file_level=INFO, path=None, console_level=INFO, max_pending=10000):
+        self.file_level = file_level
+        self.console_level = console_level
+        self.path = path
+        self.level = min(file_level if path is not None else OFF, console_level)
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.dropped = 0
+        self.file = None
+        self.thread = threading.Thread(target=self._run, name="AsyncLog", daemon=True)
+        self.thread.start()
+
+    def submit(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5.0):
+        """
+        Wait until every message queued so far has been written.
+        """
+        if not self.thread.is_alive():
+            return
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        if not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+
+    def _open(self):
+        if self.path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.file = open(self.path, "a", encoding="utf-8")
+        except OSError as e:
+            print(f"[AsyncLog] Could not open {self.path}, logging to the console only: {e}")
+            self.console_level = self.level
+
+    def _run(self):
+        self._open()
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            if isinstance(record, threading.Event):
+                if self.file is not None:
+                    self.file.flush()
+                record.set()
+                continue
+            self._write(record)
+            if self.file is not None and self.queue.empty():
+                self.file.flush()
+        if self.file is not None:
+            self.file.close()
+
+    def _write(self, record):
+        t, level, name, msg, args, suppressed = record
+        try:
+            text = msg % args if args else str(msg)
+        except (TypeError, ValueError) as e:
+            text = f"{msg!r} {args!r} (format error: {e})"
+        if suppressed:
+            text = f"{text} ({suppressed} suppressed)"
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t)) + f".{int(t % 1 * 1000):03d}"
+        line = f"{stamp} {LEVEL_NAMES.get(level, level)} [{name}] {text}"
+        try:
+            if self.file is not None and level >= self.file_level:
+                self.file.write(line + "\n")
+            if level >= self.console_level:
+                print(line)
+            self.written += 1
+        except (OSError, ValueError) as e:
+            self.dropped += 1
+            print(f"[AsyncLog] ERROR: {e}")
+
+
+class Logger:
+    """
+    Named logger. debug() / info() / warning() / error() take a %-format string and its arguments;
+    pass values, not buffers that are reused, since formatting happens later on the writer thread.
+    """
+
+    def __init__(self, name, interval=DEFAULT_INTERVAL):
+        self.name = name
+        self.interval = interval
+        self.last_emit = {}  # rate limit key -> [last emit time, suppressed count]
+
+    def enabled_for(self, level) -> bool:
+        return level >= _writer.level
+
+    def debug(self, msg, *args, key=None, interval=None):
+        if DEBUG >= _writer.level:
+            self._log(DEBUG, msg, args, key, interval)
+
+    def info(self, msg, *args, key=None, interval=None):
+        if INFO >= _writer.level:
+            self._log(INFO, msg, args, key, interval)
+
+    def warning(self, msg, *args, key=None, interval=None):
+        if WARNING >= _writer.level:
+            self._log(WARNING, msg, args, key, interval)
+
+    def error(self, msg, *args, key=None, interval=None):
+        if ERROR >= _writer.level:
+            self._log(ERROR, msg, args, key, interval)
+
+    def log(self, level, msg, *args, key=None, interval=None):
+        if level >= _writer.level:
+            self._log(level, msg, args, key, interval)
+
+    def _log(self, level, msg, args, key, interval):
+        if key is None:
+            caller = sys._getframe(2)  # The statement that called debug(), info(), ...
+            key = (caller.f_code, caller.f_lineno)
+            if level >= WARNING:
+                # Distinct warnings / errors from the same statement are all emitted
+                try:
+                    hash(args)
+                except TypeError:  # e.g. a NumPy array
+                    args_key = repr(args)
+                else:
+                    args_key = args
+                key += (args_key,)
+        now = time.monotonic()
+        state = self.last_emit.get(key)
+        if state is None:
+            if len(self.last_emit) >= MAX_RATE_LIMIT_KEYS:
+                self.last_emit.clear()
+            self.last_emit[key] = [now, 0]
+            suppressed = 0
+        else:
+            if now - state[0] < (self.interval if interval is None else interval):
+                state[1] += 1
+                return
+            suppressed = state[1]
+            state[0] = now
+            state[1] = 0
+        _writer.submit((time.time(), level, self.name, msg, args, suppressed))
+
+
+_loggers = {}
+
+
+def _writer_from_environment() -> LogWriter:
+    path = os.environ.get("EAD_LOG_FILE")
+    return LogWriter(file_level=parse_level(os.environ.get("EAD_LOG_LEVEL")),
+                     path=path or None,
+                     console_level=parse_level(os.environ.get("EAD_LOG_CONSOLE")))
+
+
+_writer = _writer_from_environment()
+atexit.register(lambda: _writer.close())
+
+
+def get_logger(name) -> Logger:
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers[name] = Logger(name)
+    return logger
+
+
+def configure(level=None, path=..., console_level=None):
+    """
+    Replace the writer (pending messages are written first). Arguments left out keep their
+    current value; level is the log file level, path=None disables the log file.
+    """
+    global _writer
+    old = _writer
+    old.close()
+    _writer = LogWriter(file_level=old.file_level if level is None else parse_level(level),
+                        path=old.path if path is ... else path,
+                        console_level=old.console_level if console_level is None else parse_level(console_level))
+    return _writer
+
+
+def flush(timeout=5.0):
+    _writer.flush(timeout)
+
+
+def stats() -> str:
+    return f"[AsyncLog] {_writer.written} written, {_writer.dropped} dropped, {_writer.queue.qsize()} pending"
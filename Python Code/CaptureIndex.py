@@ -0,0 +1,221 @@
+"""
+Sidecar index files for pcap and UBX captures (RTMaps-independent).
+
+A capture is parsed once and one row per message is written next to it as
+"<capture>.idx.npz":
+    - kind: message type. pcap: J2735 message ID (18 MAP, 19 SPaT, 20 BSM, 0 other packet);
+      UBX: (class << 8) | id, e.g. 0x0107 for NAV-PVT
+    - time: capture time in seconds (pcap record time; UBX iTOW, unwrapped across GPS weeks)
+    - offset: byte offset of the pcap record header / UBX frame in the capture
+    - key: intersection ID of MAP/SPaT messages, -1 otherwise. A message carrying several
+      intersections has one row per intersection (same offset)
+Later runs load the sidecar instead of parsing, unless the capture's size or
+modification time changed. The replay tools use it to start at any time and to
+replay only some message types.
+
+Usage:
+    python CaptureIndex.py ../test_data_captures/capture_data/*.pcap ../test_data_captures/rawgps.ubx
+
+Example:
+    index = CaptureIndex.for_capture("drive.pcap")
+    rows = index.select(kind=J2735.MSG_SPAT, key=1002, start=600.0)
+    for ts, link_type, packet in read_pcap_records_at("drive.pcap", index.offsets[rows]):
+        ...
+"""
+import argparse
+import mmap
+import os
+import struct
+from collections import Counter
+
+import numpy as np
+
+import J2735
+from PcapReader import J2735_KINDS, PCAP_HEADER_SIZE, PCAP_RECORD_HEADER_SIZE, extract_j2735_frame, is_pcap, read_pcap_records
+from UbxLog import ITOW_WEEK_MS, NAV_PVT, NAV_PVT_LENGTH, UBX_HEADER_SIZE, scan_ubx
+
+INDEX_SUFFIX = ".idx.npz"
+INDEX_VERSION = 2  # 2: NAV-PVT polls and short frames are no longer indexed
+
+NO_KEY = -1
+
+# UBX message classes whose payload starts with iTOW (NAV, NAV2)
+UBX_ITOW_CLASSES = (0x01, 0x29)
+
+
+def ubx_kind(msg_class, msg_id) -> int:
+    return (msg_class << 8) | msg_id
+
+
+NAV_PVT_KIND = ubx_kind(*NAV_PVT)
+
+
+class CaptureIndex:
+    """
+    Message rows of one capture, sorted by capture order.
+
+    Attributes:
+        path: Capture file
+        capture_format: "pcap" or "ubx"
+        kinds, times, offsets, keys: One entry per row (see the module docstring)
+    """
+
+    def __init__(self, path, capture_format, kinds, times, offsets, keys):
+        self.path = path
+        self.capture_format = capture_format
+        self.kinds = np.asarray(kinds, dtype=np.int32)
+        self.times = np.asarray(times, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.keys = np.asarray(keys, dtype=np.int64)
+
+    @classmethod
+    def for_capture(cls, path, rebuild=False):
+        """
+        Load the sidecar index of a capture, building (and saving) it first if it is missing or stale.
+        """
+        if not rebuild:
+            index = cls.load(path)
+            if index is not None:
+                return index
+        index = cls.build(path)
+        index.save()
+        return index
+
+    @classmethod
+    def build(cls, path):
+        return cls(path, "pcap", *_index_pcap(path)) if is_pcap(path) else cls(path, "ubx", *_index_ubx(path))
+
+    @staticmethod
+    def sidecar_path(path) -> str:
+        return path + INDEX_SUFFIX
+
+    @classmethod
+    def load(cls, path):
+        """
+        The saved index of a capture, or None if there is none or it does not match the capture any more.
+        """
+        try:
+            with np.load(cls.sidecar_path(path)) as saved:
+                stat = os.stat(path)
+                if (int(saved["version"]) != INDEX_VERSION or int(saved["source_size"]) != stat.st_size
+                        or int(saved["source_mtime_ns"]) != stat.st_mtime_ns):
+                    return None
+                return cls(path, str(saved["capture_format"]), saved["kinds"], saved["times"], saved["offsets"], saved["keys"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self):
+        stat = os.stat(self.path)
+        target = self.sidecar_path(self.path)
+        tmp = target + ".tmp.npz"
+        try:
+            np.savez(tmp, version=INDEX_VERSION, capture_format=self.capture_format,
+                     source_size=stat.st_size, source_mtime_ns=stat.st_mtime_ns,
+                     kinds=self.kinds, times=self.times, offsets=self.offsets, keys=self.keys)
+            os.replace(tmp, target)
+        except OSError as e:
+            print(f"[CaptureIndex] Could not save {target}: {e}")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def start_time(self) -> float:
+        return float(self.times.min()) if len(self.times) else 0.0
+
+    def seek(self, t) -> int:
+        """
+        First row at or after t seconds into the capture (len(self) if past the end).
+        """
+        later = np.flatnonzero(self.times >= self.start_time + t)
+        return int(later[0]) if len(later) else len(self)
+
+    def select(self, kind=None, key=None, start=None, end=None) -> np.ndarray:
+        """
+        Row numbers of the messages of a type (and intersection ID), between start and end seconds
+        into the capture. Each message is listed once even if it matches several rows.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if kind is not None:
+            mask &= self.kinds == kind
+        if key is not None:
+            mask &= self.keys == key
+        if start is not None:
+            mask &= self.times >= self.start_time + start
+        if end is not None:
+            mask &= self.times <= self.start_time + end
+        rows = np.flatnonzero(mask)
+        # Rows of the same message are adjacent: keep the first
+        keep = np.ones(len(rows), dtype=bool)
+        keep[1:] = self.offsets[rows[1:]] != self.offsets[rows[:-1]]
+        return rows[keep]
+
+    def summary(self) -> Counter:
+        """
+        Number of messages per kind.
+        """
+        return Counter(self.kinds[self.select()].tolist())
+
+
+def _index_pcap(path):
+    kinds, times, offsets, keys = [], [], [], []
+    offset = PCAP_HEADER_SIZE
+    for ts, link_type, packet in read_pcap_records(path):
+        frame = extract_j2735_frame(packet, link_type)
+        kind = frame[0] if frame is not None and frame[0] in J2735_KINDS else 0
+        intersection_ids = [NO_KEY]
+        if kind in (J2735.MSG_MAP, J2735.MSG_SPAT):
+            try:
+                value = J2735.decode_message_frame(frame[1])[1]
+                message = J2735.decode_map(value) if kind == J2735.MSG_MAP else J2735.decode_spat(value)
+                intersection_ids = [intersection.id for intersection in message.intersections] or [NO_KEY]
+            except J2735.DecodeError:
+                pass
+        for intersection_id in intersection_ids:
+            kinds.append(kind)
+            times.append(ts)
+            offsets.append(offset)
+            keys.append(intersection_id)
+        offset += PCAP_RECORD_HEADER_SIZE + len(packet)
+    return kinds, times, offsets, keys
+
+
+def _index_ubx(path):
+    kinds, itow, offsets = [], [], []
+    last_itow = 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for offset, msg_class, msg_id, length in scan_ubx(data):
+            if (msg_class, msg_id) == NAV_PVT and length != NAV_PVT_LENGTH:
+                continue  # A poll or short frame, not a fix (same filter as UbxIndex)
+            if msg_class in UBX_ITOW_CLASSES and length >= 4:
+                last_itow = struct.unpack_from("<I", data, offset + UBX_HEADER_SIZE)[0]
+            kinds.append(ubx_kind(msg_class, msg_id))
+            itow.append(last_itow)  # Messages without iTOW get the time of the latest one
+            offsets.append(offset)
+
+    itow = np.asarray(itow, dtype=np.int64)
+    weeks = np.concatenate(([0], np.cumsum(np.diff(itow) < -ITOW_WEEK_MS // 2))) if len(itow) else itow
+    return kinds, (itow + weeks * ITOW_WEEK_MS) * 1e-3, offsets, np.full(len(itow), NO_KEY)
+
+
+def kind_name(capture_format, kind) -> str:
+    if capture_format == "pcap":
+        return J2735_KINDS.get(kind, "other").upper()
+    return "NAV-PVT" if kind == NAV_PVT_KIND else f"UBX 0x{kind >> 8:02x} 0x{kind & 0xFF:02x}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the sidecar index files of pcap / UBX captures.")
+    parser.add_argument("captures", nargs="+", help="pcap or UBX captures")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild even if an up-to-date index exists")
+    args = parser.parse_args(argv)
+
+    for path in args.captures:
+        index = CaptureIndex.for_capture(path, rebuild=args.rebuild)
+        duration = float(index.times.max()) - index.start_time if len(index) else 0.0
+        counts = ", ".join(f"{kind_name(index.capture_format, kind)}: {n}" for kind, n in sorted(index.summary().items()))
+        print(f"{path}: {duration:.1f} s, {counts} -> {CaptureIndex.sidecar_path(path)}")
+
+
+if __name__ == "__main__":
+    main()
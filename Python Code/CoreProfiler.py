@@ -0,0 +1,187 @@
+"""
+Opt-in Core() profiling for the RTMaps components (RTMaps-independent).
+
+A component decorates its Core() with @profiled_core and creates a CoreProfiler
+in Birth(). While the profiler is disabled (the default) the decorator costs one
+attribute check per call. When enabled, every Core() call is timed into a
+LatencyHistogram and the component can count what its Core() did:
+    - calls, over_budget: counted by the decorator (over_budget: calls longer than budget_ms)
+    - early_returns: self.profiler.early_return("reason"), also counted per reason
+    - recomputes, skipped_intersections, ...: self.profiler.count("name")
+The latest call latency is written to the core_latency_us output, and the
+counters and percentiles (CORE_STATS_FIELDS) to core_stats at most once per
+publish_interval seconds. summary() is printed in Death().
+
+Example (in an rtmaps_python component):
+    def Dynamic(self):
+        self.add_output("core_latency_us", rtmaps.types.FLOAT64)
+        self.add_output("core_stats", rtmaps.types.FLOAT64)
+        self.add_property("profile_core", False)
+
+    def Birth(self):
+        self.profiler = CoreProfiler("DM", self.get_property("profile_core"))
+
+    @profiled_core
+    def Core(self):
+        if not self.inputs["d_0"].ioelt.data:
+            return self.profiler.early_return("no_d_0")
+        ...
+"""
+import functools
+import time
+from collections import Counter
+
+import numpy as np
+
+# Layout of the core_stats output vector
+CORE_STATS_FIELDS = ("calls", "early_returns", "recomputes", "skipped_intersections", "over_budget",
+                     "p50_us", "p90_us", "p99_us", "max_us")
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations in nanoseconds (HDR style).
+
+    Values below 2**SUB_BITS are counted exactly; above, each power of two is split
+    into 2**(SUB_BITS - 1) buckets, so any value is known within 1/32 (about 1.6 %
+    from the bucket middle) with a fixed list of counts and O(1) record(). Values
+    beyond about 68 s are counted in the last bucket.
+    """
+    SUB_BITS = 6
+    MAX_SHIFT = 30
+
+    def __init__(self):
+        half = 1 << (self.SUB_BITS - 1)
+        self.counts = [0] * ((self.MAX_SHIFT + 2) * half)
+        self.total = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def record(self, value_ns: int):
+        shift = value_ns.bit_length() - self.SUB_BITS
+        if shift <= 0:
+            i = value_ns
+        else:
+            shift = min(shift, self.MAX_SHIFT)
+            i = min((shift << (self.SUB_BITS - 1)) + (value_ns >> shift), len(self.counts) - 1)
+        self.counts[i] += 1
+        self.total += 1
+        self.sum_ns += value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def bucket_value(self, i) -> int:
+        """
+        Middle of bucket i, in nanoseconds.
+        """
+        if i < 1 << self.SUB_BITS:
+            return i
+        shift = (i >> (self.SUB_BITS - 1)) - 1
+        sub = i - (shift << (self.SUB_BITS - 1))
+        return (sub << shift) + (1 << (shift - 1))
+
+    def percentiles(self, percents) -> list:
+        """
+        Values (ns) below which the given percentages of the durations fall, 0 if nothing was recorded.
+        """
+        if not self.total:
+            return [0] * len(percents)
+        cumulative = np.cumsum(self.counts)
+        ranks = np.ceil(np.asarray(percents, dtype=np.float64) / 100 * self.total).clip(1, self.total)
+        buckets = np.searchsorted(cumulative, ranks)
+        return [min(self.bucket_value(int(i)), self.max_ns) for i in buckets]
+
+    @property
+    def mean_ns(self) -> float:
+        return self.sum_ns / self.total if self.total else 0.0
+
+
+class CoreProfiler:
+    """
+    Core() latency histogram and work counters of one component.
+
+    Attributes:
+        name: Component name used in the summary
+        enabled: Nothing is recorded or written while False
+        budget_ms: Calls longer than this are counted as over_budget
+        publish_interval: Minimum seconds between two core_stats writes
+    """
+
+    def __init__(self, name, enabled=False, budget_ms=100.0, publish_interval=1.0):
+        self.name = name
+        self.enabled = bool(enabled)
+        self.budget_ns = int(budget_ms * 1e6)
+        self.publish_interval = publish_interval
+        self.histogram = LatencyHistogram()
+        self.counters = Counter()
+        self.last_ns = 0
+        self.last_publish = float("-inf")
+
+    def count(self, counter: str, n: int = 1):
+        if self.enabled:
+            self.counters[counter] += n
+
+    def early_return(self, reason: str):
+        """
+        Count a Core() call that returned before doing its work. Returns None, so Core()
+        can `return self.profiler.early_return("reason")`.
+        """
+        if self.enabled:
+            self.counters["early_returns"] += 1
+            self.counters["early_return:" + reason] += 1
+
+    def record(self, elapsed_ns: int):
+        self.histogram.record(elapsed_ns)
+        self.last_ns = elapsed_ns
+        self.counters["calls"] += 1
+        if elapsed_ns > self.budget_ns:
+            self.counters["over_budget"] += 1
+
+    def stats(self) -> np.ndarray:
+        """
+        Counters and latency percentiles (µs), in the order of CORE_STATS_FIELDS.
+        """
+        p50, p90, p99 = self.histogram.percentiles([50, 90, 99])
+        values = [self.counters[field] for field in CORE_STATS_FIELDS[:5]]
+        values += [p50 * 1e-3, p90 * 1e-3, p99 * 1e-3, self.histogram.max_ns * 1e-3]
+        return np.array(values, dtype=np.float64)
+
+    def publish(self, component):
+        """
+        Write the latest latency, and the stats if publish_interval has passed, to the component outputs.
+        """
+        component.outputs["core_latency_us"].write(self.last_ns * 1e-3)
+        now = time.monotonic()
+        if now - self.last_publish >= self.publish_interval:
+            self.last_publish = now
+            component.outputs["core_stats"].write(self.stats())
+
+    def summary(self) -> str:
+        if not self.enabled:
+            return f"[{self.name}] Core() profiling disabled"
+        p50, p90, p99 = (value * 1e-3 for value in self.histogram.percentiles([50, 90, 99]))
+        lines = [f"[{self.name}] Core(): {self.counters['calls']} calls, mean {self.histogram.mean_ns * 1e-3:.1f} µs, "
+                 f"p50 {p50:.1f} µs, p90 {p90:.1f} µs, p99 {p99:.1f} µs, max {self.histogram.max_ns * 1e-3:.1f} µs, "
+                 f"{self.counters['over_budget']} over {self.budget_ns * 1e-6:g} ms"]
+        for counter, n in sorted(self.counters.items()):
+            if counter not in ("calls", "over_budget"):
+                lines.append(f"    {counter}: {n}")
+        return "\n".join(lines)
+
+
+def profiled_core(core):
+    """
+    Decorator for rtmaps_python.Core(): times the call with the component's CoreProfiler (self.profiler).
+    """
+    @functools.wraps(core)
+    def wrapper(component):
+        profiler = component.profiler
+        if not profiler.enabled:
+            return core(component)
+        start = time.perf_counter_ns()
+        try:
+            return core(component)
+        finally:
+            profiler.record(time.perf_counter_ns() - start)
+            profiler.publish(component)
+    return wrapper
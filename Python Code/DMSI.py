@@ -1,8 +1,17 @@
 import rtmaps.core as rt
 import rtmaps.types
 from rtmaps.base_component import BaseComponent  # base class
-import json  # For handling Gamma input as JSON
-import numpy as np
+import os
+import sys
+import tempfile
+
+# Shared (RTMaps-independent) modules live next to this script
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import AsyncLog
+import TrajectoryCore
+from CoreProfiler import CoreProfiler, profiled_core
+
+log = AsyncLog.get_logger("DMSI")
 
 class rtmaps_python(BaseComponent):
     """
@@ -33,16 +42,27 @@ class rtmaps_python(BaseComponent):
         self.add_output("scenario", rtmaps.types.TEXT_ASCII)  # Scenario result (String)
         self.add_output("scenario_n", rtmaps.types.INTEGER64)  # Scenario result (String)
         self.add_output("d_0_out", rtmaps.types.FLOAT64)    # Route distance to stop-bar
+        self.add_output("core_latency_us", rtmaps.types.FLOAT64)  # Core() profiling (profile_core): latest call duration
+        self.add_output("core_stats", rtmaps.types.FLOAT64)       # Core() profiling: CoreProfiler.CORE_STATS_FIELDS vector
         #self.add_output("v_c_out", rtmaps.types.FLOAT64)    # Instantaneous speed at time instant t_0
         #self.add_output("t_0_out", rtmaps.types.FLOAT64)    # Current absolute time (seconds)
         #self.add_output("gamma_out", rtmaps.types.ANY)      # Green intervals (JSON)
+        self.add_property("use_lookup_table", True)  # Use the precomputed critical time table instead of the closed-form math
+        self.add_property("lookup_table_file", os.path.join(tempfile.gettempdir(), "ead_critical_times.npz"))  # Table cache (rebuilt if missing)
+        self.add_property("profile_core", False)     # Time Core() and count skipped work (CoreProfiler.py)
+        self.add_property("core_budget_ms", 100.0)  # Core() calls longer than this are counted as over budget
 
     def Birth(self):
         """
         Called once at the beginning.
         """
-        print("Decision Maker: Scenario Identifier initialized.")
+        self.critical_time_table = None
+        if self.get_property("use_lookup_table"):
+            self.critical_time_table = TrajectoryCore.CriticalTimeTable.load_or_build(self.get_property("lookup_table_file"))
+        self.profiler = CoreProfiler("DMSI", self.get_property("profile_core"), self.get_property("core_budget_ms"))
+        log.info("Decision Maker: Scenario Identifier initialized.")
 
+    @profiled_core
     def Core(self):
         """
         Called on every cycle (when new data is available).
@@ -59,68 +79,39 @@ class rtmaps_python(BaseComponent):
 
         # Validate critical inputs
         if d_0_in is None or v_c_in is None or t_0_in is None or g_e_curr is None or g_s_next is None or g_e_next is None:
-            print("ERROR: Missing inputs!")
+            log.error("Missing inputs!")
             self.outputs["scenario"].write("Missing Inputs")
-            return
-
-        # Robust handling of gamma input:
-        # If gamma_in is a string, try to parse it as JSON. If it's already a list (or tuple), use it directly.
-        
-        if g_e_curr == -1:
-            # Case 1: No current green phase
-            gamma_intervals = ((g_s_next, g_e_next),)
-        else:
-            # Case 2: Current green phase exists
-            gamma_intervals = ((t_0_in, g_e_curr), (g_s_next, g_e_next))
-        
+            return self.profiler.early_return("missing_inputs")
 
+        gamma_intervals = TrajectoryCore.gamma_intervals(t_0_in, g_e_curr, g_s_next, g_e_next)
 
-        # Additional parameters in case identified scenario is S3 or S4
-        # Assure that these parameters are in line with the same parameters found in DMTG
-        #t_e = t_0_in + d_0_in / v_c_in  # Earliest time to arrival
-        a_max = 1.0          # maximum acceleration in m/s²
-        d_max = 1.0         # maximum deceleration in m/s²
-        jerk_max = 1.0       # maximum jerk in m/s³
-        v_limit = 56.33   # speed limit in km/h (35mph) 
-        v_coast = 12.87 # km/h as defined, equivalent to 8 MPH
-
-        # Convert velocity from km/h to m/s for calculations:
-        v_c_ms = v_c_in  * (5.0 / 18.0) # km/h to m/s          
-        v_limit_ms = v_limit * (5.0 / 18.0)   # velocity limit in m/s
-        v_coast_ms = v_coast * (5.0 / 18.0)
-        
-        term1p = (2 * a_max) / (v_limit_ms - v_c_ms)
-        term2p = np.sqrt((2 * jerk_max) / (v_limit_ms - v_c_ms))
-        term1q = (2 * a_max) / (v_c_ms - v_coast_ms)
-        term2q = np.sqrt((2 * jerk_max) / (v_c_ms - v_coast_ms))
-
-        p = min(term1p, term2p)
-        q = min(term1q, term2q)
-
-        t_cr = d_0_in / v_c_ms
-        t_e = ((d_0_in - v_c_ms * np.pi / (2 * p)) / v_limit_ms) + (np.pi / (2 * p))
-        t_l = ((d_0_in - v_c_ms * np.pi / (2 * q)) / v_coast_ms) + (np.pi / (2 * q))
-
-        # Calculate time thresholds (ensure v_c_in > 0 to avoid division by zero)
+        v_c_ms = v_c_in * TrajectoryCore.KMH_TO_MS  # km/h to m/s
         if v_c_ms < 0:
-            print("ERROR: Speed must be greater than zero.")
+            log.error("Speed must be greater than zero.")
             self.outputs["scenario"].write("Invalid Speed")
             self.outputs["d_0_out"].write(d_0_in)
-            return
-        elif v_c_ms > v_limit_ms:
-            print("ERRPR: Speed is over speed limit!!!")
+            return self.profiler.early_return("invalid_speed")
+        elif v_c_ms > TrajectoryCore.V_LIMIT_MS:
+            log.error("Speed is over speed limit!!!")
             self.outputs["scenario"].write("Invalid Speed")
             self.outputs["d_0_out"].write(d_0_in)
-            return
+            return self.profiler.early_return("invalid_speed")
         """
         if v_c_in == 0:
             t_cr = np.sqrt(2 * d_0_in / a_max)  
         else:
             t_cr = d_0_in / v_c_in  # Cruise time to arrival
         """
+        # Speed is checked first: critical_times() is only defined for 0 <= v_c <= V_LIMIT.
+        # Without the table, critical times are shared with DMTG through TrajectoryCore.critical_times()' cache
+        if self.critical_time_table is not None:
+            _, _, t_cr, t_e, t_l = self.critical_time_table.lookup(d_0_in, v_c_ms)
+        else:
+            _, _, t_cr, t_e, t_l = TrajectoryCore.critical_times(d_0_in, v_c_ms)
+
         # Identify the scenario based on gamma intervals and time thresholds
         #print(f"DEBUG: Calculated t_e={t_e}, t_l={t_l}, t_0={t_0_in}, t_cr={t_cr}")
-        scenario_result, scenario_n= self.identify_scenario( gamma_intervals, t_cr, t_e, t_l)
+        scenario_result, scenario_n = TrajectoryCore.identify_scenario(gamma_intervals, t_cr, t_e, t_l)
 
         # Write the scenario result to the output
         self.outputs["scenario"].write(scenario_result)
@@ -136,56 +127,6 @@ class rtmaps_python(BaseComponent):
         """
         Called once at the end (cleanup).
         """
-        print("Decision Maker: Scenario Identifier terminated.")
-
-    def identify_scenario(self, gamma_intervals, t_cr, t_e, t_l):
-        """
-        Identify the scenario based on the current time, Gamma intervals, and thresholds.
-
-        Args:
-            t_0_in (float): Current time.
-            gamma_intervals (list): List of green intervals [[start1, end1], [start2, end2], ...].
-            t_e (float): Earliest relevant time.
-            t_l (float): Latest relevant time.
-            t_cr (float): Critical time (e.g., estimated time to reach the stop-bar).
-
-        Returns:
-            str: Identified scenario ("Scenario 1", "Scenario 2", etc.).
-        """
-    
-        # Scenario 1: Check if the cruise arrival time t_cr falls within any green windows. If you maintain cruise speed, you will arrive while the light is green.
-        for interval in gamma_intervals:
-            if len(interval) == 2:
-                start, end = interval
-                #print(f"DEBUG: Calculated start={start}, t_l={t_l}, end={end}, t_cr={t_cr}")
-                if start <= t_cr < end:
-                    print("DEBUG: Scenario 1 matched.")
-                    return "Scenario 1",1
-
-        # Scenario 2: Check if the interval [t_e, t_cr] overlaps with any green windows. You could arrive during a green light if you accelerate slightly.
-
-        for interval in gamma_intervals:
-            if len(interval) == 2:
-                start, end = interval
-                # Determine the intersection between [t_e, t_cr] and [start, end]
-                if max(t_e, start) < min(t_cr, end):
-                    print("DEBUG: Scenario 2 matched.")
-                    return "Scenario 2",2
-
-        # Scenario 3: Check if there is no gamma overlap in the interval [t_cr, t_l]. Stopping is inevitable.
-
-        overlap_found = False
-        for interval in gamma_intervals:
-            if len(interval) == 2:
-                start, end = interval
-                if max(t_cr, start) < min(t_l, end):
-                    overlap_found = True
-                    break
-        if not overlap_found:
-            print("DEBUG: Scenario 3 matched.")
-            return "Scenario 3",3
-
-        # Default: Scenario 4 if none of the above conditions are met. Possibly useful for Eco-Approach strategies (e.g., creeping forward or brief idling).
-
-        print("DEBUG: Scenario 4 matched.")
-        return "Scenario 4",4
+        if self.profiler.enabled:
+            log.info(self.profiler.summary())
+        log.info("Decision Maker: Scenario Identifier terminated.")
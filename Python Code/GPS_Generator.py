@@ -18,6 +18,11 @@ class rtmaps_python(BaseComponent):
     5) Outputs each interpolated pair sequentially through:
    - longitude: FLOAT64 representing the interpolated longitude
    - latitude: FLOAT64 representing the interpolated latitude
+    6) Advances the position by v_c * dt on every Core(), where dt depends on the clock_mode property:
+   - "wall": time elapsed since the previous Core() (capped at 0.1 s), i.e. runs in real time
+   - "fixed": time_step seconds, so the closed loop runs as fast as the CPU allows and reproducibly
+   - "input": the dt input (seconds), for a timestep driven by another component
+   The simulated time is written to t_sim (microseconds, same convention as t_0).
     """
     def __init__(self):
         BaseComponent.__init__(self)
@@ -26,6 +31,11 @@ class rtmaps_python(BaseComponent):
         self.add_output("longitude", rtmaps.types.FLOAT64)
         self.add_output("latitude", rtmaps.types.FLOAT64)
         self.add_input("v_c", rtmaps.types.FLOAT64)  # km/h
+        self.add_input("dt", rtmaps.types.FLOAT64)   # Optional: timestep (s) for clock_mode "input"
+        self.add_output("t_sim", rtmaps.types.INTEGER64)  # Simulated time (microseconds)
+
+        self.add_property("clock_mode", "wall")  # "wall", "fixed" or "input"
+        self.add_property("time_step", 0.1)      # Timestep (s) for clock_mode "fixed"
       
 
     def Birth(self):
@@ -37,17 +47,17 @@ class rtmaps_python(BaseComponent):
         self.earth_radius = 6371000              # meters
         self.v_c = 48                            # default velocity in km/h
         self.last_update_time = time.time()      # track last update time
+        self.clock_mode = self.get_property("clock_mode")
+        self.time_step = float(self.get_property("time_step"))
+        self.t_sim = 0.0                         # simulated time (s)
 
         print("GPS Generator initialized with velocity input.")
 
     def Core(self):
-        # Get current time and calculate actual time step
-        current_time = time.time()
-        dt = current_time - self.last_update_time
-        self.last_update_time = current_time
-
-        # Limit dt to prevent large jumps
-        dt = min(dt, 0.1)  # Cap at 100ms to prevent large jumps
+        dt = self.next_time_step()
+        if dt is None:
+            return
+        self.t_sim += dt
 
         # Ensure input is available
         if not self.inputs["v_c"].ioelt:
@@ -76,6 +86,7 @@ class rtmaps_python(BaseComponent):
         # Write outputs
         self.write("latitude", self.latitude)
         self.write("longitude", self.longitude)
+        self.write("t_sim", int(round(self.t_sim * 1e6)))
         #print(f"[GPS Generator] v_c: {v_c:.2f} km/h, step: {step_m:.2f} m, new lon: {self.longitude:.7f}")
          
 
@@ -83,5 +94,24 @@ class rtmaps_python(BaseComponent):
         
             
 
+    def next_time_step(self):
+        """
+        Seconds to advance on this Core(), or None if the dt input has no sample yet.
+        """
+        if self.clock_mode == "fixed":
+            return self.time_step
+        if self.clock_mode == "input":
+            if self.inputs["dt"].ioelt is None:
+                return None
+            return float(self.inputs["dt"].ioelt.data)
+
+        # Get current time and calculate actual time step
+        current_time = time.time()
+        dt = current_time - self.last_update_time
+        self.last_update_time = current_time
+
+        # Limit dt to prevent large jumps
+        return min(dt, 0.1)  # Cap at 100ms to prevent large jumps
+
     def Death(self):
         print("Generated 100 GPS points from last node to first.")
@@ -1,28 +1,40 @@
 import rtmaps.core as rt
 import rtmaps.types
 from rtmaps.base_component import BaseComponent  # base class
-import json  # For JSON serialization of intervals
-from datetime import datetime, timezone
+import os
+import sys
+import numpy as np
+
+# Shared (RTMaps-independent) modules live next to this script
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import AsyncLog
+import J2735
+from CoreProfiler import CoreProfiler, profiled_core
+from SignalTiming import DEFAULT_TIMING_MODEL, SignalTimingEstimator, load_timing_model, state_name_to_number
+
+log = AsyncLog.get_logger("GreenWindowEstimator")
 
 
 class rtmaps_python(BaseComponent):
     """
     RTMaps component that:
-    1) Receives 3 inputs:
+    1) Receives SPaT samples for every intersection and signal group:
         - t0: the current time instant
-        - current_state: 0 -> 9, refer to line 89
+        - current_state: 0 -> 9, see SignalTiming.STATE_NUMBERS
         - countdown: 500 ticks for each phases
-    2) Estimates the available green window(s) for the vehicle as:
+        - IntersectionID_SPaT / SignalGroup_SPaT: which signal the sample belongs to
+       and keeps timing state (learned phase durations, tick statistics) for each of them.
+       Alternatively SPAT_byte carries the raw J2735 MessageFrame (see Hex_to_Byte.py), which is
+       decoded here (J2735.py) and updates every intersection and signal group of the message at once.
+    2) Estimates the available green window(s) for the matched intersection as:
          If Green at t0:  Γ = [t0, g_e_curr) ∪ [g_s_next, g_e_next)
          If Yellow or Red at t0:  Γ = [g_s_next, g_e_next)
-    3) Returns the estimated intervals as JSON.
+    3) Outputs the windows, plus the next N green windows as a flat vector
+       [start_1, end_1, ..., start_N, end_N] (seconds relative to t0).
     """
 
     def __init__(self):
         BaseComponent.__init__(self)
-        # Cache to hold the schedule computed for the current SPAT message.
-        self.last_spat_t0 = None
-        self.cached_schedule = None  # tuple (g_s_next, g_e_next, g_e_curr)
         self.g_e_curr = None
         self.g_s_next = None 
         self.g_e_next = None
@@ -36,6 +48,9 @@ class rtmaps_python(BaseComponent):
         self.add_input("countdown", rtmaps.types.FLOAT64)
         self.add_input("Intersection_ID_matched", rtmaps.types.FLOAT64)
         self.add_input("IntersectionID_SPaT", rtmaps.types.FLOAT64)
+        self.add_input("SignalGroup_SPaT", rtmaps.types.FLOAT64)      # Optional: signal group of the SPaT sample (unknown if not wired)
+        self.add_input("SignalGroup_matched", rtmaps.types.FLOAT64)   # Signal group of the matched lane (optional if the intersection has only one)
+        self.add_input("SPAT_byte", rtmaps.types.UINTEGER8)           # Optional: SPaT MessageFrame, replaces the per-field SPaT inputs
 
         # Output: Using 'Any' to allow Python objects
         #self.add_output("gamma", rtmaps.types.ANY)          # Available green windows
@@ -44,101 +59,152 @@ class rtmaps_python(BaseComponent):
         self.add_output("g_s_next", rtmaps.types.FLOAT64)
         self.add_output("g_e_next", rtmaps.types.FLOAT64)
         self.add_output("state", rtmaps.types.FLOAT64)
+        self.add_output("green_windows", rtmaps.types.FLOAT64)  # Next N green windows (vector of 2N values)
+        self.add_output("tick_jitter", rtmaps.types.FLOAT64)    # Std. deviation of the SPaT countdown tick interval (s)
+        self.add_output("core_latency_us", rtmaps.types.FLOAT64)  # Core() profiling (profile_core): latest call duration
+        self.add_output("core_stats", rtmaps.types.FLOAT64)       # Core() profiling: CoreProfiler.CORE_STATS_FIELDS vector
+
+        self.add_property("n_windows", 3)  # Number of green windows on the green_windows output
+        self.add_property("timing_model_file", DEFAULT_TIMING_MODEL)  # Offline phase durations (SignalTimingTrainer.py), optional
+        self.add_property("profile_core", False)     # Time Core() and count skipped work (CoreProfiler.py)
+        self.add_property("core_budget_ms", 100.0)  # Core() calls longer than this are counted as over budget
 
     def Birth(self):
         """
         Called once at the beginning.
         """
-        print("Green Window Estimator subsystem initialized.")
+        model = load_timing_model(self.get_property("timing_model_file"))
+        if model is not None:
+            log.info("Loaded signal timing model with %d phase distributions.", len(model))
+        self.timing = SignalTimingEstimator(model)
+        self.n_windows = max(2, int(self.get_property("n_windows")))
+        self.last_spat_ts = None
+        self.ambiguous_intersections = set()  # Intersections already reported without a matched signal group
+        self.profiler = CoreProfiler("GreenWindowEstimator", self.get_property("profile_core"), self.get_property("core_budget_ms"))
+        log.info("Green Window Estimator subsystem initialized.")
         
+    @profiled_core
     def Core(self):
         """
         Called on every cycle (when new data is available).
         """
-        # Read the latest data from inputs
-        if (self.inputs["Intersection_ID_matched"].ioelt is None or 
-            self.inputs["IntersectionID_SPaT"].ioelt is None):
-            return
-        
-         # Read matched intersection from MapMatcher
-        intersection_matched = self.inputs["Intersection_ID_matched"].ioelt.data
-        # Read SPaT messages intersection ID
-        intersection_spat = self.inputs["IntersectionID_SPaT"].ioelt.data
-
-        # If the intersection IDs don't match, skip processing
-        if intersection_matched != intersection_spat:
-            print(f"Skipped: SPaT ID {intersection_spat} / Matched ID {intersection_matched}")
-            return
-
-
-        t0_in = round(float(self.inputs["t0"].ioelt.data * 1e-6),2)
-        current_state_in=self.state_name_to_number(self.inputs["current_state"].ioelt.data)
-        count_down_in = int(self.inputs["countdown"].ioelt.data)
-               
-        if not hasattr(self, "last_cd_tick"):
-            self.last_cd_tick = None
-            self.last_tick_time = t0_in
-            self.tick_intervals = []
-
-        if count_down_in != self.last_cd_tick:
-            if self.last_tick_time is not None:
-                actual_interval = t0_in - self.last_tick_time
-                self.tick_intervals.append(actual_interval)
-                if len(self.tick_intervals) > 20:  # keep last 20 intervals
-                    self.tick_intervals.pop(0)
-
-            self.last_cd_tick = count_down_in
-            self.last_tick_time = t0_in
-
-            # Compute dynamic tick duration (averaged)
-            avg_tick_duration = sum(self.tick_intervals) / len(self.tick_intervals) if self.tick_intervals else 0.1
-            # Low-pass filter
-            if avg_tick_duration < 0.08:
-                avg_tick_duration = 0.1
-
-            self.g_s_next, self.g_e_next, self.g_e_curr = self.estimate_green_window_from_countdown(
-                t0_in, current_state_in, count_down_in, next_green_duration=500 * avg_tick_duration
-            )
-            #print(f"g_e_curr: {self.g_e_curr}, g_s_next: {self.g_s_next}, g_e_next: {self.g_e_next}, phase: {current_state_in}, countdown: {count_down_in}, avg_tick: {round(avg_tick_duration, 3)}s")
-
-        
-
+        # Every intersection / signal group is tracked, so windows are ready before the map matcher switches to it
+        if self.inputs["SPAT_byte"].ioelt is not None:
+            t0_in = self.update_from_spat_frame()
+        else:
+            t0_in = self.update_from_spat_fields()
+        if t0_in is None:
+            return self.profiler.early_return("no_spat")
 
+        if self.inputs["Intersection_ID_matched"].ioelt is None:
+            return self.profiler.early_return("no_matched_intersection")
 
-        # Safety check: ensure we have valid data
-        if (t0_in is None or
-            current_state_in is None or
-            self.g_e_curr is None or
-            self.g_s_next is None or
-            self.g_e_next is None):
-            print("DEBUG: Missing input data, skipping this cycle.")
-            return
+         # Read matched intersection from MapMatcher
+        intersection_matched = self.inputs["Intersection_ID_matched"].ioelt.data
+        signal_group = self.input_data("SignalGroup_matched")
+        tracker = self.timing.tracker_for(intersection_matched, signal_group)
+        if tracker is None:
+            groups = self.timing.signal_groups(intersection_matched)
+            if signal_group is None and len(groups) > 1:
+                if intersection_matched not in self.ambiguous_intersections:
+                    self.ambiguous_intersections.add(intersection_matched)
+                    log.warning("Intersection %s broadcasts signal groups %s but no SignalGroup_matched was received: "
+                                "no green window until the matched lane's group is known", intersection_matched, groups)
+                return self.profiler.early_return("no_signal_group")
+            return self.profiler.early_return("no_spat_for_matched_intersection")  # No SPaT heard yet for the matched intersection
+
+        windows = tracker.green_windows(t0_in, self.n_windows)
+        if not windows:
+            log.warning("Unknown or unsupported signal state: %s", tracker.state)
+            return self.profiler.early_return("unknown_state")
+
+        if tracker.phase == "green":
+            self.g_e_curr = windows[0][1]
+            self.g_s_next, self.g_e_next = windows[1]
+        else:
+            self.g_e_curr = -1.0
+            self.g_s_next, self.g_e_next = windows[0]
+        #print(f"g_e_curr: {self.g_e_curr}, g_s_next: {self.g_s_next}, g_e_next: {self.g_e_next}, phase: {tracker.state}, avg_tick: {round(tracker.avg_tick_duration(), 3)}s")
 
         # Compute the set/list of green intervals
         gamma_result = self.gamma_function(
             t0_in,
-            current_state_in,
+            tracker.state,
             self.g_e_curr,
             self.g_s_next,
             self.g_e_next
         )
 
-        # Convert the intervals to JSON to avoid tuple handling errors in RTMaps
-        #gamma_str = json.dumps(gamma_result)
-
         # Write the intervals (as JSON) to the output
         #self.outputs["gamma"].write(gamma_str)
         self.outputs["g_e_curr"].write(self.g_e_curr)
         self.outputs["g_s_next"].write(self.g_s_next)
         self.outputs["g_e_next"].write(self.g_e_next)
-        self.outputs["state"].write(current_state_in)
+        self.outputs["state"].write(tracker.state)
+        self.outputs["green_windows"].write(np.array(windows, dtype=np.float64).ravel())
+        self.outputs["tick_jitter"].write(tracker.tick_jitter())
+
+    def update_from_spat_fields(self):
+        """
+        Feeds the SPaT sample on the per-field inputs. Returns t0 (s), or None if a field is missing.
+        """
+        # Read the latest data from inputs
+        if (self.inputs["IntersectionID_SPaT"].ioelt is None or
+            self.inputs["t0"].ioelt is None or
+            self.inputs["current_state"].ioelt is None or
+            self.inputs["countdown"].ioelt is None):
+            return None
 
+        # Read SPaT messages intersection ID
+        intersection_spat = self.inputs["IntersectionID_SPaT"].ioelt.data
+        signal_group_spat = self.input_data("SignalGroup_SPaT")  # None: not known, see SignalTimingEstimator.tracker_for
+
+        t0_in = round(float(self.inputs["t0"].ioelt.data * 1e-6),2)
+        current_state_in = state_name_to_number(self.inputs["current_state"].ioelt.data)
+        count_down_in = int(self.inputs["countdown"].ioelt.data)
+
+        self.timing.update(intersection_spat, signal_group_spat, t0_in, current_state_in, count_down_in)
+        return t0_in
+
+    def update_from_spat_frame(self):
+        """
+        Decodes the SPaT MessageFrame on SPAT_byte and feeds all its movements; t0 is the sample timestamp.
+        Returns t0 (s), or None if the frame cannot be decoded.
+        """
+        ioelt = self.inputs["SPAT_byte"].ioelt
+        t0_in = round(ioelt.ts * 1e-6, 2)
+        if ioelt.ts == self.last_spat_ts:
+            self.profiler.count("spat_repeated")
+            return t0_in  # Same message, only the matched intersection changed
+        self.last_spat_ts = ioelt.ts
+        self.profiler.count("spat_decoded")
+
+        try:
+            msg_id, value = J2735.decode_message_frame(bytes(ioelt.data))
+            if msg_id != J2735.MSG_SPAT:
+                return None
+            spat = J2735.decode_spat(value)
+        except J2735.DecodeError as e:
+            log.warning("Undecodable SPaT message: %s", e)
+            return None
+
+        self.timing.update_spat(t0_in, spat)
+        return t0_in
+
+    def input_data(self, name: str, default=None):
+        """
+        Latest data of an optional input, or default if nothing was received on it.
+        """
+        ioelt = self.inputs[name].ioelt
+        return default if ioelt is None else ioelt.data
 
     def Death(self):
         """
         Called once at the end (cleanup).
         """
-        print("Green Window Estimator subsystem terminated.")
+        if self.profiler.enabled:
+            log.info(self.profiler.summary())
+        log.info("Green Window Estimator subsystem terminated.")
 
     # Define Gamma function
     def gamma_function(self, t0, current_state, g_e_curr, g_s_next, g_e_next):
@@ -165,72 +231,3 @@ class rtmaps_python(BaseComponent):
             gamma.append((g_s_next, g_e_next))  # Add next green interval
 
         return gamma
-    
-    def estimate_green_window_from_countdown(self, t0, current_state, countdown_value:float, next_green_duration ):
-        """
-        Estimate g_s_next, g_e_next and g_e_curr (if applicable) from SPaT countdown values.
-
-        Parameters:
-        t0 (float): current RTMaps/system time in seconds
-        current_state (int): current signal state 
-        countdown_value (int): current countdown from 500 to 0
-        next_green_duration (int): duration of green phase in ticks (default: 50)
-
-        Returns:
-        Tuple (g_e_curr, g_s_next, g_e_next)
-        - g_e_curr: float or None (end of current green)
-        - g_s_next: float or None (start of next green)
-        - g_e_next: float or None (end of next green)
-        """
-        # Convert countdown ticks (0.1s per tick) to seconds
-        time_until_phase_change = countdown_value * 0.1 
-        g_e_curr = -1.0
-        #print(f"{t0} + {time_until_phase_change} = ")
-        #print(f"Next green duration: {next_green_duration}")
-
-        if current_state in {2.0, 3.0}:  # RED phase now
-            g_s_next = time_until_phase_change
-            g_e_next = g_s_next + next_green_duration 
-
-        elif current_state in {7.0, 8.0, 9.0}:  # YELLOW phase now
-            red_duration = 50  # 50s of red after yellow
-            g_s_next = time_until_phase_change + red_duration
-            g_e_next = g_s_next + next_green_duration
-
-        elif current_state in {4.0, 5.0, 6.0}:  # GREEN phase now
-            yellow_red_duration = 50 * 2   # 100s of red and yellow after the next green
-            g_e_curr = time_until_phase_change
-            g_s_next = g_e_curr + yellow_red_duration
-            g_e_next = g_s_next + next_green_duration 
-
-        else:
-            print("Unknown or unsupported signal state:", current_state)
-            return None, None, None
-
-        return g_s_next, g_e_next, g_e_curr  
-    
-    def state_name_to_number(self,state_name: str) -> float:
-        """
-        Converts a MovementPhaseState name (string) to its corresponding numeric value.
-        Based on SAE J2735 standard enum values.
-
-        Parameters:
-            state_name (str): The textual state name (e.g., "stop-And-Remain")
-
-        Returns:
-            int: Corresponding state number, or -1 if not recognized
-        """
-        state_map = {
-            "unavailable": 0.0,
-            "dark": 1.0,
-            "stop-Then-Proceed": 2.0,
-            "stop-And-Remain": 3.0,
-            "pre-Movement": 4.0,
-            "permissive-Movement-Allowed": 5.0,
-            "protected-Movement-Allowed": 6.0,
-            "permissive-clearance": 7.0,
-            "protected-clearance": 8.0,
-            "caution-Conflicting-Traffic": 9.0
-    }
-        #print(f"Signal: {state_name}")
-        return state_map.get(state_name.strip(), -1.0)
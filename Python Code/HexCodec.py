@@ -0,0 +1,58 @@
+"""
+Hex string <-> byte array conversion shared by Hex_to_Byte.py and MD_viewer.py.
+
+Conversions go through bytes.fromhex / bytes.hex and numpy buffers, without
+building a Python object per byte. DebugPrinter logs message dumps (AsyncLog.py)
+at most once per interval so debug output does not slow down the Python bridge
+at MAP/SPaT/BSM rates.
+"""
+import numpy as np
+
+import AsyncLog
+
+EMPTY_BYTES = np.zeros(0, dtype=np.uint8)
+EMPTY_HEX = " "  # MD_viewer writes a blank string for an empty message
+
+
+def hex_to_bytes(hex_str: str) -> np.ndarray:
+    """
+    Convert a hex string (whitespace allowed) to a UINTEGER8 array.
+    Returns an empty array if the string is empty or not valid hex.
+    """
+    try:
+        data = bytes.fromhex(hex_str)
+    except (TypeError, ValueError):
+        data = b""
+    if not data:
+        return EMPTY_BYTES
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def bytes_to_hex(data) -> str:
+    """
+    Convert a byte array (numpy UINTEGER8 array, bytes or list of ints) to a lowercase hex string.
+    Returns EMPTY_HEX for missing or empty data.
+    """
+    if data is None or len(data) == 0:
+        return EMPTY_HEX
+    if isinstance(data, (bytes, bytearray)):
+        return data.hex()
+    return np.asarray(data, dtype=np.uint8).tobytes().hex()
+
+
+class DebugPrinter:
+    """
+    Logs at most one message per `interval` seconds at INFO level; skipped messages are
+    counted and reported with the next logged one. Disabled printers cost one attribute check.
+    """
+
+    def __init__(self, enabled=False, interval=1.0, name="HexCodec"):
+        self.enabled = enabled
+        self.interval = interval
+        self.log = AsyncLog.get_logger(name)
+
+    def __call__(self, message: str):
+        if not self.enabled:
+            return
+        # One rate limit per printer, whatever the message
+        self.log.info("%s", message, key=self, interval=self.interval)
@@ -2,7 +2,16 @@ import rtmaps.core as rt
 import rtmaps.types
 from rtmaps.base_component import BaseComponent
 import numpy as np
-import pdb
+import os
+import sys
+
+# Shared (RTMaps-independent) modules live next to this script
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import AsyncLog
+from CoreProfiler import CoreProfiler, profiled_core
+from HexCodec import DebugPrinter, hex_to_bytes
+
+log = AsyncLog.get_logger("Hex_to_Byte")
 
 class rtmaps_python(BaseComponent):
     """
@@ -22,40 +31,43 @@ class rtmaps_python(BaseComponent):
 
         # Define outputs as TEXT_ASCII for the hex representation.
         self.add_output("SPAT_byte", rtmaps.types.UINTEGER8)
+        self.add_output("core_latency_us", rtmaps.types.FLOAT64)  # Core() profiling (profile_core): latest call duration
+        self.add_output("core_stats", rtmaps.types.FLOAT64)       # Core() profiling: CoreProfiler.CORE_STATS_FIELDS vector
+
+        self.add_property("debug_print", False)   # Print the converted messages
+        self.add_property("debug_interval", 1.0)  # Minimum seconds between debug prints
+        self.add_property("profile_core", False)     # Time Core() and count skipped work (CoreProfiler.py)
+        self.add_property("core_budget_ms", 100.0)  # Core() calls longer than this are counted as over budget
 
     def Birth(self):
-        print("Passing through Birth()")
+        log.info("Passing through Birth()")
+        self.debug = DebugPrinter(self.get_property("debug_print"), self.get_property("debug_interval"), name="Hex_to_Byte")
+        self.profiler = CoreProfiler("Hex_to_Byte", self.get_property("profile_core"), self.get_property("core_budget_ms"))
 
+    @profiled_core
     def Core(self):
         # Retrieve each input’s ASCII
         spat_hex = self.inputs["SPAT_hex"].ioelt.data
-        #print(f"SPAT_hex input: '{spat_hex}'") 
 
         # Convert each input’s entire data array into a hex string
         spat_byte = to_byte_string(spat_hex)
+        if not len(spat_byte):
+            self.profiler.count("invalid_hex")
 
         # Write out the results
-        #print( spat_byte)
+        if self.debug.enabled:
+            self.debug(f"SPAT_hex: {spat_hex}")
         self.write("SPAT_byte", spat_byte)
 
     def Death(self):
-        print("Passing through Death()")
+        if self.profiler.enabled:
+            log.info(self.profiler.summary())
+        log.info("Passing through Death()")
 
-# Helper function to convert an Ioelt's data (array of bytes) into a single hex string
+# Helper function to convert a hex string into an array of bytes
 def to_byte_string(hex_str):
-    # Strip BOM (Byte Order Mark) if it exists
-    #hex_str = hex_str.lstrip('\ufeff')  # Remove BOM if present
-
-     # Clean up any unnecessary whitespace, newlines, tabs, etc.
-    hex_str = hex_str.replace(" ", "").replace("\n", "").replace("\r", "").replace("\t", "")
-
-    # Print the cleaned-up string for debugging
-    #print(f"Cleaned hex string: '{hex_str}'")
-
-    # Check if the hex string is valid (even length and contains only hex digits)
-    if hex_str and len(hex_str) % 2 == 0 and all(c in '0123456789abcdefABCDEF' for c in hex_str):
-        # Convert each pair of characters (representing a byte) into integers and return as a numpy array
-        return np.array([int(hex_str[i:i+2], 16) for i in range(0, len(hex_str), 2)], dtype=np.uint8)
-    
-    print("Invalid hex string provided.")
-    return np.array([], dtype=np.uint8)  # Return an empty array if invalid hex string
+    # Whitespace (spaces, newlines, tabs) is ignored; invalid or empty strings give an empty array
+    spat_byte = hex_to_bytes(hex_str)
+    if not len(spat_byte):
+        log.warning("Invalid hex string provided.")
+    return spat_byte
@@ -0,0 +1,541 @@
+"""
+Pure-Python decoder for SAE J2735 (2016+) messages in UPER encoding.
+
+Only what the EAD pipeline uses is decoded into typed structures; optional
+parts it does not need (regional extensions, extension additions) are skipped
+using their length prefixes.
+
+Supported messages:
+    - SPaT (MessageFrame id 19): decode_spat
+    - MAP (MessageFrame id 18): decode_map. Lane node lists are returned as
+      (N, 2) numpy arrays of (lon, lat) degrees, whatever the node encoding
+      (XY offsets or absolute lat/lon); road segments and data parameters are
+      not decoded.
+
+Example:
+    msg_id, value = decode_message_frame(frame)
+    if msg_id == MSG_SPAT:
+        spat = decode_spat(value)
+        for intersection in spat.intersections:
+            for movement in intersection.states:
+                print(intersection.id, movement.signal_group, movement.events[0].state)
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# J2735 DSRC message IDs
+MSG_MAP = 18
+MSG_SPAT = 19
+MSG_BSM = 20
+
+# TimeMark (1/10 s within the current hour) special values
+TIME_MARK_LEAP = 36000
+TIME_MARK_UNKNOWN = 36001
+
+# MovementPhaseState names, indexed by their enumerated value
+MOVEMENT_PHASE_STATES = (
+    "unavailable",
+    "dark",
+    "stop-Then-Proceed",
+    "stop-And-Remain",
+    "pre-Movement",
+    "permissive-Movement-Allowed",
+    "protected-Movement-Allowed",
+    "permissive-clearance",
+    "protected-clearance",
+    "caution-Conflicting-Traffic",
+)
+
+SpatMessage = namedtuple("SpatMessage", ["moy", "name", "intersections"])
+IntersectionState = namedtuple("IntersectionState", [
+    "id", "region", "revision", "status", "moy", "timestamp", "name", "states",
+])
+MovementState = namedtuple("MovementState", ["signal_group", "name", "events"])
+# Times are TimeMarks (1/10 s within the hour) or None if not sent
+MovementEvent = namedtuple("MovementEvent", [
+    "state", "start_time", "min_end_time", "max_end_time", "likely_time", "confidence", "next_time",
+])
+
+
+MapMessage = namedtuple("MapMessage", ["moy", "revision", "intersections"])
+IntersectionGeometry = namedtuple("IntersectionGeometry", [
+    "id", "region", "revision", "ref_lat", "ref_lon", "lane_width", "name", "lanes",
+])
+# directional_use is the LaneDirection bit string read as a number, as the RTMaps MAP decoder
+# reports it: 10.0 = ingress, 1.0 = egress, 11.0 = both. nodes are (lon, lat) degrees, stop-bar first
+GenericLane = namedtuple("GenericLane", [
+    "lane_id", "name", "ingress_approach", "egress_approach", "directional_use", "lane_type",
+    "maneuvers", "nodes", "connections",
+])
+Connection = namedtuple("Connection", ["lane", "maneuver", "signal_group", "remote_intersection", "connection_id"])
+
+# LaneTypeAttributes CHOICE alternatives
+LANE_TYPES = ("vehicle", "crosswalk", "bikeLane", "sidewalk", "median", "striping", "trackedVehicle", "parking")
+
+# Node-XY-20b .. Node-XY-32b: bits per coordinate (offsets in centimeters)
+NODE_XY_BITS = (10, 11, 12, 13, 14, 16)
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+
+class DecodeError(ValueError):
+    pass
+
+
+class BitReader:
+    """
+    MSB-first bit reader over a bytes object, with the UPER primitives J2735 needs.
+    """
+    __slots__ = ("data", "pos", "end")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0  # bit position
+        self.end = len(data) * 8
+
+    def bits(self, n: int) -> int:
+        if n == 0:
+            return 0
+        if self.pos + n > self.end:
+            raise DecodeError("unexpected end of message")
+        start = self.pos >> 3
+        stop = (self.pos + n + 7) >> 3
+        chunk = int.from_bytes(self.data[start:stop], "big")
+        shift = (stop << 3) - (self.pos + n)
+        self.pos += n
+        return (chunk >> shift) & ((1 << n) - 1)
+
+    def bit(self) -> bool:
+        return bool(self.bits(1))
+
+    def align(self):
+        self.pos = (self.pos + 7) & ~7
+
+    def constrained(self, lo: int, hi: int) -> int:
+        """
+        Constrained whole number lo..hi.
+        """
+        return lo + self.bits((hi - lo).bit_length())
+
+    def enumerated(self, count: int, extensible: bool = False) -> int:
+        if extensible and self.bit():
+            return count + self.normally_small()
+        return self.bits((count - 1).bit_length())
+
+    def normally_small(self) -> int:
+        if not self.bit():
+            return self.bits(6)
+        return int.from_bytes(self.octets(self.length()), "big")
+
+    def length(self) -> int:
+        """
+        Unconstrained length determinant (fragmented lengths are not used by J2735 messages).
+        """
+        first = self.bits(8)
+        if first & 0x80 == 0:
+            return first
+        if first & 0x40 == 0:
+            return ((first & 0x3F) << 8) | self.bits(8)
+        raise DecodeError("fragmented length determinant not supported")
+
+    def size(self, lo: int, hi: int) -> int:
+        """
+        Length of a SIZE(lo..hi) SEQUENCE OF / string.
+        """
+        return self.constrained(lo, hi) if hi > lo else lo
+
+    def octets(self, n: int) -> bytes:
+        return bytes(self.bits(8) for _ in range(n))
+
+    def open_type(self) -> bytes:
+        return self.octets(self.length())
+
+    def ia5_string(self, lo: int, hi: int) -> str:
+        return "".join(chr(self.bits(7)) for _ in range(self.size(lo, hi)))
+
+    def optional_bits(self, n: int) -> list:
+        return [self.bit() for _ in range(n)]
+
+    def skip_extensions(self):
+        """
+        Skip the extension additions of a SEQUENCE whose extension bit was set.
+        """
+        present = self.optional_bits(self.normally_small() + 1)
+        for flag in present:
+            if flag:
+                self.open_type()
+
+    def skip_regional(self):
+        """
+        Skip a SEQUENCE (SIZE(1..4)) OF RegionalExtension.
+        """
+        for _ in range(self.size(1, 4)):
+            self.bits(8)  # regionId
+            self.open_type()
+
+
+def decode_message_frame(frame: bytes) -> tuple:
+    """
+    Split a MessageFrame into its message ID and the encoded message.
+
+    Returns:
+        tuple: (message ID, UPER-encoded value bytes)
+    """
+    reader = BitReader(frame)
+    reader.bit()  # extension bit (no additions defined)
+    msg_id = reader.bits(15)
+    return msg_id, reader.open_type()
+
+
+def decode_spat(value: bytes) -> SpatMessage:
+    """
+    Decode an UPER-encoded SPAT message (the value of a MessageFrame with id 19).
+    """
+    r = BitReader(value)
+    extended = r.bit()
+    has_moy, has_name, has_regional = r.optional_bits(3)
+    moy = r.constrained(0, 527040) if has_moy else None
+    name = r.ia5_string(1, 63) if has_name else None
+    intersections = [_intersection_state(r) for _ in range(r.size(1, 32))]
+    if has_regional:
+        r.skip_regional()
+    if extended:
+        r.skip_extensions()
+    return SpatMessage(moy, name, intersections)
+
+
+def _intersection_state(r: BitReader) -> IntersectionState:
+    extended = r.bit()
+    has_name, has_moy, has_timestamp, has_lanes, has_assist, has_regional = r.optional_bits(6)
+    name = r.ia5_string(1, 63) if has_name else None
+    region, intersection_id = _intersection_reference(r)
+    revision = r.bits(7)
+    status = r.bits(16)
+    moy = r.constrained(0, 527040) if has_moy else None
+    timestamp = r.bits(16) if has_timestamp else None  # DSecond, ms within the minute
+    if has_lanes:
+        for _ in range(r.size(1, 16)):
+            r.bits(8)
+    states = [_movement_state(r) for _ in range(r.size(1, 255))]
+    if has_assist:
+        _skip_maneuver_assist_list(r)
+    if has_regional:
+        r.skip_regional()
+    if extended:
+        r.skip_extensions()
+    return IntersectionState(intersection_id, region, revision, status, moy, timestamp, name, states)
+
+
+def _intersection_reference(r: BitReader) -> tuple:
+    has_region = r.bit()
+    region = r.bits(16) if has_region else None
+    return region, r.bits(16)
+
+
+def _movement_state(r: BitReader) -> MovementState:
+    extended = r.bit()
+    has_name, has_assist, has_regional = r.optional_bits(3)
+    name = r.ia5_string(1, 63) if has_name else None
+    signal_group = r.bits(8)
+    events = [_movement_event(r) for _ in range(r.size(1, 16))]
+    if has_assist:
+        _skip_maneuver_assist_list(r)
+    if has_regional:
+        r.skip_regional()
+    if extended:
+        r.skip_extensions()
+    return MovementState(signal_group, name, events)
+
+
+def _movement_event(r: BitReader) -> MovementEvent:
+    extended = r.bit()
+    has_timing, has_speeds, has_regional = r.optional_bits(3)
+    state = r.enumerated(len(MOVEMENT_PHASE_STATES))
+    timing = (None,) * 6
+    if has_timing:
+        has_start, has_max, has_likely, has_confidence, has_next = r.optional_bits(5)
+        start_time = r.bits(16) if has_start else None
+        min_end_time = r.bits(16)
+        max_end_time = r.bits(16) if has_max else None
+        likely_time = r.bits(16) if has_likely else None
+        confidence = r.bits(4) if has_confidence else None
+        next_time = r.bits(16) if has_next else None
+        timing = (start_time, min_end_time, max_end_time, likely_time, confidence, next_time)
+    if has_speeds:
+        _skip_advisory_speed_list(r)
+    if has_regional:
+        r.skip_regional()
+    if extended:
+        r.skip_extensions()
+    return MovementEvent(state, *timing)
+
+
+def _skip_maneuver_assist_list(r: BitReader):
+    for _ in range(r.size(1, 16)):
+        extended = r.bit()
+        has_queue, has_storage, has_wait, has_ped, has_regional = r.optional_bits(5)
+        r.bits(8)  # connectionID
+        if has_queue:
+            r.constrained(0, 10000)
+        if has_storage:
+            r.constrained(0, 10000)
+        if has_wait:
+            r.bit()
+        if has_ped:
+            r.bit()
+        if has_regional:
+            r.skip_regional()
+        if extended:
+            r.skip_extensions()
+
+
+def _skip_advisory_speed_list(r: BitReader):
+    for _ in range(r.size(1, 16)):
+        extended = r.bit()
+        has_speed, has_confidence, has_distance, has_class, has_regional = r.optional_bits(5)
+        r.enumerated(4, extensible=True)  # AdvisorySpeedType
+        if has_speed:
+            r.constrained(0, 500)
+        if has_confidence:
+            r.bits(3)
+        if has_distance:
+            r.constrained(0, 10000)
+        if has_class:
+            r.bits(8)
+        if has_regional:
+            r.skip_regional()
+        if extended:
+            r.skip_extensions()
+
+
+def decode_map(value: bytes) -> MapMessage:
+    """
+    Decode an UPER-encoded MapData message (the value of a MessageFrame with id 18).
+    Only the intersections are decoded; everything after them is ignored.
+    """
+    r = BitReader(value)
+    r.bit()  # extension bit: additions come after the intersections, which is all we read
+    (has_moy, has_layer_type, has_layer_id, has_intersections,
+     _, _, _, _) = r.optional_bits(8)  # roadSegments, dataParameters, restrictionList, regional
+    moy = r.constrained(0, 527040) if has_moy else None
+    revision = r.bits(7)
+    if has_layer_type:
+        r.enumerated(8, extensible=True)
+    if has_layer_id:
+        r.constrained(0, 100)
+    intersections = [_intersection_geometry(r) for _ in range(r.size(1, 32))] if has_intersections else []
+    return MapMessage(moy, revision, intersections)
+
+
+def _intersection_geometry(r: BitReader) -> IntersectionGeometry:
+    extended = r.bit()
+    has_name, has_lane_width, has_speed_limits, has_preempt, has_regional = r.optional_bits(5)
+    name = r.ia5_string(1, 63) if has_name else None
+    region, intersection_id = _intersection_reference(r)
+    revision = r.bits(7)
+    ref_lat, ref_lon = _position3d(r)
+    lane_width = r.bits(15) if has_lane_width else None  # centimeters
+    if has_speed_limits:
+        _skip_speed_limit_list(r)
+    lanes = [_generic_lane(r, ref_lat, ref_lon) for _ in range(r.size(1, 255))]
+    if has_preempt:
+        for _ in range(r.size(1, 32)):
+            zone_extended = r.bit()
+            r.bits(8)  # RegionalExtension regionId
+            r.open_type()
+            if zone_extended:
+                r.skip_extensions()
+    if has_regional:
+        r.skip_regional()
+    if extended:
+        r.skip_extensions()
+    return IntersectionGeometry(intersection_id, region, revision, ref_lat, ref_lon, lane_width, name, lanes)
+
+
+def _position3d(r: BitReader) -> tuple:
+    """
+    Returns (lat, lon) in degrees; elevation is skipped.
+    """
+    extended = r.bit()
+    has_elevation, has_regional = r.optional_bits(2)
+    lat = r.constrained(-900000000, 900000001) * 1e-7
+    lon = r.constrained(-1799999999, 1800000001) * 1e-7
+    if has_elevation:
+        r.bits(16)
+    if has_regional:
+        r.skip_regional()
+    if extended:
+        r.skip_extensions()
+    return lat, lon
+
+
+def _skip_speed_limit_list(r: BitReader):
+    for _ in range(r.size(1, 9)):
+        r.enumerated(13, extensible=True)  # SpeedLimitType
+        r.bits(13)                         # Velocity
+
+
+def _generic_lane(r: BitReader, ref_lat: float, ref_lon: float) -> GenericLane:
+    extended = r.bit()
+    (has_name, has_ingress, has_egress, has_maneuvers,
+     has_connects, has_overlays, has_regional) = r.optional_bits(7)
+    lane_id = r.bits(8)
+    name = r.ia5_string(1, 63) if has_name else None
+    ingress_approach = r.bits(4) if has_ingress else None
+    egress_approach = r.bits(4) if has_egress else None
+
+    # LaneAttributes
+    has_attr_regional = r.bit()
+    directional_use = float(format(r.bits(2), "02b"))
+    r.bits(10)  # sharedWith
+    type_extended = r.bit()
+    if type_extended:
+        lane_type = "unknown"
+        r.normally_small()
+        r.open_type()
+    else:
+        lane_type = LANE_TYPES[r.bits(3)]
+        if lane_type == "vehicle":
+            if r.bit():  # BIT STRING (SIZE(8, ...)) beyond its root size
+                r.bits(r.length())
+            else:
+                r.bits(8)
+        else:
+            r.bits(16)
+    if has_attr_regional:
+        r.bits(8)
+        r.open_type()
+
+    maneuvers = r.bits(12) if has_maneuvers else None
+    nodes = _node_list(r, ref_lat, ref_lon)
+
+    connections = []
+    if has_connects:
+        for _ in range(r.size(1, 16)):
+            has_remote, has_signal_group, has_user_class, has_connection_id = r.optional_bits(4)
+            has_maneuver = r.bit()  # ConnectingLane
+            lane = r.bits(8)
+            maneuver = r.bits(12) if has_maneuver else None
+            remote = _intersection_reference(r)[1] if has_remote else None
+            signal_group = r.bits(8) if has_signal_group else None
+            if has_user_class:
+                r.bits(8)
+            connection_id = r.bits(8) if has_connection_id else None
+            connections.append(Connection(lane, maneuver, signal_group, remote, connection_id))
+    if has_overlays:
+        for _ in range(r.size(1, 5)):
+            r.bits(8)
+    if has_regional:
+        r.skip_regional()
+    if extended:
+        r.skip_extensions()
+    return GenericLane(lane_id, name, ingress_approach, egress_approach, directional_use, lane_type,
+                       maneuvers, nodes, connections)
+
+
+def _node_list(r: BitReader, ref_lat: float, ref_lon: float) -> np.ndarray:
+    """
+    NodeListXY to an (N, 2) array of (lon, lat) degrees. Computed lanes give an empty array.
+    """
+    if r.bit():  # NodeListXY extension alternative
+        r.normally_small()
+        r.open_type()
+        return np.zeros((0, 2))
+    if r.bit():  # computed lane: geometry derived from another lane, not used for matching
+        _skip_computed_lane(r)
+        return np.zeros((0, 2))
+
+    m_per_deg_lon = METERS_PER_DEGREE_LAT * math.cos(math.radians(ref_lat))
+    count = r.size(2, 63)
+    nodes = np.empty((count, 2))
+    lat, lon = ref_lat, ref_lon
+    for i in range(count):
+        extended = r.bit()
+        has_attributes = r.bit()
+        choice = r.bits(3)
+        if choice < len(NODE_XY_BITS):
+            n = NODE_XY_BITS[choice]
+            lo = -(1 << (n - 1))
+            x = lo + r.bits(n)  # centimeters east of the previous node
+            y = lo + r.bits(n)  # centimeters north of the previous node
+            lon += x / 100.0 / m_per_deg_lon
+            lat += y / 100.0 / METERS_PER_DEGREE_LAT
+        elif choice == 6:  # node-LatLon: absolute position
+            lon = r.constrained(-1799999999, 1800000001) * 1e-7
+            lat = r.constrained(-900000000, 900000001) * 1e-7
+        else:  # regional
+            r.bits(8)
+            r.open_type()
+        nodes[i] = lon, lat
+        if has_attributes:
+            _skip_node_attributes(r)
+        if extended:
+            r.skip_extensions()
+    return nodes
+
+
+def _skip_computed_lane(r: BitReader):
+    extended = r.bit()
+    has_rotate, has_scale_x, has_scale_y, has_regional = r.optional_bits(4)
+    r.bits(8)  # referenceLaneId
+    for _ in range(2):  # offsetXaxis, offsetYaxis
+        r.bits(16 if r.bit() else 12)
+    if has_rotate:
+        r.bits(15)
+    if has_scale_x:
+        r.bits(12)
+    if has_scale_y:
+        r.bits(12)
+    if has_regional:
+        r.skip_regional()
+    if extended:
+        r.skip_extensions()
+
+
+def _skip_node_attributes(r: BitReader):
+    extended = r.bit()
+    (has_local, has_disabled, has_enabled, has_data,
+     has_width, has_elevation, has_regional) = r.optional_bits(7)
+    if has_local:
+        for _ in range(r.size(1, 8)):
+            r.enumerated(12, extensible=True)
+    for present in (has_disabled, has_enabled):
+        if present:
+            for _ in range(r.size(1, 8)):
+                r.enumerated(38, extensible=True)
+    if has_data:
+        for _ in range(r.size(1, 8)):
+            if r.bit():  # extension alternative
+                r.normally_small()
+                r.open_type()
+                continue
+            choice = r.bits(3)
+            if choice in (0, 4):    # pathEndPointAngle, laneAngle
+                r.bits(9)
+            elif choice in (1, 2, 3):  # crown angles
+                r.bits(8)
+            elif choice == 5:       # speedLimits
+                _skip_speed_limit_list(r)
+            else:                   # regional
+                r.skip_regional()
+    if has_width:
+        r.bits(10)
+    if has_elevation:
+        r.bits(10)
+    if has_regional:
+        r.skip_regional()
+    if extended:
+        r.skip_extensions()
+
+
+def time_mark_remaining(time_mark, moy, timestamp_ms) -> float:
+    """
+    Seconds from the message time (MinuteOfTheYear + DSecond) until a TimeMark,
+    or None if either is unknown. TimeMarks wrap at the top of the hour.
+    """
+    if time_mark is None or time_mark >= TIME_MARK_LEAP or moy is None or timestamp_ms is None:
+        return None
+    now = (moy % 60) * 600 + timestamp_ms // 100  # 1/10 s within the hour
+    return ((time_mark - now) % 36000) / 10.0
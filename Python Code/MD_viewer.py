@@ -1,6 +1,16 @@
 import rtmaps.core as rt
 import rtmaps.types
 from rtmaps.base_component import BaseComponent
+import os
+import sys
+
+# Shared (RTMaps-independent) modules live next to this script
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import AsyncLog
+from CoreProfiler import CoreProfiler, profiled_core
+from HexCodec import DebugPrinter, bytes_to_hex
+
+log = AsyncLog.get_logger("MD_viewer")
 
 class rtmaps_python(BaseComponent):
     """
@@ -23,10 +33,20 @@ class rtmaps_python(BaseComponent):
         self.add_output("MAP_o", rtmaps.types.TEXT_ASCII)
         self.add_output("SPAT_o", rtmaps.types.TEXT_ASCII)
         self.add_output("BSM_o", rtmaps.types.TEXT_ASCII)
+        self.add_output("core_latency_us", rtmaps.types.FLOAT64)  # Core() profiling (profile_core): latest call duration
+        self.add_output("core_stats", rtmaps.types.FLOAT64)       # Core() profiling: CoreProfiler.CORE_STATS_FIELDS vector
+
+        self.add_property("debug_print", False)   # Print the hex messages
+        self.add_property("debug_interval", 1.0)  # Minimum seconds between debug prints
+        self.add_property("profile_core", False)     # Time Core() and count skipped work (CoreProfiler.py)
+        self.add_property("core_budget_ms", 100.0)  # Core() calls longer than this are counted as over budget
 
     def Birth(self):
-        print("Passing through Birth()")
+        log.info("Passing through Birth()")
+        self.debug = DebugPrinter(self.get_property("debug_print"), self.get_property("debug_interval"), name="MD_viewer")
+        self.profiler = CoreProfiler("MD_viewer", self.get_property("profile_core"), self.get_property("core_budget_ms"))
 
+    @profiled_core
     def Core(self):
             
         try:   
@@ -35,32 +55,35 @@ class rtmaps_python(BaseComponent):
             if input_index == 0:
                 map_hex = self.to_hex_string(self.inputs["MAP_i"].ioelt)
                 self.write("MAP_o", map_hex)
-                print("MAP:"+ map_hex)
+                if self.debug.enabled:
+                    self.debug(f"MAP:{map_hex}")
 
             elif input_index == 1:
                 spat_hex = self.to_hex_string(self.inputs["SPAT_i"].ioelt)
                 self.write("SPAT_o", spat_hex)
-                print("SPAT:"+ spat_hex)
+                if self.debug.enabled:
+                    self.debug(f"SPAT:{spat_hex}")
 
             elif input_index == 2:
                 bsm_hex = self.to_hex_string(self.inputs["BSM_i"].ioelt)
                 self.write("BSM_o", bsm_hex)
-                print("BSM:"+ bsm_hex)
+                if self.debug.enabled:
+                    self.debug(f"BSM:{bsm_hex}")
 
             elif input_index == -1:
-                print("Timeout reached — no new input")
+                log.info("Timeout reached — no new input")
+                self.profiler.early_return("timeout")
 
         except Exception as e:
-            print("Crash in Core():", e)
+            log.error("Crash in Core(): %s", e)
+            self.profiler.count("errors")
     
     def Death(self):
-        print("Passing through Death()")
+        if self.profiler.enabled:
+            log.info(self.profiler.summary())
+        log.info("Passing through Death()")
 
 # Helper function to convert an Ioelt's data (array of bytes) into a single hex string
     def to_hex_string(self, ioelt):
-        # If the ioelt exists, has a 'data' attribute, and isn't empty:
-        if ioelt and hasattr(ioelt, 'data') and len(ioelt.data) > 0:
-        # Convert each byte in the array to a two-digit hex string, then concatenate
-            return ''.join(format(byte, '02x') for byte in ioelt.data)
-        return" "
-    
\ No newline at end of file
+        # A missing or empty message gives " "
+        return bytes_to_hex(ioelt.data if ioelt else None)
@@ -0,0 +1,159 @@
+"""
+Cache of decoded MAP intersections for the map matcher.
+
+RSUs broadcast the same MAP at 10 Hz. Each stored intersection keeps the MAP
+revision (msgIssueRevision, when available) and a hash of its content, so a
+repeated broadcast is recognized without rebuilding lane geometry. The cache is
+persisted to a JSON file and loaded at startup, so previously seen
+intersections can be matched before the first MAP of a run is decoded. The file
+is written by a background thread, so storing an intersection never waits on the
+file system; close() writes the latest state before returning.
+
+Example:
+    cache = MapCache("map_cache.json")
+    for intersection_id, intersection in cache.items():
+        lane_index.set_intersection(intersection_id, intersection)
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+
+import AsyncLog
+
+log = AsyncLog.get_logger("MapCache")
+
+MAP_CACHE_VERSION = 1
+
+
+def content_hash(intersection: dict) -> str:
+    """
+    Stable hash of a stored intersection dictionary (see store_intersection_data in MapMatcher v2.py).
+    """
+    text = json.dumps(intersection, sort_keys=True)
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+class MapCache:
+
+    def __init__(self, path=None):
+        self.path = path  # None or "" keeps the cache in memory only
+        self.entries = {}  # intersection_id -> {"revision", "hash", "intersection"}
+        self.pending = queue.Queue(maxsize=1)  # Latest snapshot waiting to be written
+        self.thread = None
+        if self.path:
+            self.load()
+            self.thread = threading.Thread(target=self._run, name="MapCache", daemon=True)
+            self.thread.start()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, intersection_id):
+        return intersection_id in self.entries
+
+    def items(self):
+        return ((intersection_id, entry["intersection"]) for intersection_id, entry in self.entries.items())
+
+    def is_current_revision(self, intersection_id, revision) -> bool:
+        """
+        True if the intersection is cached with this MAP revision (None never matches).
+        """
+        entry = self.entries.get(intersection_id)
+        return revision is not None and entry is not None and entry["revision"] == revision
+
+    def current_hash(self, intersection_id):
+        """
+        Content hash of the cached intersection, or None if it is not cached.
+        """
+        entry = self.entries.get(intersection_id)
+        return None if entry is None else entry["hash"]
+
+    def update(self, intersection_id, intersection: dict, revision=None) -> bool:
+        """
+        Store an intersection unless the cached copy has the same content.
+
+        Returns:
+            bool: True if the intersection is new or changed (lane geometry must be rebuilt).
+        """
+        digest = content_hash(intersection)
+        entry = self.entries.get(intersection_id)
+        if entry is not None and entry["hash"] == digest:
+            if entry["revision"] != revision:
+                entry["revision"] = revision
+                self.save()
+            return False
+
+        self.entries[intersection_id] = {"revision": revision, "hash": digest, "intersection": intersection}
+        self.save()
+        return True
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable cache %s: %s", self.path, e)
+            return
+
+        if data.get("version") != MAP_CACHE_VERSION:
+            return
+        for entry in data["intersections"]:
+            intersection = entry["intersection"]
+            # JSON has no tuples: restore (lon, lat) node tuples
+            for lane in intersection["lanes"]:
+                lane["nodes"]["node_list"] = [tuple(node) for node in lane["nodes"]["node_list"]]
+            self.entries[entry["intersection_id"]] = {
+                "revision": entry["revision"],
+                "hash": entry["hash"],
+                "intersection": intersection,
+            }
+
+    def save(self):
+        """
+        Hand a snapshot of the entries to the writer thread. A snapshot that was not written yet is replaced.
+        """
+        if self.thread is None:
+            return
+        data = {
+            "version": MAP_CACHE_VERSION,
+            "intersections": [dict(intersection_id=intersection_id, **entry) for intersection_id, entry in self.entries.items()],
+        }
+        try:
+            self.pending.get_nowait()
+        except queue.Empty:
+            pass
+        self.pending.put_nowait(data)
+
+    def close(self, timeout=5.0):
+        """
+        Write the pending snapshot and stop the writer thread.
+        """
+        if self.thread is None:
+            return
+        try:
+            self.pending.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+        self.thread = None
+
+    def _run(self):
+        while True:
+            data = self.pending.get()
+            if data is None:
+                break
+            self.write(data)
+
+    def write(self, data):
+        # Write to a temporary file first so a crash never leaves a half-written cache
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            log.error("Could not save %s: %s", self.path, e)
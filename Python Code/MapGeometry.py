@@ -0,0 +1,188 @@
+"""
+Lane geometry shared by the map matcher.
+
+Lane geometry is prepared once when a MAP is stored, instead of on every GPS fix:
+    - LocalFrame: East-North plane (meters) around the intersection refPoint
+    - Lane: one ingress lane with its nodes in meters and cached segment headings/lengths
+    - LaneIndex: grid buckets over all stored lanes, so a GPS fix is only matched
+      against lanes near it instead of every lane of every intersection heard so far
+"""
+import math
+
+import numpy as np
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+# Directional use flag of ingress lanes in MAP
+INGRESS = 10.0
+
+
+class LocalFrame:
+    """
+    Local East-North projection centred on an intersection reference point.
+
+    An equirectangular projection with the longitude scale fixed at the reference
+    latitude; over the few hundred meters of a MAP the error is in the millimeters.
+    """
+    __slots__ = ("ref_lon", "ref_lat", "m_per_deg_lon", "m_per_deg_lat")
+
+    def __init__(self, ref_lon, ref_lat):
+        self.ref_lon = ref_lon  # degrees
+        self.ref_lat = ref_lat  # degrees
+        self.m_per_deg_lat = METERS_PER_DEGREE_LAT
+        self.m_per_deg_lon = METERS_PER_DEGREE_LAT * math.cos(math.radians(ref_lat))
+
+    @classmethod
+    def from_ref_point(cls, ref_point: dict):
+        """
+        Frame from a MAP refPoint dictionary ({"lat", "lon"} in 1e-7 degrees).
+        """
+        return cls(ref_point["lon"] * 1e-7, ref_point["lat"] * 1e-7)
+
+    def to_local(self, lon, lat):
+        """
+        (lon, lat) in degrees -> (east, north) in meters. Works on scalars and arrays.
+        """
+        return (lon - self.ref_lon) * self.m_per_deg_lon, (lat - self.ref_lat) * self.m_per_deg_lat
+
+    def to_global(self, east, north):
+        """
+        (east, north) in meters -> (lon, lat) in degrees.
+        """
+        return self.ref_lon + east / self.m_per_deg_lon, self.ref_lat + north / self.m_per_deg_lat
+
+
+class Lane:
+    """
+    One lane of a stored intersection, with geometry built once.
+
+    Attributes:
+        intersection_id: Intersection the lane belongs to
+        lane_id: Lane identifier within the intersection
+        directional_use: Lane directionality flag (10 = ingress)
+        nodes: List of (lon, lat) tuples in degrees, stop-bar first
+        frame: LocalFrame of the intersection
+        signal_groups: Signal groups controlling the lane's connections (empty if unknown)
+        xy: (N, 2) array of node (east, north) positions in meters
+        seg_headings: Heading (degrees) of each segment in the direction of travel (NaN for zero-length segments)
+        seg_lengths: Length (meters) of each segment
+        seg_vectors, cum_lengths: Segment vectors and cumulative length from the stop-bar, for projection
+        bounds: (min_lon, min_lat, max_lon, max_lat) of the nodes in degrees
+    """
+    __slots__ = ("intersection_id", "lane_id", "directional_use", "nodes", "frame", "signal_groups", "xy",
+                 "seg_vectors", "seg_lengths", "seg_headings", "cum_lengths", "bounds")
+
+    def __init__(self, intersection_id, lane_id, directional_use, nodes, frame=None, signal_groups=()):
+        self.intersection_id = intersection_id
+        self.lane_id = lane_id
+        self.directional_use = directional_use
+        self.nodes = list(nodes)
+        self.signal_groups = tuple(signal_groups)
+
+        lonlat = np.asarray(self.nodes, dtype=np.float64)
+        self.frame = frame if frame is not None else LocalFrame(lonlat[0, 0], lonlat[0, 1])
+        self.xy = np.column_stack(self.frame.to_local(lonlat[:, 0], lonlat[:, 1]))
+        self.bounds = tuple(float(v) for v in (*lonlat.min(axis=0), *lonlat.max(axis=0)))
+
+        # Segment i runs from node i to node i+1, i.e. away from the stop-bar
+        self.seg_vectors = np.diff(self.xy, axis=0)
+        self.seg_lengths = np.hypot(self.seg_vectors[:, 0], self.seg_vectors[:, 1])
+        self.cum_lengths = np.concatenate(([0.0], np.cumsum(self.seg_lengths)))
+
+        # The stop-bar is the first node of an ingress lane, so traffic moves against the node order
+        headings = (np.degrees(np.arctan2(-self.seg_vectors[:, 0], -self.seg_vectors[:, 1])) + 360) % 360
+        headings[self.seg_lengths == 0] = np.nan
+        self.seg_headings = headings
+
+    def project(self, east, north) -> tuple:
+        """
+        Closest point on the lane polyline to (east, north).
+
+        Returns:
+            tuple: (distance along the lane from the stop-bar, lateral distance), both in meters
+        """
+        rel = np.array((east, north)) - self.xy[:-1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.einsum("ij,ij->i", rel, self.seg_vectors) / self.seg_lengths ** 2
+        t = np.clip(np.nan_to_num(t), 0.0, 1.0)
+        offset = rel - t[:, None] * self.seg_vectors
+        lateral = np.hypot(offset[:, 0], offset[:, 1])
+        i = int(np.argmin(lateral))
+        return float(self.cum_lengths[i] + t[i] * self.seg_lengths[i]), float(lateral[i])
+
+    def point_at(self, along: float) -> np.ndarray:
+        """
+        (east, north) of the point `along` meters from the stop-bar, clamped to the lane.
+        """
+        along = min(max(along, 0.0), self.cum_lengths[-1])
+        i = min(int(np.searchsorted(self.cum_lengths, along, side="right")) - 1, len(self.seg_lengths) - 1)
+        if self.seg_lengths[i] == 0:
+            return self.xy[i]
+        return self.xy[i] + (along - self.cum_lengths[i]) / self.seg_lengths[i] * self.seg_vectors[i]
+
+
+class LaneIndex:
+    """
+    Grid bucket index of ingress lanes.
+
+    Each lane is registered in every grid cell its bounding box (grown by `margin`
+    meters) overlaps, so looking up the lanes near a GPS fix is one dict access.
+    """
+
+    def __init__(self, cell_size=0.001, margin=100.0):
+        self.cell_size = cell_size  # degrees (~100 m)
+        self.margin = margin        # meters around each lane that still count as "near"
+        self.lanes_by_intersection = {}
+        self.cells = {}
+
+    def __len__(self):
+        return sum(len(lanes) for lanes in self.lanes_by_intersection.values())
+
+    def set_intersection(self, intersection_id, intersection: dict):
+        """
+        (Re)build the lanes of one intersection from its stored MAP dictionary
+        (see store_intersection_data in MapMatcher v2.py).
+        """
+        ref_point = intersection.get("refPoint") or {}
+        frame = None
+        if ref_point.get("lat") is not None and ref_point.get("lon") is not None:
+            frame = LocalFrame.from_ref_point(ref_point)
+
+        lanes = []
+        for lane in intersection["lanes"]:
+            node_list = lane["nodes"]["node_list"]
+            # Only ingress lanes with at least two nodes can be matched
+            if lane["directionalUse"] != INGRESS or len(node_list) < 2:
+                continue
+            lanes.append(Lane(intersection_id, lane["lane_id"], lane["directionalUse"], node_list, frame,
+                              lane.get("signal_groups", ())))
+
+        self.lanes_by_intersection[intersection_id] = lanes
+        self._rebuild_cells()
+
+    def remove_intersection(self, intersection_id):
+        if self.lanes_by_intersection.pop(intersection_id, None) is not None:
+            self._rebuild_cells()
+
+    def candidates(self, lon, lat) -> list:
+        """
+        Returns the lanes whose (grown) bounding box contains the GPS fix.
+        """
+        return self.cells.get(self._cell(lon, lat), ())
+
+    def _cell(self, lon, lat):
+        return (math.floor(lon / self.cell_size), math.floor(lat / self.cell_size))
+
+    def _rebuild_cells(self):
+        # Intersections change rarely (new or updated MAP), so rebuild everything
+        self.cells = {}
+        for lanes in self.lanes_by_intersection.values():
+            for lane in lanes:
+                min_lon, min_lat, max_lon, max_lat = lane.bounds
+                margin_lat = self.margin / METERS_PER_DEGREE_LAT
+                margin_lon = self.margin / (METERS_PER_DEGREE_LAT * math.cos(math.radians(min_lat)))
+                x0, y0 = self._cell(min_lon - margin_lon, min_lat - margin_lat)
+                x1, y1 = self._cell(max_lon + margin_lon, max_lat + margin_lat)
+                for x in range(x0, x1 + 1):
+                    for y in range(y0, y1 + 1):
+                        self.cells.setdefault((x, y), []).append(lane)
@@ -2,16 +2,40 @@ import rtmaps.core as rt
 import rtmaps.types
 from rtmaps.base_component import BaseComponent  # Base class
 import math
-from shapely.geometry import LineString, Point
-from typing import List
+import os
+import sys
+import tempfile
+from collections import OrderedDict
+import numpy as np
 
-# Constants for conversion
-METERS_PER_DEGREE_LAT = 111320.0
+# Shared (RTMaps-independent) modules live next to this script
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from MapGeometry import LaneIndex
+from MapCache import MapCache
+from CoreProfiler import CoreProfiler, profiled_core
+import AsyncLog
+import J2735
+
+log = AsyncLog.get_logger("MapMatcher")
+
+# Distance the vehicle should be away from node (stopbar)
+STOPBAR_OFFSET = 3.0  # meters
+
+# Lane / node slots of the Intersection_1_Lane_X_Node_Y_* MAP inputs
+MAP_LANE_SLOTS = 6
+MAP_NODE_SLOTS = 4
+
+# MAP frames remembered for the repeat check (a few RSUs along a corridor, each rebroadcasting its MAP)
+RECENT_MAP_FRAMES = 16
 
 class rtmaps_python(BaseComponent):
     """
     RTMaps component that:
     1) Receives inputs:
+       - MAP_byte: UINTEGER8 vector with the raw J2735 MAP MessageFrame (see Hex_to_Byte.py), decoded here
+         with J2735.py: every intersection, lane and node of the message is stored. When it is not
+         connected, the per-field inputs below (from xpl_templates/J2735_MAP.xpl) are used instead,
+         which carry one intersection of up to 6 lanes with 4 nodes each.
        - latitude_gps: FLOAT64 representing the latitude of the GPS point (latitude)
        - longitude_gps: FLOAT64 representing the longitude of the GPS point (longitude)
        - longitude_refPoint: FLOAT64 representing the reference point (longitude, in microdegrees)
@@ -23,7 +47,8 @@ class rtmaps_python(BaseComponent):
        - Intersection_1_Lane_X_Node_2_delta_y: FLOAT64 representing the y offset of Lane X's end node (meters)
     2) Converts offsets to GPS coordinates (longitude, latitude) using an approximate conversion.
     3) Performs heading-based map matching.
-    4) Outputs the 'distance to arrival' (meters) from the current GPS point to the end of the matched link.
+    4) Outputs the 'distance to arrival' (meters) from the current GPS point to the end of the matched link,
+       and the matched intersection, lane and signal group.
     """
 
     def __init__(self):
@@ -39,6 +64,8 @@ class rtmaps_python(BaseComponent):
         self.add_input("longitude_refPoint", rtmaps.types.FLOAT64)
         self.add_input("latitude_refPoint", rtmaps.types.FLOAT64)
         self.add_input("intersectionID_MapData", rtmaps.types.FLOAT64)
+        self.add_input("revision_MapData", rtmaps.types.FLOAT64)  # Optional: MAP msgIssueRevision
+        self.add_input("MAP_byte", rtmaps.types.UINTEGER8)  # Optional: MAP MessageFrame, replaces the per-field MAP inputs
         self.add_input("Intersection_1_Lane_1_ID", rtmaps.types.FLOAT64)
         self.add_input("Intersection_1_Lane_1_directionalUse", rtmaps.types.FLOAT64)
         self.add_input("Intersection_1_Lane_1_Node_1_delta_lon", rtmaps.types.FLOAT64)
@@ -105,6 +132,14 @@ class rtmaps_python(BaseComponent):
         self.add_output("distance_to_arrival", rtmaps.types.FLOAT64)
         self.add_output("Lane_ID_matched", rtmaps.types.FLOAT64)
         self.add_output("Intersection_ID_matched", rtmaps.types.FLOAT64)
+        self.add_output("SignalGroup_matched", rtmaps.types.FLOAT64)  # Only written when the MAP gives the lane's signal group
+        self.add_output("core_latency_us", rtmaps.types.FLOAT64)  # Core() profiling (profile_core): latest call duration
+        self.add_output("core_stats", rtmaps.types.FLOAT64)       # Core() profiling: CoreProfiler.CORE_STATS_FIELDS vector
+
+        # MAP cache persisted between runs (empty to keep it in memory only)
+        self.add_property("map_cache_file", os.path.join(tempfile.gettempdir(), "ead_map_cache.json"))
+        self.add_property("profile_core", False)     # Time Core() and count skipped work (CoreProfiler.py)
+        self.add_property("core_budget_ms", 100.0)  # Core() calls longer than this are counted as over budget
 
     def Birth(self):
         """
@@ -112,35 +147,51 @@ class rtmaps_python(BaseComponent):
         """
         self.matchedID = None
         self.matchlane = None
-        self.intersections: dict = None
+        self.intersections: dict = {}
+        self.lane_index = LaneIndex()  # Prebuilt lane geometry, bucketed by location
+        self.last_map_ts = None
+        self.recent_map_frames = OrderedDict()  # frame bytes -> ((intersection_id, content hash), ...), most recent last
+        self.profiler = CoreProfiler("MapMatcher", self.get_property("profile_core"), self.get_property("core_budget_ms"))
+
+        # Input names of every MAP lane slot: (ID, directionalUse, [(delta_lon, delta_lat), ...])
+        self.lane_inputs = [
+            (f"Intersection_1_Lane_{lane}_ID",
+             f"Intersection_1_Lane_{lane}_directionalUse",
+             [(f"Intersection_1_Lane_{lane}_Node_{node}_delta_lon", f"Intersection_1_Lane_{lane}_Node_{node}_delta_lat")
+              for node in range(1, MAP_NODE_SLOTS + 1)])
+            for lane in range(1, MAP_LANE_SLOTS + 1)
+        ]
+
+        # Warm start: intersections seen in previous runs can be matched before the first MAP arrives
+        self.map_cache = MapCache(self.get_property("map_cache_file"))
+        for intersection_ID, intersection in self.map_cache.items():
+            self.store_intersection_data(intersection_ID, intersection, verbose=False)
+        if len(self.map_cache):
+            log.info("Loaded %d cached intersection(s): %s", len(self.map_cache), list(self.intersections))
         self.previousPoint: dict = None
         self.isFirst: bool = True
         self.stopbar: bool = False
         self.gps_heading = 0.0
         self.lateral_dist = float('inf')
 
+    @profiled_core
     def Core(self):
         """
         Main processing function called for every new input data sample.
         Processes available lanes (Lane 1 and Lane 3) and selects the first lane that passes
         the heading-based map matching, only if the lane's directional use is 10.
         """
-        # Verify essential GPS and reference inputs are available.
-        required_inputs = ["latitude_gps", "longitude_gps", 
-                        "latitude_refPoint", "longitude_refPoint"]
+        # Verify essential GPS inputs are available.
+        required_inputs = ["latitude_gps", "longitude_gps"]
         for key in required_inputs:
             if self.inputs[key].ioelt is None:
-                print(f"Missing attribute: {key}")
-                return
-            
-        if self.intersections is None:
-            self.intersections = {}
-            self.store_intersection_data()
-            print(self.intersections)
-        
-        intersection_ID = self.inputs["intersectionID_MapData"].ioelt.data
-        if intersection_ID not in self.intersections:
-            self.store_intersection_data()
+                log.warning("Missing attribute: %s", key)
+                return self.profiler.early_return("missing_gps")
+
+        if self.inputs["MAP_byte"].ioelt is not None:
+            self.update_map_from_frame()
+        elif self.inputs["intersectionID_MapData"].ioelt is not None:
+            self.update_map()
 
         latitude_gps = self.inputs["latitude_gps"].ioelt.data
         longitude_gps = self.inputs["longitude_gps"].ioelt.data
@@ -150,50 +201,55 @@ class rtmaps_python(BaseComponent):
         min_distance = float('inf')
         DISTANCE_THRESHOLD_POS = 100.0 
         DISTANCE_THRESHOLD_NEV = -50.0
+
+        # GPS heading is computed once per fix and compared against each lane's cached segment headings
+        gps_heading = None if self.isFirst else self.calculatePointsHeading(self.previousPoint, gps_point)
+        heading_matched = False
         
-        for intersection_id, data in self.intersections.items():
-            for lane in data["lanes"]:
-                # Skip lanes that are not ingress (directionalUse != 10)
-                if lane["directionalUse"] != 10.0:
-                    continue
-
-                node_list = lane["nodes"]["node_list"]  # Extract list of (lon, lat)
-                if len(node_list) < 2:
-                    continue  # Need at least two nodes to form a line
-
-                # Create the road geometry
-                line = LineString(node_list)
-                lateral_distance = line.distance(Point(longitude_gps, latitude_gps))
-                #print(f"land id: {lane["lane_id"]}, {lateral_distance}")
-
-                matched_link = self.map_matcher(gps_point, line)
-                if matched_link is None:
-                    continue  # Heading mismatch
-                
-                dta = self.calculate_distance_to_arrival(line, gps_point)
-                #print(f"lane id: {lane["lane_id"]}, {dta}")
-
-                if dta > DISTANCE_THRESHOLD_POS:
-                    continue
-                if dta < DISTANCE_THRESHOLD_NEV:                   
-                    continue
-
-
-                # Update best_match if it's the closest and within valid distance range
-                if dta < min_distance or (dta == min_distance and lateral_distance < self.best_lateral_dist):
-                    min_distance = dta
-                    self.best_lateral_dist = lateral_distance
-                    best_match = {
-                        "intersection_id": intersection_id,
-                        "lane_id": lane["lane_id"],
-                        "distance": dta,
-                    }
+        # Only ingress lanes near the GPS fix are considered (geometry is prebuilt when the MAP is stored)
+        for lane in self.lane_index.candidates(longitude_gps, latitude_gps):
+            # All lane math is done in meters in the intersection's local East-North frame
+            east, north = lane.frame.to_local(longitude_gps, latitude_gps)
+            along, lateral_distance = lane.project(east, north)
+            #print(f"land id: {lane.lane_id}, {lateral_distance}")
+
+            matched_link = self.map_matcher(gps_heading, lane)
+            if matched_link is None:
+                continue  # Heading mismatch
+            heading_matched = True
+            
+            dta = self.calculate_distance_to_arrival(lane, east, north, along)
+            #print(f"lane id: {lane.lane_id}, {dta}")
+
+            if dta > DISTANCE_THRESHOLD_POS:
+                continue
+            if dta < DISTANCE_THRESHOLD_NEV:                   
+                continue
+
+
+            # Update best_match if it's the closest and within valid distance range
+            if dta < min_distance or (dta == min_distance and lateral_distance < self.best_lateral_dist):
+                min_distance = dta
+                self.best_lateral_dist = lateral_distance
+                best_match = {
+                    "intersection_id": lane.intersection_id,
+                    "lane_id": lane.lane_id,
+                    "signal_groups": lane.signal_groups,
+                    "distance": dta,
+                }
+
+        # The fix only becomes the new reference point once it matched a lane heading
+        if heading_matched:
+            self.isFirst = False
+            self.previousPoint = gps_point
+            if gps_heading is not None:
+                self.gps_heading = gps_heading
 
         # Reset if vehicle out of range
         if best_match is None:
             self.matchedID = None
             self.matchedlane = None
-            return
+            return self.profiler.early_return("no_match")
 
         # Start up check
         if self.matchedID is None:
@@ -201,58 +257,43 @@ class rtmaps_python(BaseComponent):
             self.matchedlane = best_match["lane_id"]
         
         if self.matchedID != best_match["intersection_id"]:
-            print("new intersection")
+            log.info("New intersection %s", best_match["intersection_id"])
             self.matchedID = best_match["intersection_id"]
             self.matchedlane = best_match["lane_id"]
-            self.outputs["distance_to_arrival"].write(best_match["distance"])
-            self.outputs["Intersection_ID_matched"].write(best_match["intersection_id"])
-            self.outputs["Lane_ID_matched"].write(best_match["lane_id"])
+            self.write_match(best_match)
 
         elif self.matchedID == best_match["intersection_id"] and self.matchedlane == best_match["lane_id"]:
-            self.outputs["distance_to_arrival"].write(best_match["distance"])
-            self.outputs["Intersection_ID_matched"].write(best_match["intersection_id"])
-            self.outputs["Lane_ID_matched"].write(best_match["lane_id"])
+            self.write_match(best_match)
+
+    def write_match(self, best_match: dict):
+        self.outputs["distance_to_arrival"].write(best_match["distance"])
+        self.outputs["Intersection_ID_matched"].write(best_match["intersection_id"])
+        self.outputs["Lane_ID_matched"].write(best_match["lane_id"])
+        if best_match["signal_groups"]:
+            # A lane whose connections have different signal groups reports the first one
+            self.outputs["SignalGroup_matched"].write(best_match["signal_groups"][0])
 
     def Death(self):
-        print("Passing through Death()")
+        self.map_cache.close()  # Writes the cache file if an update is still pending
+        if self.profiler.enabled:
+            log.info(self.profiler.summary())
+        log.info("Passing through Death()")
 
-    def store_lane_data(self, lane_number: int) -> dict:
+    def read_lane_data(self, node_inputs: list) -> dict:
         """
         Helper to convert a lane's delta values into GPS coordinates.
         Returns a dictionary with:
             - Nodes with their GPS coordinates.
             - The number of nodes in the lane.
         """
-        lane_nodes = []# Dictionary to store node GPS coordinates
-        node_count = 1   # Start checking from Node_1
-
-        while True:
-            # Try to get the delta x and delta y for the current node
-            try:
-                dx = self.inputs[f"Intersection_1_Lane_{lane_number}_Node_{node_count}_delta_lon"].ioelt.data
-                dy = self.inputs[f"Intersection_1_Lane_{lane_number}_Node_{node_count}_delta_lat"].ioelt.data
-
-                # Ensure dx and dy are not None before processing
-                if dx is None or dy is None:
-                    break  # Stop if either delta is None
-            
-                # Convert deltas to GPS coordinates (longitude, latitude)
-                #lon, lat = self.convert_deltas_to_gps(dx, dy, longitude_refPoint, latitude_refPoint)
-
-                lon = dx*1e-7
-                lat = dy*1e-7 
-
-                # Append the coordinates to the list (no node name)
-                lane_nodes.append((lon, lat))
+        lane_nodes = []
+        for lon_input, lat_input in node_inputs:
+            dx = self.input_data(lon_input)
+            dy = self.input_data(lat_input)
+            if dx is None or dy is None:
+                break  # Stop at the first missing node
 
-                node_count += 1  # Move to the next node
-
-            except KeyError:
-                # If KeyError occurs (no more nodes), stop the loop
-                break
-            except AttributeError:
-                # If data is missing for a node (e.g., ioelt.data is None), stop the loop
-                break
+            lane_nodes.append((dx*1e-7, dy*1e-7))
 
         # Return the number of nodes along with the node coordinates
         return {
@@ -260,59 +301,24 @@ class rtmaps_python(BaseComponent):
             "node_list": lane_nodes
         }
 
-    def convert_deltas_to_gps(self, delta_lon: float, delta_lat: float,
-                              longitude_refPoint: float, latitude_refPoint: float) -> tuple:
-        """
-        Converts offsets in meters to approximate (longitude, latitude) coordinates.
-        The reference point is provided in microdegrees and is converted to degrees.
-        
-        Parameters:
-            delta_x: Offset in meters (affecting latitude)
-            delta_y: Offset in meters (affecting longitude)
-            longitude_refPoint: Reference longitude in microdegrees
-            latitude_refPoint: Reference latitude in microdegrees
-        
-        Returns:
-            A tuple (longitude, latitude) in degrees.
-        """
-        # Convert reference point from microdegrees to degrees.
-        ref_lat = latitude_refPoint * 1e-7
-        ref_lon = longitude_refPoint * 1e-7
-
-        # Convert meter offsets to degree offsets.
-        lat_offset = delta_lat / METERS_PER_DEGREE_LAT
-        lon_conversion_factor = self.get_lon_conversion_factor(ref_lat)
-        lon_offset = delta_lon / lon_conversion_factor
-
-        # Return GPS coordinates in (lon, lat) order.
-        return ref_lon + lon_offset, ref_lat + lat_offset
-
-    def get_lon_conversion_factor(self, lat: float) -> float:
+    def input_data(self, name: str):
         """
-        Computes the conversion factor for longitude given a latitude.
+        Latest data of an input, or None if nothing was received on it yet.
         """
-        return METERS_PER_DEGREE_LAT * math.cos(math.radians(lat))
+        ioelt = self.inputs[name].ioelt
+        return None if ioelt is None else ioelt.data
 
-    def map_matcher(self, gps_point: dict, road_link: dict) -> dict:
+    def map_matcher(self, gps_heading: float, lane):
         """
         Heading-based map matching:
-        - Skips the heading filter for the first GPS point.
-        - For subsequent points, it checks whether the heading aligns with the road link.
+        - Skips the heading filter for the first GPS point (gps_heading is None).
+        - For subsequent points, it checks whether the heading aligns with any segment of the lane.
         """
-
-        if self.isFirst:
-            self.isFirst = False  # Skip heading filter on the first point
-        else:
-            segments = self.split_to_segments(road_link)
-            gps_heading = self.calculatePointsHeading(self.previousPoint, gps_point)
-            if not any(self.headingFilter(segment, gps_heading, threshold=30) for segment in segments):
-                # Debug: log heading mismatch
-                #print(f"Heading filter dropped point: segment GPS heading {gps_heading:.2f}° not within threshold of link heading.")
-                return None
-            self.gps_heading = gps_heading
-
-        self.previousPoint = gps_point
-        return road_link
+        if gps_heading is not None and not self.headingFilter(lane.seg_headings, gps_heading, threshold=30):
+            # Debug: log heading mismatch
+            #print(f"Heading filter dropped point: segment GPS heading {gps_heading:.2f}° not within threshold of link heading.")
+            return None
+        return lane
 
     def calculatePointsHeading(self, previousPoint: dict, currentPoint: dict) -> float:
         """
@@ -332,68 +338,137 @@ class rtmaps_python(BaseComponent):
         y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(d_lon)
         return (math.degrees(math.atan2(x, y)) + 360) % 360
 
-    def headingFilter(self, line: LineString, GPSHeading: float, threshold: float = 45) -> bool:
+    def headingFilter(self, link_headings: np.ndarray, GPSHeading: float, threshold: float = 45) -> bool:
         """
-        Checks if the difference between the road link heading and the GPS heading
+        Checks if the difference between any road link segment heading and the GPS heading
         is within a given threshold (degrees). Returns True if within threshold.
+        Segment headings are cached per lane (see MapGeometry.Lane), zero-length segments (NaN) always pass.
         """
-        # Switched x0,y0 to line.coords[-1] and x1,y1 to line.coords[0] bc the end node of an ingress lane is the first node on the list - Hung
-        x0, y0 = line.coords[-1]
-        x1, y1 = line.coords[0]
-        # Calculate heading for the road link.
-        link_heading = self.calculatePointsHeading({"lat": y0, "lon": x0}, {"lat": y1, "lon": x1})
-        # Compute minimal angular difference.
-        diff = min(abs(link_heading - GPSHeading), 360 - abs(link_heading - GPSHeading))
+        # Compute minimal angular difference for all segments at once.
+        diff = np.abs(link_headings - GPSHeading)
+        diff = np.minimum(diff, 360 - diff)
         #print(diff)
-        return diff <= threshold
+        return bool(np.any((diff <= threshold) | np.isnan(link_headings)))
 
-    def calculate_distance_to_arrival(self, line: dict, current_gps_point: dict) -> float:
+    def calculate_distance_to_arrival(self, lane, east: float, north: float, along: float) -> float:
         """
-        Computes the distance (in meters) from the current GPS point to the stopbar (last point of the line)
+        Computes the distance (in meters) from the current GPS point to the stopbar (first node of the lane)
         following the actual path of the road. Returns negative distance if vehicle has passed the stopbar.
         
         Args:
-            line: A LineString object representing the road geometry (from last node to stopbar)
-            current_gps_point: Dictionary with 'lat' and 'lon' keys representing the current GPS position
+            lane: MapGeometry.Lane the vehicle is matched to
+            east, north: Current GPS position in the lane's local frame (meters)
+            along: Distance along the lane from the stopbar to the projected GPS position (meters)
             
         Returns:
             float: Distance in meters from current position to the stopbar following the road path.
                   Negative if vehicle has passed the stopbar.
         """
-        # Distance the vehicle should be away from node (stopbar)
-        STOPBAR_OFFSET = 3.0  # meters
-        # Convert the distance to meters using the latitude-based conversion
-        meters_per_degree = METERS_PER_DEGREE_LAT
-        
-        # Create Point object from current GPS position
-        gps_pt = Point(current_gps_point['lon'], current_gps_point['lat'])
-        
-        # Get the last point of the line (stopbar)
-        stopbar_pt = self.calculate_threshold_stopbar(line, STOPBAR_OFFSET)   
-        
-        # Calculate direct distance to stopbar
-        direct_distance = gps_pt.distance(stopbar_pt) * meters_per_degree
+        if along == 0.0:
+            # Projected onto the stopbar itself: the vehicle is past it, use the direct distance to the threshold point
+            threshold_pt = self.calculate_threshold_stopbar(lane, STOPBAR_OFFSET)
+            return -math.hypot(east - threshold_pt[0], north - threshold_pt[1])
 
-        #print(f"start_pt: {gps_pt} end_pt: {stopbar_pt}")
-        
-        # Get the distance along the line to the projected point
-        distance_along_line = line.project(gps_pt) * meters_per_degree - STOPBAR_OFFSET
-        
+        return along - STOPBAR_OFFSET
+    
+    def update_map(self):
+        """
+        Stores the MAP on the inputs if it is new or has changed.
+        A repeated broadcast is recognized without reparsing when the input timestamp or
+        the MAP revision is unchanged, otherwise by the content hash kept in the MAP cache.
+        """
+        map_ioelt = self.inputs["intersectionID_MapData"].ioelt
+        if map_ioelt.ts == self.last_map_ts:
+            return
+        self.last_map_ts = map_ioelt.ts
 
-        if distance_along_line == -(STOPBAR_OFFSET):
-            dta = - abs(direct_distance )
+        intersection_ID = map_ioelt.data
+        revision = self.input_data("revision_MapData")
+        if self.map_cache.is_current_revision(intersection_ID, revision):
+            self.profiler.count("skipped_intersections")
+            return
+
+        intersection_curr = self.read_intersection_data()
+        if self.map_cache.update(intersection_ID, intersection_curr, revision):
+            self.store_intersection_data(intersection_ID, intersection_curr)
         else:
-            dta = distance_along_line 
-            
-        return dta
-    
-    def store_intersection_data(self):
+            self.profiler.count("skipped_intersections")
+
+    def update_map_from_frame(self):
+        """
+        Decodes the MAP MessageFrame on MAP_byte and stores the intersections that are new or have changed,
+        with the same revision / content hash checks as update_map.
+        """
+        map_ioelt = self.inputs["MAP_byte"].ioelt
+        if map_ioelt.ts == self.last_map_ts:
+            return
+        self.last_map_ts = map_ioelt.ts
+
+        # MAPs are rebroadcast unchanged (by every RSU in range), so a frame seen recently is not decoded
+        # again while the intersections it carried are still cached with the same content
+        frame = bytes(map_ioelt.data)
+        seen = self.recent_map_frames.get(frame)
+        if seen is not None and all(self.map_cache.current_hash(i) == digest for i, digest in seen):
+            self.recent_map_frames.move_to_end(frame)
+            self.profiler.count("map_repeated")
+            return
+        self.profiler.count("map_decoded")
+
+        try:
+            msg_id, value = J2735.decode_message_frame(frame)
+            intersections = J2735.decode_map(value).intersections if msg_id == J2735.MSG_MAP else ()
+        except J2735.DecodeError as e:
+            log.warning("Undecodable MAP message: %s", e)
+            intersections = ()
+
+        self.update_intersections(intersections)
+        self.recent_map_frames[frame] = tuple((float(i.id), self.map_cache.current_hash(float(i.id))) for i in intersections)
+        self.recent_map_frames.move_to_end(frame)
+        if len(self.recent_map_frames) > RECENT_MAP_FRAMES:
+            self.recent_map_frames.popitem(last=False)
+
+    def update_intersections(self, intersections):
+        """
+        Store the decoded intersections (J2735.IntersectionGeometry) that are new or have changed.
+        """
+        for intersection in intersections:
+            intersection_ID = float(intersection.id)
+            if self.map_cache.is_current_revision(intersection_ID, intersection.revision):
+                self.profiler.count("skipped_intersections")
+                continue
+            intersection_curr = self.convert_intersection(intersection)
+            if self.map_cache.update(intersection_ID, intersection_curr, intersection.revision):
+                self.store_intersection_data(intersection_ID, intersection_curr)
+            else:
+                self.profiler.count("skipped_intersections")
+
+    def convert_intersection(self, intersection) -> dict:
+        """
+        Decoded J2735.IntersectionGeometry to the dictionary built by read_intersection_data,
+        with every lane and node, plus the signal groups of each lane's connections.
+        """
+        intersection_curr = {
+            "refPoint": {
+                "lat": round(intersection.ref_lat * 1e7),
+                "lon": round(intersection.ref_lon * 1e7)
+            },
+            "lanes": []
+        }
+        for lane in intersection.lanes:
+            node_list = [tuple(node) for node in lane.nodes.tolist()]
+            intersection_curr["lanes"].append({
+                "lane_id": float(lane.lane_id),
+                "directionalUse": lane.directional_use,
+                "nodes": {"node_count": len(node_list), "node_list": node_list},
+                "signal_groups": sorted({float(c.signal_group) for c in lane.connections if c.signal_group is not None}),
+            })
+        return intersection_curr
+
+    def read_intersection_data(self) -> dict:
         # --------------------------------------------------------
-        # This section parses and stores MAP data for intersections.
+        # This section parses MAP data for one intersection from the inputs.
         #
-        # self.intersections is a dictionary where:
-        # - The key is the intersection ID (e.g., 1002.0)
-        # - The value is a dictionary with:
+        # The returned dictionary contains:
         #    'refPoint': the reference latitude and longitude of the intersection
         #     (typically in microdegrees, as per MAP encoding)
         #    'lanes': a list of lane objects, where each lane object contains:
@@ -403,92 +478,46 @@ class rtmaps_python(BaseComponent):
         #            'node_count': the number of nodes along the lane
         #            'node_list': a list of (lon, lat) tuples in degrees
         # --------------------------------------------------------
-
-        intersection_ID = self.inputs["intersectionID_MapData"].ioelt.data
-        latitude_refPoint = self.inputs["latitude_refPoint"].ioelt.data
-        longitude_refPoint = self.inputs["longitude_refPoint"].ioelt.data
-
         intersection_curr = {
             "refPoint": {
-                "lat": latitude_refPoint,
-                "lon": longitude_refPoint
+                "lat": self.input_data("latitude_refPoint"),
+                "lon": self.input_data("longitude_refPoint")
             },
             "lanes": []
         }
 
-        lane_num = 1
-        while True:
-            try:
-                lane_id_input = f"Intersection_1_Lane_{lane_num}_ID"
-                if self.inputs[lane_id_input].ioelt.data == -1.0:
-                    break
-
-                LaneID = self.inputs[lane_id_input].ioelt.data
-                lane_data = self.store_lane_data(lane_num)  # Should return a dict with 'nodes' 
-                directional_key = f"Intersection_1_Lane_{lane_num}_directionalUse"
-
-
-                intersection_curr["lanes"].append({
-                    "lane_id": LaneID,
-                    "directionalUse": self.inputs[directional_key].ioelt.data , 
-                    "nodes": lane_data
-                })
+        for lane_id_input, directional_input, node_inputs in self.lane_inputs:
+            LaneID = self.input_data(lane_id_input)
+            directional_use = self.input_data(directional_input)
+            if LaneID is None or LaneID == -1.0 or directional_use is None:
+                break
 
-                lane_num += 1
+            intersection_curr["lanes"].append({
+                "lane_id": LaneID,
+                "directionalUse": directional_use,
+                "nodes": self.read_lane_data(node_inputs)
+            })
 
-            except KeyError:
-                break
-            except AttributeError:
-                break
+        return intersection_curr
 
-        # Store it in your global dictionary
+    def store_intersection_data(self, intersection_ID, intersection_curr: dict, verbose: bool = True):
+        # self.intersections is a dictionary where the key is the intersection ID (e.g., 1002.0)
+        # and the value is the dictionary built by read_intersection_data
         self.intersections[intersection_ID] = intersection_curr
-        print(f"[MapMatcher] Stored MAP for Intersection {intersection_ID}: {self.intersections[intersection_ID]}")
+        self.lane_index.set_intersection(intersection_ID, intersection_curr)
+        if verbose:
+            log.info("Stored MAP for Intersection %s (%d lanes)", intersection_ID, len(intersection_curr["lanes"]))
+            log.debug("Intersection %s: %s", intersection_ID, intersection_curr)
 
-    def calculate_threshold_stopbar(self, line: LineString, threshold_distance: float = 3.0) -> Point:
+    def calculate_threshold_stopbar(self, lane, threshold_distance: float = 3.0) -> np.ndarray:
         """
-        Computes the GPS coordinates of the threshold point (specified distance before the stopbar).
+        Computes the threshold point (specified distance before the stopbar).
         
         Args:
-            line: A LineString object representing the road geometry
+            lane: MapGeometry.Lane representing the road geometry
             threshold_distance: Distance in meters from the stopbar to consider as threshold (default: 3.0)
             
         Returns:
-            Point: The GPS coordinates of the threshold point
-        """
-        # Get the stopbar point (first node)
-        stopbar_pt = Point(line.coords[0])
-        #print(f"stop bar : {stopbar_pt}")
-        
-        # Create a point threshold_distance meters back along the line
-        # First, project the stopbar point onto the line to get its position
-        stopbar_position = line.project(stopbar_pt)
-
-        # Calculate the new position by moving threshold_distance meters back
-        meters_per_degree = METERS_PER_DEGREE_LAT
-        offset_degrees = threshold_distance / meters_per_degree
-        
-        # Get the new position along the line
-        new_position = stopbar_position + offset_degrees
-        
-        # Get the point at this new position
-        threshold_pt = line.interpolate(new_position)
-        
-        return threshold_pt
-    
-    def split_to_segments(self,line: dict) -> List[LineString]:
-        """
-        Splits a LineString into multiple 2-point LineStrings.
-
-        Args:
-            line: A shapely.geometry.LineString object
-
-        Returns:
-            List[LineString]: A list of 2-point LineStrings
+            np.ndarray: (east, north) of the threshold point in the lane's local frame (meters)
         """
-        line=list(line.coords)
-        segments = []
-        for i in range(len(line) - 1):
-            segment = LineString([line[i], line[i+1]])
-            segments.append(segment)
-        return segments
\ No newline at end of file
+        return lane.point_at(threshold_distance)
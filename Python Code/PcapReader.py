@@ -0,0 +1,133 @@
+"""
+Streaming pcap reader for SPaT/MAP/BSM replay (RTMaps-independent).
+
+The capture is memory-mapped and its record headers are parsed as they are
+reached, so packets are produced one at a time without loading the file:
+multi-hour captures start replaying immediately and use constant memory.
+Only classic pcap files (microsecond or nanosecond timestamps) are supported.
+
+Usage:
+    for ts, link_type, packet in read_pcap_records("capture.pcap"):
+        ...
+    for t, kind, frame in read_j2735_frames("capture.pcap"):  # kind: "map", "spat" or "bsm"
+        ...
+"""
+import mmap
+import struct
+
+from J2735 import MSG_BSM, MSG_MAP, MSG_SPAT
+
+# pcap link type for Ethernet frames
+LINKTYPE_ETHERNET = 1
+
+PCAP_HEADER_SIZE = 24
+PCAP_RECORD_HEADER_SIZE = 16
+MAGIC_MICROSECONDS = (b"\xd4\xc3\xb2\xa1", b"\xa1\xb2\xc3\xd4")
+MAGIC_NANOSECONDS = (b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d")
+
+J2735_KINDS = {MSG_MAP: "map", MSG_SPAT: "spat", MSG_BSM: "bsm"}
+
+
+def is_pcap(path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(4) in MAGIC_MICROSECONDS + MAGIC_NANOSECONDS
+
+
+def _read_header(f, path):
+    """
+    Returns (record header Struct, timestamp fraction scale, link type) of an open pcap file.
+    """
+    header = f.read(PCAP_HEADER_SIZE)
+    magic = header[:4]
+    if len(header) < PCAP_HEADER_SIZE or magic not in MAGIC_MICROSECONDS + MAGIC_NANOSECONDS:
+        raise ValueError(f"{path}: not a pcap file")
+    endian = "<" if magic in (MAGIC_MICROSECONDS[0], MAGIC_NANOSECONDS[0]) else ">"
+    ts_scale = 1e-9 if magic in MAGIC_NANOSECONDS else 1e-6
+    link_type = struct.unpack(endian + "I", header[20:24])[0]
+    return struct.Struct(endian + "IIII"), ts_scale, link_type
+
+
+def read_pcap_records(path):
+    """
+    Yield (timestamp, link_type, packet bytes) for every record of a classic pcap file.
+    A truncated last record (capture still being written) is ignored.
+    """
+    with open(path, "rb") as f:
+        record, ts_scale, link_type = _read_header(f, path)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            offset = PCAP_HEADER_SIZE
+            while offset + record.size <= size:
+                ts_sec, ts_frac, incl_len, _ = record.unpack_from(data, offset)
+                offset += record.size
+                if offset + incl_len > size:
+                    break
+                yield ts_sec + ts_frac * ts_scale, link_type, data[offset:offset + incl_len]
+                offset += incl_len
+
+
+def read_pcap_records_at(path, offsets):
+    """
+    Yield (timestamp, link_type, packet bytes) for the records starting at the given
+    byte offsets (see CaptureIndex.py), in the order given.
+    """
+    with open(path, "rb") as f:
+        record, ts_scale, link_type = _read_header(f, path)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for offset in offsets:
+                offset = int(offset)
+                ts_sec, ts_frac, incl_len, _ = record.unpack_from(data, offset)
+                offset += record.size
+                yield ts_sec + ts_frac * ts_scale, link_type, data[offset:offset + incl_len]
+
+
+def extract_j2735_frame(packet, link_type=LINKTYPE_ETHERNET):
+    """
+    Return (message_id, MessageFrame bytes) from an Ethernet/IPv4/UDP packet carrying
+    an (optionally IEEE 1609.2 unsecured) J2735 MessageFrame, or None.
+    """
+    if link_type != LINKTYPE_ETHERNET or len(packet) < 14:
+        return None
+
+    offset = 12
+    ether_type = int.from_bytes(packet[offset:offset + 2], "big")
+    while ether_type == 0x8100:  # VLAN tag
+        offset += 4
+        ether_type = int.from_bytes(packet[offset:offset + 2], "big")
+    offset += 2
+    if ether_type != 0x0800 or len(packet) < offset + 20:
+        return None
+
+    ihl = (packet[offset] & 0x0F) * 4
+    if packet[offset + 9] != 17:  # UDP only
+        return None
+    payload = packet[offset + ihl + 8:]
+
+    # IEEE 1609.2 Ieee1609Dot2Data: protocolVersion 3, unsecuredData
+    if len(payload) > 3 and payload[0] == 0x03 and payload[1] == 0x80:
+        length = payload[2]
+        start = 3
+        if length & 0x80:
+            n = length & 0x7F
+            length = int.from_bytes(payload[3:3 + n], "big")
+            start = 3 + n
+        payload = payload[start:start + length]
+
+    if len(payload) < 3:
+        return None
+    return int.from_bytes(payload[:2], "big"), bytes(payload)
+
+
+def read_j2735_frames(path):
+    """
+    Yield (t, "map" | "spat" | "bsm", frame bytes) events from a pcap capture,
+    t in seconds from the first J2735 message.
+    """
+    t_first = None
+    for ts, link_type, packet in read_pcap_records(path):
+        frame = extract_j2735_frame(packet, link_type)
+        if frame is None or frame[0] not in J2735_KINDS:
+            continue
+        if t_first is None:
+            t_first = ts
+        yield ts - t_first, J2735_KINDS[frame[0]], frame[1]
@@ -0,0 +1,138 @@
+"""
+Binary columnar log format for velocity profiles (.vprof) and its reader.
+
+File layout (little-endian):
+    - 56-byte header (PROFILE_HEADER below): magic b"VPRF", format version,
+      scenario number, sample count, t_start, g_e_curr, g_s_next, g_e_next, v_c
+    - time column: n_samples x float64 (seconds)
+    - velocity column: n_samples x float32 (km/h)
+
+Example:
+    records = read_profile_dir("Velocity profile")
+    for r in records:
+        print(r.scenario_n, r.v_c, r.velocity_kmh.max())
+"""
+import glob
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+PROFILE_MAGIC = b"VPRF"
+PROFILE_VERSION = 1
+PROFILE_EXTENSION = ".vprof"
+
+PROFILE_HEADER = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("scenario_n", "<u2"),
+    ("n_samples", "<u4"),
+    ("reserved", "<u4"),
+    ("t_start", "<f8"),
+    ("g_e_curr", "<f8"),
+    ("g_s_next", "<f8"),
+    ("g_e_next", "<f8"),
+    ("v_c", "<f8"),
+])
+
+# One loaded profile; time and velocity_kmh are views into the file contents (read-only and memory-mapped by read_profile)
+ProfileRecord = namedtuple("ProfileRecord", [
+    "path", "scenario_n", "t_start", "g_e_curr", "g_s_next", "g_e_next", "v_c", "time", "velocity_kmh",
+])
+
+
+def write_profile(filename, profile, scenario_n, t_start, g_e_curr, g_s_next, g_e_next, v_c):
+    """
+    Write an (N, 2) (time, km/h) profile array to a .vprof file.
+    """
+    profile = np.asarray(profile, dtype=np.float64).reshape(-1, 2)
+
+    header = np.zeros(1, dtype=PROFILE_HEADER)
+    header["magic"] = PROFILE_MAGIC
+    header["version"] = PROFILE_VERSION
+    header["scenario_n"] = scenario_n
+    header["n_samples"] = len(profile)
+    header["t_start"] = t_start
+    header["g_e_curr"] = g_e_curr
+    header["g_s_next"] = g_s_next
+    header["g_e_next"] = g_e_next
+    header["v_c"] = v_c
+
+    with open(filename, "wb") as f:
+        f.write(header.tobytes())
+        f.write(profile[:, 0].astype("<f8").tobytes())
+        f.write(profile[:, 1].astype("<f4").tobytes())
+
+
+def read_profile(path, mmap=True) -> ProfileRecord:
+    """
+    Read a single .vprof file. By default it is memory-mapped and the columns are only paged in
+    when accessed, but the map keeps the file open for as long as the record is alive. With
+    mmap=False the file is read into memory and closed.
+    """
+    buf = np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+    if len(buf) < PROFILE_HEADER.itemsize:
+        raise ValueError(f"{path}: file too short for a profile header")
+
+    header = buf[:PROFILE_HEADER.itemsize].view(PROFILE_HEADER)[0]
+    if header["magic"] != PROFILE_MAGIC:
+        raise ValueError(f"{path}: not a velocity profile file")
+    if header["version"] != PROFILE_VERSION:
+        raise ValueError(f"{path}: unsupported profile version {header['version']}")
+
+    n = int(header["n_samples"])
+    t_offset = PROFILE_HEADER.itemsize
+    v_offset = t_offset + 8 * n
+    if len(buf) < v_offset + 4 * n:
+        raise ValueError(f"{path}: truncated profile ({n} samples expected)")
+
+    return ProfileRecord(
+        path=path,
+        scenario_n=int(header["scenario_n"]),
+        t_start=float(header["t_start"]),
+        g_e_curr=float(header["g_e_curr"]),
+        g_s_next=float(header["g_s_next"]),
+        g_e_next=float(header["g_e_next"]),
+        v_c=float(header["v_c"]),
+        time=buf[t_offset:v_offset].view("<f8"),
+        velocity_kmh=buf[v_offset:v_offset + 4 * n].view("<f4"),
+    )
+
+
+def read_profile_dir(directory) -> list:
+    """
+    Read every .vprof file in a directory into memory, ordered by profile start time. No file stays
+    open: a test day writes thousands of profiles, more than the open file limit allows to map at once.
+    """
+    records = [read_profile(path, mmap=False) for path in glob.glob(os.path.join(directory, "*" + PROFILE_EXTENSION))]
+    records.sort(key=lambda r: r.t_start)
+    return records
+
+
+def read_legacy_json(path) -> ProfileRecord:
+    """
+    Read an old-style profile file (a header list followed by a sample list, concatenated as two JSON documents).
+    """
+    with open(path) as f:
+        text = f.read()
+
+    decoder = json.JSONDecoder()
+    base, end = decoder.raw_decode(text)
+    samples, _ = decoder.raw_decode(text, len(text) - len(text[end:].lstrip()))
+    base = base[0]
+
+    name = os.path.basename(path)
+    scenario_n = int(name.split("_")[1].split()[-1]) if name.startswith("profile_Scenario") else 0
+
+    return ProfileRecord(
+        path=path,
+        scenario_n=scenario_n,
+        t_start=samples[0]["time"] if samples else float("nan"),
+        g_e_curr=float(base["Current green window end"]),
+        g_s_next=float(base["Next green window start"]),
+        g_e_next=float(base["Next green window end"]),
+        v_c=float(base["Current Velocity:"].split()[0]),
+        time=np.array([s["time"] for s in samples], dtype=np.float64),
+        velocity_kmh=np.array([s["velocity_kmh"] for s in samples], dtype=np.float32),
+    )
@@ -0,0 +1,99 @@
+"""
+Background writer for velocity profiles generated by DM / DMTG.
+
+Profiles are handed to a bounded queue and written by a worker thread, so the
+RTMaps Core() thread never waits on the file system. A VelocityProfile can be
+submitted as is: it is sampled every PROFILE_DT seconds on the worker thread.
+When the queue is full the oldest pending profile is dropped in favour of the
+newest one (a recompute supersedes the profile it replaces) and the drop is
+counted. Profiles that cannot be sampled or written are counted as failed and
+logged; the worker keeps running.
+
+Profiles are stored in the binary .vprof format, see ProfileLog.py.
+"""
+import os
+import queue
+import threading
+
+import AsyncLog
+import ProfileLog
+from TrajectoryCore import SCENARIO_NUMBERS, VelocityProfile
+
+# Default output folder: "Velocity profile" at the repository root
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Velocity profile")
+
+log = AsyncLog.get_logger("Profile Writer")
+
+
+class ProfileWriter:
+
+    def __init__(self, save_dir=DEFAULT_PROFILE_DIR, max_pending=8):
+        self.save_dir = save_dir
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, name="ProfileWriter", daemon=True)
+        self.thread.start()
+
+    def submit(self, profile, scenario, t_start, g_e_curr, g_s_next, g_e_next, v_c) -> bool:
+        """
+        Queue a profile for writing without blocking.
+
+        Returns:
+            bool: False if an older pending profile had to be dropped to make room.
+        """
+        job = (profile, scenario, t_start, g_e_curr, g_s_next, g_e_next, v_c)
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except queue.Full:
+            pass
+
+        # Backpressure: replace the oldest pending profile with this one
+        try:
+            self.queue.get_nowait()
+            self.dropped += 1
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            self.dropped += 1
+        return False
+
+    def close(self, timeout=5.0):
+        """
+        Flush pending profiles and stop the worker thread.
+        """
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+
+    def summary(self) -> str:
+        return f"[Profile Writer] {self.written} written, {self.dropped} dropped, {self.failed} failed, {self.queue.qsize()} pending"
+
+    def _run(self):
+        try:
+            os.makedirs(self.save_dir, exist_ok=True)
+        except OSError as e:
+            # Keep running: every profile is counted as failed until the folder can be written
+            log.error("Could not create profile folder %s: %s", self.save_dir, e)
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            try:
+                self.write(*job)
+                self.written += 1
+            except Exception as e:  # Not only OSError: a bad profile must not stop the thread
+                self.failed += 1
+                log.error("Could not write profile: %r", e)
+
+    def write(self, profile, scenario, t_start, g_e_curr, g_s_next, g_e_next, v_c):
+        if isinstance(profile, VelocityProfile):
+            profile = profile.sample()
+        filename = os.path.join(self.save_dir, f"profile_{scenario}_start_{float(t_start)}_vel_{round(v_c,2)}{ProfileLog.PROFILE_EXTENSION}")
+        ProfileLog.write_profile(filename, profile, SCENARIO_NUMBERS.get(scenario, 0), t_start, g_e_curr, g_s_next, g_e_next, v_c)
@@ -0,0 +1,54 @@
+"""
+Replay pacing shared by the capture players (RTMaps-independent).
+
+ReplayClock maps capture timestamps to wall-clock time: at speed 1.0 events are
+released with the spacing they were recorded with, at speed 50.0 fifty times
+faster, and at speed 0 (or below) as fast as possible.
+
+Example:
+    clock = ReplayClock(speed=2.0)
+    for t, kind, frame in read_j2735_frames(path):
+        time.sleep(clock.delay(t))
+        ...
+"""
+import time
+
+
+class ReplayClock:
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.t_first = None
+        self.wall_start = None
+
+    def reset(self):
+        """
+        Restart pacing at the next event (after a seek or when a replay loops).
+        """
+        self.t_first = None
+        self.wall_start = None
+
+    def delay(self, t) -> float:
+        """
+        Seconds to wait before releasing the event recorded at capture time t (s).
+        """
+        if self.speed <= 0:
+            return 0.0
+        now = time.monotonic()
+        if self.t_first is None:
+            self.t_first = t
+            self.wall_start = now
+            return 0.0
+        return max((t - self.t_first) / self.speed - (now - self.wall_start), 0.0)
+
+
+def paced(events, speed=1.0):
+    """
+    Yield time-ordered (t, ...) events, sleeping so they come out at `speed` times their recorded rate.
+    """
+    clock = ReplayClock(speed)
+    for event in events:
+        wait = clock.delay(event[0])
+        if wait > 0:
+            time.sleep(wait)
+        yield event
@@ -0,0 +1,395 @@
+"""
+Headless replay harness for the EAD RTMaps components.
+
+Runs MapMatcher v2.py, GreenWindowEstimator.py and DM.py outside RTMaps by
+loading them against a minimal stand-in for the rtmaps Python API, then feeds
+them recorded (or synthetic) inputs as fast as the CPU allows, or paced at
+--replay-speed times the recorded rate. Every Core() call is timed so
+throughput regressions can be caught on a plain Linux box.
+
+Inputs:
+    - GPS: NAV-PVT fixes from a UBX capture (test_data_captures/rawgps.ubx, see UbxLog.py),
+      a synthetic constant-speed approach along the test lane (--gps approach), or a closed
+      loop (--gps closed-loop) where GPS_Generator.py follows the speed DM recommends through
+      Vel_Generator.py, both on a fixed simulated timestep
+    - SPaT/MAP: J2735 MessageFrames streamed from a pcap capture (test_data_captures/capture_data/*.pcap, see PcapReader.py),
+      fed as raw bytes to the MAP_byte / SPAT_byte inputs, which decode them (J2735.py).
+      Message arrival times come from the capture.
+Both streams start at t = 0 (shift the pcap with --v2x-offset) and are merged in
+time order (StreamMerge.py). Every input of a component gets the merged time as
+its timestamp, and DM's t_0 uses the same clock.
+
+Usage:
+    python ReplayHarness.py --gps approach --pcap ../test_data_captures/capture_data/V2X_Test_041525_SPaT_MAP.pcap
+    python ReplayHarness.py --ubx ../test_data_captures/rawgps.ubx --json results.json
+"""
+import argparse
+import importlib.util
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import types
+
+import numpy as np
+
+import AsyncLog
+from PcapReader import read_j2735_frames
+from ReplayClock import paced
+from StreamMerge import StreamMerger
+from UbxLog import UbxIndex
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+
+# Test lane used by GPS_Generator.py: ingress lane 1 of intersection 1002 in the V2X_Test capture MAP
+# (first and last node, stop-bar first)
+TEST_LANE_NODES = [(-117.3396957, 33.9757438), (-117.3386457, 33.9757505)]  # (lon, lat)
+TEST_APPROACH_START = (-117.3381457, 33.9757505)
+EARTH_RADIUS = 6371000  # meters
+
+
+# --------------------------------------------------------------------------
+# Stand-in for the rtmaps Python API (only what the components use)
+# --------------------------------------------------------------------------
+
+class Ioelt:
+    __slots__ = ("data", "ts")
+
+    def __init__(self, data, ts=0):
+        self.data = data
+        self.ts = ts
+
+
+class Input:
+    def __init__(self, name):
+        self.name = name
+        self.ioelt = None
+
+
+class Output:
+    def __init__(self, name):
+        self.name = name
+        self.ioelt = None
+        self.count = 0
+
+    def write(self, data, ts=0):
+        self.ioelt = Ioelt(data, ts)
+        self.count += 1
+
+
+class BaseComponent:
+    def __init__(self):
+        self.inputs = {}
+        self.outputs = {}
+        self.properties = {}
+        self.input_that_answered = -1
+
+    def add_input(self, name, data_type=None, *args, **kwargs):
+        self.inputs[name] = Input(name)
+
+    def add_output(self, name, data_type=None, *args, **kwargs):
+        self.outputs[name] = Output(name)
+
+    def add_property(self, name, value, *args, **kwargs):
+        # Values set by the harness before Dynamic() take precedence over defaults
+        self.properties.setdefault(name, value)
+
+    def get_property(self, name):
+        return self.properties[name]
+
+    def write(self, name, data, ts=0):
+        self.outputs[name].write(data, ts)
+
+    def sleep(self, seconds):
+        # Replays run as fast as possible
+        pass
+
+
+class _Types(types.ModuleType):
+    def __getattr__(self, name):
+        # rtmaps.types.FLOAT64 etc. are only used as opaque tags
+        return name
+
+
+def install_rtmaps_shim():
+    """
+    Register the stand-in rtmaps modules, unless the real RTMaps package is importable.
+    """
+    try:
+        import rtmaps.base_component  # noqa: F401
+        return False
+    except ImportError:
+        pass
+
+    rtmaps = types.ModuleType("rtmaps")
+    core = types.ModuleType("rtmaps.core")
+    base_component = types.ModuleType("rtmaps.base_component")
+    base_component.BaseComponent = BaseComponent
+    rtmaps.core = core
+    rtmaps.types = _Types("rtmaps.types")
+    rtmaps.base_component = base_component
+    sys.modules["rtmaps"] = rtmaps
+    sys.modules["rtmaps.core"] = core
+    sys.modules["rtmaps.types"] = rtmaps.types
+    sys.modules["rtmaps.base_component"] = base_component
+    return True
+
+
+def load_component(filename, properties=None):
+    """
+    Import an RTMaps PythonBridge script by file name and return its initialized rtmaps_python instance.
+    """
+    path = os.path.join(HERE, filename)
+    module_name = os.path.splitext(filename)[0].replace(" ", "_")
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    component = module.rtmaps_python()
+    component.properties.update(properties or {})
+    component.Dynamic()
+    return component
+
+
+def set_input(component, name, data, ts=0):
+    component.inputs[name].ioelt = Ioelt(data, ts)
+
+
+def read_output(component, name):
+    ioelt = component.outputs[name].ioelt
+    return None if ioelt is None else ioelt.data
+
+
+# --------------------------------------------------------------------------
+# Input sources. Each yields (t, kind, payload) with t in seconds from the start of its stream.
+# --------------------------------------------------------------------------
+
+def read_ubx_fixes(path):
+    """
+    Yield ("gps", (lat, lon, speed_kmh)) events from the NAV-PVT messages of a UBX capture.
+    """
+    index = UbxIndex(path)
+    try:
+        for fix in index.fixes():
+            yield fix.t, "gps", (fix.lat, fix.lon, fix.speed_kmh)
+    finally:
+        index.close()
+
+
+def approach_fixes(speed_kmh=40.0, rate_hz=10.0, overshoot_m=20.0):
+    """
+    Yield a constant-speed westbound approach along the test lane, ending past the stop-bar.
+    """
+    lon, lat = TEST_APPROACH_START
+    meters_per_deg_lon = (math.pi / 180) * EARTH_RADIUS * math.cos(math.radians(lat))
+    end_lon = TEST_LANE_NODES[0][0] - overshoot_m / meters_per_deg_lon
+    step = speed_kmh / 3.6 / rate_hz / meters_per_deg_lon
+
+    i = 0
+    while lon > end_lon:
+        yield i / rate_hz, "gps", (lat, lon, speed_kmh)
+        lon -= step
+        i += 1
+
+
+def closed_loop_fixes(replay, dt=0.1, duration=120.0, overshoot_m=20.0):
+    """
+    Yield GPS events of the closed loop DM -> Vel_Generator -> GPS_Generator -> MapMatcher,
+    stepped on GPS_Generator's simulated clock until the vehicle is past the stop-bar or duration
+    seconds have passed. Each step reads DM's latest output, so the events must be consumed in order.
+    """
+    gps = load_component("GPS_Generator.py", {"clock_mode": "fixed", "time_step": dt})
+    vel = load_component("Vel_Generator.py", {"time_step": dt})
+    gps.Birth()
+    vel.Birth()
+
+    meters_per_deg_lon = (math.pi / 180) * EARTH_RADIUS * math.cos(math.radians(TEST_LANE_NODES[0][1]))
+    end_lon = TEST_LANE_NODES[0][0] - overshoot_m / meters_per_deg_lon
+    try:
+        while True:
+            target = read_output(replay.dm, "v_t_kmh")
+            if target is not None:
+                set_input(vel, "feed", target)
+            vel.Core()
+            v_c = read_output(vel, "v_c")
+            set_input(gps, "v_c", v_c)
+            gps.Core()
+
+            t = read_output(gps, "t_sim") * 1e-6
+            lon = read_output(gps, "longitude")
+            if t > duration or lon < end_lon:
+                return
+            yield t, "gps", (read_output(gps, "latitude"), lon, v_c)
+    finally:
+        gps.Death()
+        vel.Death()
+
+
+# --------------------------------------------------------------------------
+# Replay
+# --------------------------------------------------------------------------
+
+class ComponentTimer:
+    """
+    Collects per-call Core() latencies for one component.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.samples_ns = []
+
+    def call(self, component):
+        start = time.perf_counter_ns()
+        component.Core()
+        self.samples_ns.append(time.perf_counter_ns() - start)
+
+    def summary(self) -> dict:
+        if not self.samples_ns:
+            return {"calls": 0}
+        lat_us = np.asarray(self.samples_ns, dtype=np.float64) * 1e-3
+        p50, p90, p99 = np.percentile(lat_us, [50, 90, 99])
+        return {
+            "calls": len(lat_us),
+            "samples_per_s": len(lat_us) / (lat_us.sum() * 1e-6),
+            "p50_us": p50,
+            "p90_us": p90,
+            "p99_us": p99,
+            "max_us": lat_us.max(),
+        }
+
+
+class Replay:
+
+    def __init__(self, profile_dir=None, map_cache_file="", profile_core=False, receding_horizon=False):
+        install_rtmaps_shim()
+        # By default the MAP cache is not persisted, so every replay starts without known intersections
+        profiling = {"profile_core": profile_core}
+        self.map_matcher = load_component("MapMatcher v2.py", {"map_cache_file": map_cache_file, **profiling})
+        self.gwe = load_component("GreenWindowEstimator.py", profiling)
+        self.dm = load_component("DM.py", {"profile_dir": profile_dir or tempfile.mkdtemp(prefix="ead_profiles_"),
+                                           "receding_horizon": receding_horizon, **profiling})
+        self.timers = {name: ComponentTimer(name) for name in ("MapMatcher", "GreenWindowEstimator", "DM")}
+        self.v_c = 0.0
+
+        for component in (self.map_matcher, self.gwe, self.dm):
+            component.Birth()
+
+    def run(self, events):
+        """
+        Feed time-ordered (t, kind, payload) events through the components.
+        """
+        for t, kind, payload in events:
+            t_us = int(t * 1e6)
+            if kind == "gps":
+                self.on_gps(t_us, payload)
+            elif kind == "map":
+                self.on_map(t_us, payload)
+            elif kind == "spat":
+                self.on_spat(t_us, payload)
+
+    def close(self):
+        for component in (self.map_matcher, self.gwe, self.dm):
+            component.Death()
+        AsyncLog.flush()  # Component messages are printed before the report
+
+    def on_map(self, t_us, frame):
+        # Decoded by the MapMatcher on its next GPS fix, as in RTMaps
+        set_input(self.map_matcher, "MAP_byte", np.frombuffer(frame, dtype=np.uint8), t_us)
+
+    def on_spat(self, t_us, frame):
+        gwe = self.gwe
+        set_input(gwe, "SPAT_byte", np.frombuffer(frame, dtype=np.uint8), t_us)
+        for name in ("Intersection_ID_matched", "SignalGroup_matched"):
+            matched = read_output(self.map_matcher, name)
+            if matched is not None:
+                set_input(gwe, name, matched, t_us)
+        self.timers["GreenWindowEstimator"].call(gwe)
+
+    def on_gps(self, t_us, fix):
+        lat, lon, speed_kmh = fix
+        self.v_c = speed_kmh
+        mm = self.map_matcher
+        set_input(mm, "latitude_gps", lat, t_us)
+        set_input(mm, "longitude_gps", lon, t_us)
+        if not mm.intersections and mm.inputs["MAP_byte"].ioelt is None:
+            return  # No MAP received or cached yet
+        self.timers["MapMatcher"].call(mm)
+
+        d_0 = read_output(mm, "distance_to_arrival")
+        windows = [read_output(self.gwe, name) for name in ("g_e_curr", "g_s_next", "g_e_next")]
+        if d_0 is None or None in windows:
+            return
+
+        dm = self.dm
+        set_input(dm, "d_0", d_0, t_us)
+        set_input(dm, "v_c", self.v_c, t_us)
+        set_input(dm, "t_0", t_us, t_us)
+        for name, value in zip(("g_e_curr", "g_s_next", "g_e_next"), windows):
+            set_input(dm, name, value, t_us)
+        self.timers["DM"].call(dm)
+
+    def report(self) -> dict:
+        return {name: timer.summary() for name, timer in self.timers.items()}
+
+
+def print_report(report, wall_time):
+    print(f"\n{'component':<22}{'calls':>8}{'samples/s':>12}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'max us':>10}")
+    for name, s in report.items():
+        if not s["calls"]:
+            print(f"{name:<22}{0:>8}")
+            continue
+        print(f"{name:<22}{s['calls']:>8}{s['samples_per_s']:>12.0f}{s['p50_us']:>10.1f}{s['p90_us']:>10.1f}{s['p99_us']:>10.1f}{s['max_us']:>10.1f}")
+    print(f"\nwall time: {wall_time:.2f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay GPS and SPaT/MAP captures through MapMatcher, GWE and DM without RTMaps.")
+    parser.add_argument("--gps", choices=("ubx", "approach", "closed-loop"), default="ubx", help="GPS source")
+    parser.add_argument("--ubx", default=os.path.join(REPO_ROOT, "test_data_captures", "rawgps.ubx"), help="UBX capture for --gps ubx")
+    parser.add_argument("--speed", type=float, default=40.0, help="approach speed in km/h for --gps approach")
+    parser.add_argument("--time-step", type=float, default=0.1, help="simulated timestep (s) for --gps closed-loop")
+    parser.add_argument("--duration", type=float, default=120.0, help="simulated seconds for --gps closed-loop")
+    parser.add_argument("--pcap", default=os.path.join(REPO_ROOT, "test_data_captures", "capture_data", "V2X_Test_041525_SPaT_MAP.pcap"), help="SPaT/MAP capture")
+    parser.add_argument("--v2x-offset", type=float, default=0.0, help="seconds added to the pcap timestamps to align them with the GPS stream")
+    parser.add_argument("--profile-dir", default=None, help="where DM saves profiles (default: a temporary folder)")
+    parser.add_argument("--replay-speed", type=float, default=0.0, help="pace events at this multiple of the recorded rate (default: 0, as fast as possible)")
+    parser.add_argument("--map-cache", default="", help="persist the MapMatcher MAP cache to this JSON file (default: off)")
+    parser.add_argument("--receding-horizon", action="store_true", help="DM checks its plan every tick and re-plans when it no longer fits, instead of on accumulated speed error")
+    parser.add_argument("--profile-core", action="store_true", help="enable the components' own Core() profiling (CoreProfiler.py), summarized at the end")
+    parser.add_argument("--json", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    replay = Replay(profile_dir=args.profile_dir, map_cache_file=args.map_cache, profile_core=args.profile_core,
+                    receding_horizon=args.receding_horizon)
+
+    if args.gps == "ubx":
+        gps = read_ubx_fixes(args.ubx)
+    elif args.gps == "approach":
+        gps = approach_fixes(args.speed)
+    else:
+        gps = closed_loop_fixes(replay, args.time_step, args.duration)
+
+    # GPS and V2X are read lazily and merged on one clock (wall time includes reading the captures)
+    merger = StreamMerger()
+    merger.add("gps", gps)
+    merger.add("v2x", read_j2735_frames(args.pcap), offset=args.v2x_offset)
+    start = time.perf_counter()
+    replay.run(paced(merger, args.replay_speed))
+    wall_time = time.perf_counter() - start
+    replay.close()
+    for name, late in merger.late.items():
+        if late:
+            print(f"{name}: {late} out-of-order event(s) held at the stream's latest time")
+
+    report = replay.report()
+    print_report(report, wall_time)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"wall_time_s": wall_time, "components": report}, f, indent=2, default=float)
+
+
+if __name__ == "__main__":
+    main()
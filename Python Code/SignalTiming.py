@@ -0,0 +1,405 @@
+"""
+Signal timing state for the Green Window Estimator (RTMaps-independent).
+
+Every SPaT sample (intersection, signal group, state, countdown) updates one
+SignalGroupTracker, whether or not the vehicle is matched to that intersection,
+so the green windows of the next intersection along a corridor are already known
+when the map matcher switches to it.
+
+Each tracker learns the duration of the phases it sees complete (green, yellow,
+red) and predicts the next N green windows from the current countdown and the
+learned durations of the phases that follow. Until a phase has been seen
+complete, its duration comes from the offline SignalTimingModel (trained from
+SPaT captures by SignalTimingTrainer.py), and only then from the fixed
+defaults. Countdown tick intervals are kept in a fixed-size ring buffer
+(TickStats) whose jitter tells how much the predicted windows can be trusted.
+
+Example:
+    timing = SignalTimingEstimator()
+    timing.update(62607.0, 2.0, t0, 6.0, 250)
+    timing.tracker_for(62607.0, 2.0).green_windows(t0, 3)  # [(0.0, 25.0), (125.0, 175.0), (275.0, 325.0)]
+"""
+import json
+import os
+
+import numpy as np
+
+import AsyncLog
+from J2735 import time_mark_remaining
+
+log = AsyncLog.get_logger("SignalTiming")
+
+# SAE J2735 MovementPhaseState names and their numeric values
+STATE_NUMBERS = {
+    "unavailable": 0.0,
+    "dark": 1.0,
+    "stop-Then-Proceed": 2.0,
+    "stop-And-Remain": 3.0,
+    "pre-Movement": 4.0,
+    "permissive-Movement-Allowed": 5.0,
+    "protected-Movement-Allowed": 6.0,
+    "permissive-clearance": 7.0,
+    "protected-clearance": 8.0,
+    "caution-Conflicting-Traffic": 9.0,
+}
+
+# Phase of each MovementPhaseState (unavailable/dark have no phase)
+PHASE_OF_STATE = {
+    2.0: "red", 3.0: "red",
+    4.0: "green", 5.0: "green", 6.0: "green",
+    7.0: "yellow", 8.0: "yellow", 9.0: "yellow",
+}
+NEXT_PHASE = {"green": "yellow", "yellow": "red", "red": "green"}
+
+COUNTDOWN_TICK = 0.1  # seconds per SPaT countdown tick
+GREEN_TICKS = 500     # default green duration in countdown ticks
+
+TICK_HISTORY = 20       # countdown tick intervals kept per signal group
+TICK_OUTLIER_SIGMA = 3.0
+MIN_TICK_STD = 0.01     # seconds; floor of the outlier band so a perfectly regular stream still accepts small jitter
+
+# Offline phase-duration model: "signal_timing_model.json" at the repository root
+DEFAULT_TIMING_MODEL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "signal_timing_model.json")
+TIMING_MODEL_VERSION = 1
+
+# Defaults used until a phase has been observed from start to end
+DEFAULT_PHASE_DURATIONS = {
+    "yellow": 50.0,  # yellow and red together: 100 s
+    "red": 50.0,     # 50 s of red after yellow
+}
+
+
+def state_name_to_number(state_name: str) -> float:
+    """
+    MovementPhaseState name (e.g. "stop-And-Remain") to its J2735 number, -1.0 if not recognized.
+    """
+    return STATE_NUMBERS.get(state_name.strip(), -1.0)
+
+
+class PhaseStats:
+    """
+    Running mean of the observed durations of one phase.
+    """
+    __slots__ = ("count", "mean")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+
+    def add(self, duration):
+        self.count += 1
+        self.mean += (duration - self.mean) / self.count
+
+
+class TickStats:
+    """
+    Fixed-size ring buffer of countdown tick intervals with running mean/variance.
+
+    Updates are O(1): the running sums are adjusted for the sample that is
+    overwritten, and recomputed from the buffer once per wrap to avoid drift.
+    Intervals further than `outlier_sigma` standard deviations from the mean
+    (e.g. a missed SPaT message) are rejected; if half a buffer of consecutive
+    samples is rejected the tick rate really changed and the buffer restarts.
+    """
+    __slots__ = ("buffer", "count", "index", "sum", "sum_sq", "outlier_sigma", "min_samples", "rejected", "rejected_run")
+
+    def __init__(self, size=TICK_HISTORY, outlier_sigma=TICK_OUTLIER_SIGMA, min_samples=5):
+        self.buffer = np.zeros(size, dtype=np.float64)
+        self.count = 0
+        self.index = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.outlier_sigma = outlier_sigma
+        self.min_samples = min_samples
+        self.rejected = 0      # total rejected intervals
+        self.rejected_run = 0  # consecutive rejected intervals
+
+    def __len__(self):
+        return self.count
+
+    def add(self, interval) -> bool:
+        """
+        Add one tick interval (s). Returns False if it was rejected as an outlier.
+        """
+        if interval <= 0.0 or self.is_outlier(interval):
+            self.rejected += 1
+            self.rejected_run += 1
+            if self.rejected_run < len(self.buffer) // 2:
+                return False
+            self.clear()
+            if interval <= 0.0:
+                return False
+        self.rejected_run = 0
+
+        size = len(self.buffer)
+        if self.count == size:
+            old = self.buffer[self.index]
+            self.sum -= old
+            self.sum_sq -= old * old
+        else:
+            self.count += 1
+        self.buffer[self.index] = interval
+        self.sum += interval
+        self.sum_sq += interval * interval
+        self.index = (self.index + 1) % size
+
+        if self.index == 0:
+            self.sum = float(self.buffer.sum())
+            self.sum_sq = float(np.dot(self.buffer, self.buffer))
+        return True
+
+    def is_outlier(self, interval) -> bool:
+        if self.count < self.min_samples:
+            return False
+        return abs(interval - self.mean()) > self.outlier_sigma * max(self.std(), MIN_TICK_STD)
+
+    def clear(self):
+        self.count = 0
+        self.index = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else float("nan")
+
+    def variance(self) -> float:
+        if self.count < 2:
+            return float("nan")
+        mean = self.sum / self.count
+        return max(self.sum_sq / self.count - mean * mean, 0.0)
+
+    def std(self) -> float:
+        return self.variance() ** 0.5
+
+
+class SignalTimingModel:
+    """
+    Phase-duration distributions per intersection and signal group, learned
+    offline from SPaT captures (see SignalTimingTrainer.py).
+
+    Lookups are a single dict access; the median duration is used as the prediction.
+    Entries with signal_group None pool all signal groups of an intersection and are
+    used when the signal group is not known to the model.
+    """
+
+    def __init__(self, phases=None, sources=()):
+        self.phases = phases or {}  # (intersection_id, signal_group, phase) -> stats dict
+        self.sources = list(sources)
+
+    def __len__(self):
+        return len(self.phases)
+
+    def duration(self, intersection_id, signal_group, phase):
+        """
+        Median duration (s) of a phase, or None if the model has not seen it.
+        """
+        intersection_id = int(intersection_id)
+        stats = None
+        if signal_group is not None:
+            stats = self.phases.get((intersection_id, int(signal_group), phase))
+        if stats is None:
+            stats = self.phases.get((intersection_id, None, phase))
+        return None if stats is None else stats["p50"]
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != TIMING_MODEL_VERSION:
+            raise ValueError(f"{path}: unsupported signal timing model version {data.get('version')}")
+
+        phases = {}
+        for entry in data["signal_groups"]:
+            for phase, stats in entry["phases"].items():
+                phases[(entry["intersection_id"], entry["signal_group"], phase)] = stats
+        return cls(phases, data.get("sources", ()))
+
+    def save(self, path):
+        groups = {}
+        # Pooled (signal_group None) entries first within each intersection
+        ordered = sorted(self.phases.items(), key=lambda item: (item[0][0], -1 if item[0][1] is None else item[0][1], item[0][2]))
+        for (intersection_id, signal_group, phase), stats in ordered:
+            entry = groups.setdefault((intersection_id, signal_group), {
+                "intersection_id": intersection_id, "signal_group": signal_group, "phases": {},
+            })
+            entry["phases"][phase] = stats
+        with open(path, "w") as f:
+            json.dump({"version": TIMING_MODEL_VERSION, "sources": self.sources, "signal_groups": list(groups.values())}, f, indent=2)
+
+
+def load_timing_model(path):
+    """
+    Load the offline model if the file exists, otherwise (or if unreadable) return None.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return SignalTimingModel.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        log.warning("Ignoring signal timing model %s: %s", path, e)
+        return None
+
+
+class SignalGroupTracker:
+    """
+    State of one signal group of one intersection.
+    """
+
+    def __init__(self, intersection_id, signal_group, model=None):
+        self.intersection_id = intersection_id
+        self.signal_group = signal_group
+        # Offline model durations (None if unknown), looked up once per signal group
+        self.prior = {phase: model.duration(intersection_id, signal_group, phase) if model is not None else None
+                      for phase in NEXT_PHASE}
+        self.state = None        # Latest MovementPhaseState number
+        self.phase = None        # "green", "yellow", "red" or None
+        self.t_update = None     # Time of the latest sample (s)
+        self.t_change = None     # Predicted end of the current phase (s)
+        self.phase_start = None  # Observed start of the current phase (s), None if it started before we listened
+        self.durations = {phase: PhaseStats() for phase in NEXT_PHASE}
+
+        # Countdown tick timing
+        self.last_cd_tick = None
+        self.last_tick_time = None
+        self.ticks = TickStats()
+
+    def update(self, t0, state, countdown):
+        """
+        Feed one SPaT sample: t0 in seconds, state as a MovementPhaseState number, countdown in ticks.
+        """
+        if countdown != self.last_cd_tick:
+            if self.last_tick_time is not None:
+                self.ticks.add(t0 - self.last_tick_time)
+            self.last_cd_tick = countdown
+            self.last_tick_time = t0
+
+        phase = PHASE_OF_STATE.get(state)
+        if phase != self.phase:
+            # A phase that was seen from start to end teaches us its duration
+            if self.phase is not None and self.phase_start is not None:
+                self.durations[self.phase].add(t0 - self.phase_start)
+            self.phase_start = t0 if self.phase is not None else None
+            self.phase = phase
+
+        self.state = state
+        self.t_update = t0
+        self.t_change = t0 + countdown * COUNTDOWN_TICK
+
+    def avg_tick_duration(self) -> float:
+        """
+        Averaged countdown tick interval (s), 0.1 until enough ticks were seen.
+        """
+        avg_tick_duration = self.ticks.mean() if len(self.ticks) else 0.1
+        # Low-pass filter
+        if avg_tick_duration < 0.08:
+            avg_tick_duration = 0.1
+        return avg_tick_duration
+
+    def tick_jitter(self) -> float:
+        """
+        Standard deviation of the countdown tick interval (s), NaN until two ticks were seen.
+        Large jitter means the predicted windows should be trusted less.
+        """
+        return self.ticks.std()
+
+    def phase_duration(self, phase) -> float:
+        """
+        Learned duration of a phase (s). Phases never observed completely come from the
+        offline model, or from the defaults if the model does not know this signal group.
+        """
+        stats = self.durations[phase]
+        if stats.count:
+            return stats.mean
+        if self.prior[phase] is not None:
+            return self.prior[phase]
+        if phase == "green":
+            return GREEN_TICKS * self.avg_tick_duration()
+        return DEFAULT_PHASE_DURATIONS[phase]
+
+    def green_windows(self, t0, n) -> list:
+        """
+        Next n green windows as (start, end) tuples in seconds relative to t0.
+        If the signal is green at t0 the first window is the current one, starting at 0.
+
+        Returns an empty list if the signal state is unavailable, dark or unknown.
+        """
+        if self.phase is None:
+            return []
+
+        windows = []
+        phase = self.phase
+        cursor = max(self.t_change - t0, 0.0)
+        if phase == "green":
+            windows.append((0.0, cursor))
+
+        while len(windows) < n:
+            phase = NEXT_PHASE[phase]
+            duration = self.phase_duration(phase)
+            if phase == "green":
+                windows.append((cursor, cursor + duration))
+            cursor += duration
+        return windows
+
+
+class SignalTimingEstimator:
+    """
+    SignalGroupTracker for every (intersection, signal group) heard in the SPaT stream.
+    """
+
+    def __init__(self, model=None):
+        self.model = model
+        self.trackers = {}  # (intersection_id, signal_group) -> SignalGroupTracker
+        self.groups = {}    # intersection_id -> {signal_group (None if not known): SignalGroupTracker}
+
+    def update(self, intersection_id, signal_group, t0, state, countdown) -> SignalGroupTracker:
+        key = (intersection_id, signal_group)
+        tracker = self.trackers.get(key)
+        if tracker is None:
+            tracker = self.trackers[key] = SignalGroupTracker(intersection_id, signal_group, self.model)
+            self.groups.setdefault(intersection_id, {})[signal_group] = tracker
+        tracker.update(t0, state, countdown)
+        return tracker
+
+    def update_spat(self, t0, spat):
+        """
+        Feed every movement of a decoded SPaT message (J2735.SpatMessage) received at t0 (s).
+        The countdown is the time to the movement's minEndTime when the intersection carries
+        its own time (moy + timeStamp); otherwise minEndTime is taken as a countdown in ticks.
+        """
+        for intersection in spat.intersections:
+            intersection_id = float(intersection.id)
+            for movement in intersection.states:
+                event = movement.events[0]
+                remaining = time_mark_remaining(event.min_end_time, intersection.moy, intersection.timestamp)
+                if remaining is not None:
+                    countdown = round(remaining / COUNTDOWN_TICK)
+                else:
+                    countdown = event.min_end_time or 0
+                self.update(intersection_id, float(movement.signal_group), t0, float(event.state), countdown)
+
+    def signal_groups(self, intersection_id) -> list:
+        """
+        Signal groups heard for an intersection (None: samples without a signal group).
+        """
+        return sorted(self.groups.get(intersection_id, ()), key=lambda group: -1 if group is None else group)
+
+    def tracker_for(self, intersection_id, signal_group=None):
+        """
+        Tracker of a signal group. When the group is not known, the tracker of the intersection's
+        only signal group; None if nothing was heard yet, or if the intersection broadcasts several
+        groups (the windows would switch between movements from one message to the next).
+
+        Samples fed without a signal group (per-field SPaT inputs with SignalGroup_SPaT not wired)
+        are kept under None; if that is all that was heard for the intersection, it also serves
+        a known signal group (e.g. the matched lane's group from the MAP).
+        """
+        groups = self.groups.get(intersection_id)
+        if groups is None:
+            return None
+        if signal_group is not None:
+            tracker = groups.get(signal_group)
+            if tracker is not None or list(groups) != [None]:
+                return tracker
+        if len(groups) == 1:
+            return next(iter(groups.values()))
+        return None
@@ -0,0 +1,119 @@
+"""
+Offline trainer for the signal timing model used by GreenWindowEstimator.py.
+
+Scans SPaT messages in pcap captures, measures how long every phase (green,
+yellow, red) of every intersection / signal group lasted, and writes the
+per-signal-group duration distributions to a JSON model (SignalTiming.SignalTimingModel).
+Only phases seen from start to end are counted; a phase interrupted by a gap
+in the capture (no SPaT for that signal group for `max_gap` seconds) is discarded.
+
+Usage:
+    python SignalTimingTrainer.py ../test_data_captures/capture_data/*.pcap
+    python SignalTimingTrainer.py capture.pcap --output my_model.json
+"""
+import argparse
+import os
+from collections import defaultdict
+
+import numpy as np
+
+import J2735
+from PcapReader import read_j2735_frames
+from SignalTiming import DEFAULT_TIMING_MODEL, PHASE_OF_STATE, SignalTimingModel
+
+MAX_GAP = 2.0  # seconds without SPaT after which the running phase is not measured
+
+
+def phase_durations(frames, max_gap=MAX_GAP) -> dict:
+    """
+    Completed phase durations from time-ordered (t, kind, frame) events (see PcapReader.read_j2735_frames).
+
+    Returns:
+        dict: (intersection_id, signal_group) -> {phase: [durations in seconds]}
+    """
+    durations = defaultdict(lambda: defaultdict(list))
+    running = {}  # (intersection_id, signal_group) -> (phase, phase start or None, last sample time)
+
+    for t, kind, frame in frames:
+        if kind != "spat":
+            continue
+        try:
+            spat = J2735.decode_spat(J2735.decode_message_frame(frame)[1])
+        except J2735.DecodeError:
+            continue
+
+        for intersection in spat.intersections:
+            for movement in intersection.states:
+                key = (intersection.id, movement.signal_group)
+                phase = PHASE_OF_STATE.get(float(movement.events[0].state))
+                previous = running.get(key)
+
+                if previous is None or t - previous[2] > max_gap:
+                    running[key] = (phase, None, t)  # Start of this phase not observed
+                elif phase != previous[0]:
+                    if previous[0] is not None and previous[1] is not None:
+                        durations[key][previous[0]].append(t - previous[1])
+                    running[key] = (phase, t, t)
+                else:
+                    running[key] = (phase, previous[1], t)
+    return durations
+
+
+def summarize(samples) -> dict:
+    samples = np.asarray(samples, dtype=np.float64)
+    p10, p50, p90 = np.percentile(samples, (10, 50, 90))
+    return {
+        "count": int(len(samples)),
+        "mean": round(float(samples.mean()), 2),
+        "std": round(float(samples.std()), 2),
+        "min": round(float(samples.min()), 2),
+        "p10": round(float(p10), 2),
+        "p50": round(float(p50), 2),
+        "p90": round(float(p90), 2),
+        "max": round(float(samples.max()), 2),
+    }
+
+
+def train(paths, max_gap=MAX_GAP) -> SignalTimingModel:
+    """
+    Build a SignalTimingModel from pcap captures. Captures are measured separately,
+    so no phase spans two files.
+    """
+    collected = defaultdict(lambda: defaultdict(list))
+    for path in paths:
+        for key, phases in phase_durations(read_j2735_frames(path), max_gap).items():
+            for phase, samples in phases.items():
+                collected[key][phase].extend(samples)
+
+    phases = {}
+    pooled = defaultdict(list)
+    for (intersection_id, signal_group), by_phase in collected.items():
+        for phase, samples in by_phase.items():
+            phases[(intersection_id, signal_group, phase)] = summarize(samples)
+            pooled[(intersection_id, phase)].extend(samples)
+    # Intersection-wide fallback for signal groups the model has not seen
+    for (intersection_id, phase), samples in pooled.items():
+        phases[(intersection_id, None, phase)] = summarize(samples)
+
+    return SignalTimingModel(phases, sources=[os.path.basename(path) for path in paths])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Learn per-signal-group phase durations from SPaT pcap captures.")
+    parser.add_argument("pcaps", nargs="+", help="pcap captures containing SPaT messages")
+    parser.add_argument("--output", default=DEFAULT_TIMING_MODEL, help="model file (default: %(default)s)")
+    parser.add_argument("--max-gap", type=float, default=MAX_GAP, help="SPaT gap (s) that invalidates the running phase")
+    args = parser.parse_args(argv)
+
+    model = train(args.pcaps, args.max_gap)
+    model.save(args.output)
+
+    print(f"{len(model)} phase distributions from {len(args.pcaps)} capture(s) -> {args.output}")
+    for (intersection_id, signal_group, phase), stats in sorted(model.phases.items(), key=lambda item: str(item[0])):
+        if signal_group is not None:
+            print(f"  intersection {intersection_id} group {signal_group:>3} {phase:<6} "
+                  f"n={stats['count']:<4} median {stats['p50']:7.2f} s  (p10 {stats['p10']:.2f}, p90 {stats['p90']:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Time-ordered merge of replay streams (RTMaps-independent).
+
+Each stream yields (t, kind, payload) events with t in seconds on its own
+clock (e.g. seconds from the start of a UBX or pcap capture). StreamMerger
+heap-merges them lazily into one sequence on a common clock, so GPS, SPaT,
+MAP and BSM reach the components in causal order whatever the replay speed,
+without loading the captures into memory:
+    - offset: seconds added to a stream's timestamps to align it with the others
+    - events that go back in time within a stream (capture jitter) are held at the
+      stream's latest time and counted in `late`, so the merged clock never goes backwards
+    - events with the same time keep the order of the streams, then of the events
+
+Example:
+    merger = StreamMerger()
+    merger.add("gps", read_ubx_fixes("rawgps.ubx"))
+    merger.add("v2x", read_j2735_frames("capture.pcap"), offset=-2.5)
+    for t, kind, payload in merger:
+        ...
+"""
+import heapq
+
+
+class StreamMerger:
+
+    def __init__(self):
+        self.streams = []  # (name, iterator, offset)
+        self.late = {}     # stream name -> number of events that arrived out of order
+
+    def add(self, name, events, offset=0.0):
+        self.streams.append((name, iter(events), offset))
+        self.late[name] = 0
+        return self
+
+    def __iter__(self):
+        heap = []
+        last = [float("-inf")] * len(self.streams)
+
+        def push(i):
+            name, events, offset = self.streams[i]
+            event = next(events, None)
+            if event is None:
+                return
+            t = event[0] + offset
+            if t < last[i]:
+                self.late[name] += 1
+                t = last[i]
+            last[i] = t
+            heapq.heappush(heap, (t, i, event))
+
+        for i in range(len(self.streams)):
+            push(i)
+        while heap:
+            t, i, event = heapq.heappop(heap)
+            yield (t,) + tuple(event[1:])
+            # The stream's next event is only pulled once this one was handled, so a
+            # generator that reads component outputs (closed loop) sees their effect
+            push(i)
+
+
+def merge_streams(*streams):
+    """
+    Merge time-ordered (t, kind, payload) event streams that share a clock.
+    """
+    merger = StreamMerger()
+    for i, events in enumerate(streams):
+        merger.add(i, events)
+    return iter(merger)
@@ -0,0 +1,288 @@
+"""
+Benchmark of the trajectory math shared by DM, DMSI and DMTG (TrajectoryCore.py).
+
+Sweeps a grid of distances to the stop-bar (d_0, 0-300 m), current speeds
+(v_c, 0-56 km/h) and signal timings, and times every call of:
+    - identify_scenario
+    - calculate_n_scen2and4 / calculate_m_scen2and4 (grid points identified as Scenario 2 or 4)
+    - compute_velocity_profile (critical time cache cleared first, so each call pays the full math)
+For each grid point the signal timings are placed around its critical times so
+that Scenarios 1-4 are all exercised (one timing per scenario, plus a current
+green window for Scenario 1). Points where the GlidePath math is singular
+(v_c = 0, v_c at the coasting speed) get fixed timings and are timed as they are:
+exceptions and missing profiles are counted, not hidden.
+
+The report gives per-call latency percentiles (µs), profiles generated per
+second, and how many calls ended in each scenario. Results are written as JSON
+and can be compared with a saved baseline: a p50 latency more than --tolerance
+above the baseline (or a throughput that much below it) is flagged as a
+regression and the exit status is 1. Tail latencies are reported but not
+compared, they move too much from run to run on a shared machine. Baselines are
+only comparable on the same machine and grid, so save one on the target
+hardware first.
+
+Log calls (AsyncLog.py) keep the configured levels, so their cost is included;
+console output is turned off while timing (messages still go to the log file, if EAD_LOG_FILE is set).
+
+Usage:
+    python TrajectoryBenchmark.py --save-baseline          # record ../trajectory_benchmark_baseline.json
+    python TrajectoryBenchmark.py                          # compare with it
+    python TrajectoryBenchmark.py --repeat 10 --json results.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import warnings
+
+import numpy as np
+
+import AsyncLog
+import TrajectoryCore
+from TrajectoryCore import A_MAX, D_MAX, JERK_MAX, KMH_TO_MS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "trajectory_benchmark_baseline.json")
+
+BENCHMARK_VERSION = 1
+
+# Timings used where the critical times are not finite: (g_e_curr, g_s_next, g_e_next), relative to t_0 = 0
+FALLBACK_TIMINGS = [(-1, 10.0, 40.0), (20.0, 50.0, 80.0)]
+
+# Metrics compared with the baseline: (key, True if higher is worse)
+COMPARED_METRICS = [("p50_us", True), ("profiles_per_s", False)]
+
+
+def scenario_timings(d_0, v_c) -> list:
+    """
+    Signal timings (g_e_curr, g_s_next, g_e_next) for one grid point, relative to t_0 = 0, placed so
+    that each scenario is identified: green at t_cr (1, as a next and as a current window), green
+    between t_e and t_cr only (2), next green after t_l (3), green between t_cr and t_l only (4).
+    """
+    try:
+        ct = TrajectoryCore.critical_times(d_0, v_c * KMH_TO_MS)
+    except ZeroDivisionError:
+        return FALLBACK_TIMINGS
+    t_cr, t_e, t_l = ct.t_cr, ct.t_e, ct.t_l
+    if not np.isfinite([t_cr, t_e, t_l]).all():
+        return FALLBACK_TIMINGS
+    return [
+        (-1, t_cr - 2.0, t_cr + 10.0),
+        (t_cr + 5.0, t_cr + 35.0, t_cr + 65.0),
+        (-1, (t_e + t_cr) / 2, t_cr),
+        (-1, t_l + 5.0, t_l + 35.0),
+        (-1, (t_cr + t_l) / 2, t_l + 30.0),
+    ]
+
+
+def build_grid(d_step, v_step) -> list:
+    """
+    (d_0, v_c, g_e_curr, g_s_next, g_e_next) cases of the sweep.
+    """
+    cases = []
+    with np.errstate(all="ignore"):
+        for d_0 in np.arange(0.0, 300.0 + d_step / 2, d_step):
+            for v_c in np.arange(0.0, 56.0 + v_step / 2, v_step):
+                for timing in scenario_timings(float(d_0), float(v_c)):
+                    cases.append((float(d_0), float(v_c)) + tuple(float(t) for t in timing))
+    return cases
+
+
+def latency_summary(samples_ns) -> dict:
+    if not samples_ns:
+        return {"calls": 0}
+    lat_us = np.asarray(samples_ns, dtype=np.float64) * 1e-3
+    p50, p90, p99 = np.percentile(lat_us, [50, 90, 99])
+    return {
+        "calls": len(lat_us),
+        "mean_us": lat_us.mean(),
+        "p50_us": p50,
+        "p90_us": p90,
+        "p99_us": p99,
+        "max_us": lat_us.max(),
+    }
+
+
+class FunctionTimer:
+    """
+    Per-call latencies and exception count of one function.
+    """
+
+    def __init__(self):
+        self.samples_ns = []
+        self.errors = 0
+
+    def call(self, function, *args):
+        start = time.perf_counter_ns()
+        try:
+            result = function(*args)
+        except (ArithmeticError, ValueError):
+            self.errors += 1
+            return None
+        self.samples_ns.append(time.perf_counter_ns() - start)
+        return result
+
+    def summary(self) -> dict:
+        summary = latency_summary(self.samples_ns)
+        summary["errors"] = self.errors
+        return summary
+
+
+def run_benchmark(cases, repeat) -> dict:
+    # Untimed pass first, so the passes that are measured all run warm
+    with np.errstate(all="ignore"):
+        for d_0, v_c, g_e_curr, g_s_next, g_e_next in cases:
+            try:
+                TrajectoryCore.compute_velocity_profile(0.0, d_0, v_c, g_e_curr, g_s_next, g_e_next)
+            except (ArithmeticError, ValueError):
+                pass
+
+    timers = {name: FunctionTimer() for name in
+              ("identify_scenario", "calculate_n_scen2and4", "calculate_m_scen2and4", "compute_velocity_profile")}
+    scenarios = {}
+    no_profile = 0
+    profile_rows = 0
+
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for _ in range(repeat):
+            for d_0, v_c, g_e_curr, g_s_next, g_e_next in cases:
+                TrajectoryCore.critical_times.cache_clear()
+                timer = timers["compute_velocity_profile"]
+                errors = timer.errors
+                result = timer.call(TrajectoryCore.compute_velocity_profile, 0.0, d_0, v_c, g_e_curr, g_s_next, g_e_next)
+                if result is not None:
+                    profile_rows += len(result[0])
+                    scenarios[result[4]] = scenarios.get(result[4], 0) + 1
+                elif timer.errors == errors:  # Exceptions are only counted in errors
+                    no_profile += 1
+
+                # The parts, on the inputs compute_velocity_profile derives for them
+                v_c_ms = v_c * KMH_TO_MS
+                try:
+                    ct = TrajectoryCore.critical_times(d_0, v_c_ms)
+                except ZeroDivisionError:
+                    continue
+                gamma = TrajectoryCore.gamma_intervals(0.0, g_e_curr, g_s_next, g_e_next)
+                identified = timers["identify_scenario"].call(TrajectoryCore.identify_scenario, gamma, ct.t_cr, ct.t_e, ct.t_l)
+                if identified is None or identified[1] not in (2, 4):
+                    continue
+                if identified[1] == 2:
+                    t_arr = TrajectoryCore.calculate_scen2_t_arr(ct.t_e, ct.t_cr, gamma)
+                else:
+                    t_arr = TrajectoryCore.calculate_scen4_t_arr(ct.t_l, ct.t_cr, gamma)
+                if not t_arr:
+                    continue
+                v_h = d_0 / t_arr
+                n = timers["calculate_n_scen2and4"].call(TrajectoryCore.calculate_n_scen2and4, A_MAX, D_MAX, JERK_MAX, v_h - v_c_ms, v_h, d_0)
+                if n is not None:
+                    timers["calculate_m_scen2and4"].call(TrajectoryCore.calculate_m_scen2and4, n, d_0, v_h)
+
+    results = {name: timer.summary() for name, timer in timers.items()}
+    profiles = results["compute_velocity_profile"]
+    total_s = sum(timers["compute_velocity_profile"].samples_ns) * 1e-9
+    profiles["no_profile"] = no_profile
+    # calls only counts the calls that returned (errors are not timed)
+    profiles["profiles_per_s"] = (profiles["calls"] - no_profile) / total_s if total_s else 0.0
+    profiles["rows_per_s"] = profile_rows / total_s if total_s else 0.0
+    profiles["scenarios"] = {str(n): count for n, count in sorted(scenarios.items())}
+    return results
+
+
+def compare(results, baseline, tolerance) -> list:
+    """
+    Regressions of results against a baseline, as (function, metric, baseline value, value).
+    """
+    regressions = []
+    for name, summary in results.items():
+        base = baseline.get(name, {})
+        for key, higher_is_worse in COMPARED_METRICS:
+            if key not in summary or not base.get(key):
+                continue
+            value, reference = summary[key], base[key]
+            if (value > reference * (1 + tolerance)) if higher_is_worse else (value < reference * (1 - tolerance)):
+                regressions.append((name, key, reference, value))
+    return regressions
+
+
+def print_report(results, baseline=None):
+    print(f"{'function':<26} {'calls':>8} {'errors':>7} {'p50 µs':>9} {'p90 µs':>9} {'p99 µs':>9} {'max µs':>9}")
+    for name, s in results.items():
+        if not s["calls"]:
+            print(f"{name:<26} {0:>8} {s['errors']:>7}")
+            continue
+        line = f"{name:<26} {s['calls']:>8} {s['errors']:>7} {s['p50_us']:>9.2f} {s['p90_us']:>9.2f} {s['p99_us']:>9.2f} {s['max_us']:>9.1f}"
+        if baseline and baseline.get(name, {}).get("p50_us"):
+            line += f"   (p50 {s['p50_us'] / baseline[name]['p50_us'] - 1:+.0%} vs baseline)"
+        print(line)
+    profiles = results["compute_velocity_profile"]
+    scenarios = ", ".join(f"S{n}: {count}" for n, count in profiles["scenarios"].items())
+    print(f"\n{profiles['profiles_per_s']:.0f} profiles/s ({profiles['rows_per_s']:.0f} profile rows/s), "
+          f"{profiles['no_profile']} call(s) without a profile, {profiles['errors']} error(s); {scenarios}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the trajectory math (TrajectoryCore.py) over a d_0 / v_c / signal timing grid.")
+    parser.add_argument("--d-step", type=float, default=10.0, help="d_0 grid step in meters (0-300 m)")
+    parser.add_argument("--v-step", type=float, default=2.0, help="v_c grid step in km/h (0-56 km/h)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of passes over the grid")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare with (or to write with --save-baseline)")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative slowdown flagged as a regression (default: 0.25, i.e. 25%%)")
+    parser.add_argument("--json", default=None, help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    cases = build_grid(args.d_step, args.v_step)
+    grid = {"d_step": args.d_step, "v_step": args.v_step, "repeat": args.repeat, "cases": len(cases)}
+    print(f"{len(cases)} cases x {args.repeat} passes")
+
+    AsyncLog.configure(console_level="OFF")
+    start = time.perf_counter()
+    results = run_benchmark(cases, args.repeat)
+    wall_time = time.perf_counter() - start
+
+    report = {
+        "version": BENCHMARK_VERSION,
+        "grid": grid,
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "platform": platform.platform(),
+        },
+        "wall_time_s": wall_time,
+        "results": results,
+    }
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        if saved.get("version") != BENCHMARK_VERSION or saved.get("grid") != grid:
+            print(f"Baseline {args.baseline} was recorded with a different grid or version, not compared")
+        else:
+            baseline = saved["results"]
+
+    print_report(results, baseline)
+    print(f"Wall time: {wall_time:.2f} s")
+
+    for path in filter(None, (args.json, args.baseline if args.save_baseline else None)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, default=float)
+        print(f"Results written to {path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, key, reference, value in regressions:
+            print(f"REGRESSION: {name} {key} {reference:.2f} -> {value:.2f}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
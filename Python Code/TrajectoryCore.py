@@ -0,0 +1,664 @@
+"""
+Shared trajectory math for the Decision Maker components (DM, DMSI, DMTG).
+
+This module does not depend on RTMaps, so the scenario identification and
+velocity profile generation can be imported and benchmarked on their own.
+All of the GlidePath constants live here and are derived once at import time.
+"""
+import math
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+import AsyncLog
+
+log = AsyncLog.get_logger("TrajectoryCore")
+
+# Vehicle / competition constraints
+A_MAX = 1.0          # maximum acceleration in m/s²
+D_MAX = 1.0          # maximum deceleration in m/s²
+JERK_MAX = 1.0       # maximum jerk in m/s³
+V_LIMIT = 56.33      # speed limit in km/h (35mph)
+V_COAST = 12.87      # km/h as defined, equivalent to 8 MPH
+
+# Same values in m/s for calculations
+KMH_TO_MS = 5.0 / 18.0
+V_LIMIT_MS = V_LIMIT * KMH_TO_MS
+V_COAST_MS = V_COAST * KMH_TO_MS
+
+# Sampling period of the materialized velocity profile
+PROFILE_DT = 0.1  # 100 ms
+
+# Critical times of the GlidePath scenario classification (all relative to t_0, in seconds)
+#   p, q: cosine rates of the fastest acceleration / deceleration manoeuvre
+#   t_cr: arrival time when cruising at v_c
+#   t_e:  earliest arrival time (accelerating up to the speed limit)
+#   t_l:  latest arrival time (decelerating down to the coasting speed)
+CriticalTimes = namedtuple("CriticalTimes", ["p", "q", "t_cr", "t_e", "t_l"])
+
+SCENARIO_NUMBERS = {"Scenario 1": 1, "Scenario 2": 2, "Scenario 3": 3, "Scenario 4": 4}
+
+
+@lru_cache(maxsize=32)
+def critical_times(d_0, v_c_ms) -> CriticalTimes:
+    """
+    Compute the critical times for a distance to the stop-bar and a current speed.
+
+    Results are cached on (d_0, v_c_ms), so DM pays for the math once for both scenario
+    identification and profile generation, and DMTG reuses DMSI's result for the same sample
+    when DMSI runs with use_lookup_table off. The table lookups (CriticalTimeTable, DMSI's
+    default) are interpolated and do not go through this cache.
+
+    At the speed limit no acceleration is possible and p is infinite (t_e = d_0 / V_LIMIT_MS); at
+    or below the coasting speed q is infinite (t_l = d_0 / V_COAST_MS); stopped, t_cr is infinite.
+
+    Args:
+        d_0 (float): Route distance to stop-bar (meters).
+        v_c_ms (float): Current velocity (m/s).
+
+    Returns:
+        CriticalTimes: (p, q, t_cr, t_e, t_l)
+    """
+    if v_c_ms < V_LIMIT_MS:
+        p = min((2 * A_MAX) / (V_LIMIT_MS - v_c_ms), np.sqrt((2 * JERK_MAX) / (V_LIMIT_MS - v_c_ms)))
+    else:
+        p = math.inf
+    if v_c_ms > V_COAST_MS:
+        q = min((2 * A_MAX) / (v_c_ms - V_COAST_MS), np.sqrt((2 * JERK_MAX) / (v_c_ms - V_COAST_MS)))
+    else:
+        q = math.inf
+
+    t_cr = d_0 / v_c_ms if v_c_ms > 0 else math.inf
+    t_e = ((d_0 - v_c_ms * np.pi / (2 * p)) / V_LIMIT_MS) + (np.pi / (2 * p))
+    t_l = ((d_0 - v_c_ms * np.pi / (2 * q)) / V_COAST_MS) + (np.pi / (2 * q))
+    return CriticalTimes(p, q, t_cr, t_e, t_l)
+
+
+class CriticalTimeTable:
+    """
+    Precomputed critical times for fast scenario identification.
+
+    For a given speed, t_cr, t_e and t_l are affine in d_0:
+        t_e = d_0 / V_LIMIT_MS + c_e(v) * (1 - v / V_LIMIT_MS),  with c_e = π / (2p)
+        t_l = d_0 / V_COAST_MS + c_l(v) * (1 - v / V_COAST_MS),  with c_l = π / (2q)
+    so only c_e and c_l need to be tabulated over speed; the distance axis is exact.
+    Lookups interpolate linearly between table speeds and fall back to critical_times()
+    outside (V_COAST_MS, V_LIMIT_MS), which handles the singular ends.
+    """
+
+    def __init__(self, step=0.005):
+        self.step = step
+        # Open interval: both ends are singular (p or q goes to infinity)
+        self.v = np.arange(V_COAST_MS + step, V_LIMIT_MS, step)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = np.minimum((2 * A_MAX) / (V_LIMIT_MS - self.v), np.sqrt((2 * JERK_MAX) / (V_LIMIT_MS - self.v)))
+            q = np.minimum((2 * A_MAX) / (self.v - V_COAST_MS), np.sqrt((2 * JERK_MAX) / (self.v - V_COAST_MS)))
+        self.c_e = np.pi / (2 * p)
+        self.c_l = np.pi / (2 * q)
+        self._prepare()
+
+    def _prepare(self):
+        # Plain Python lists are faster than NumPy scalars for one lookup at a time
+        self._v_0 = float(self.v[0])
+        self._v_1 = float(self.v[-1])
+        self._inv_step = 1.0 / self.step
+        self._c_e = self.c_e.tolist()
+        self._c_l = self.c_l.tolist()
+
+    def constants(self) -> np.ndarray:
+        return np.array([A_MAX, JERK_MAX, V_LIMIT, V_COAST, self.step])
+
+    def save(self, path):
+        np.savez(path, constants=self.constants(), v=self.v, c_e=self.c_e, c_l=self.c_l)
+
+    @classmethod
+    def load_or_build(cls, path, step=0.005):
+        """
+        Load a table saved by save(), or build it (and save it to path) if the file is
+        missing or was built with different constants.
+        """
+        try:
+            with np.load(path) as data:
+                table = cls.__new__(cls)
+                table.step = step
+                if not np.array_equal(data["constants"], table.constants()):
+                    raise ValueError("stale critical time table")
+                table.v = data["v"]
+                table.c_e = data["c_e"]
+                table.c_l = data["c_l"]
+            table._prepare()
+            return table
+        except (OSError, KeyError, ValueError):
+            pass
+
+        table = cls(step)
+        try:
+            table.save(path)
+        except OSError as e:
+            log.warning("Could not save critical time table to %s: %s", path, e)
+        return table
+
+    def lookup(self, d_0, v_c_ms) -> CriticalTimes:
+        if not self._v_0 <= v_c_ms <= self._v_1:
+            return critical_times(d_0, v_c_ms)
+
+        x = (v_c_ms - self._v_0) * self._inv_step
+        i = min(int(x), len(self._c_e) - 2)
+        frac = x - i
+        c_e = self._c_e[i] + frac * (self._c_e[i + 1] - self._c_e[i])
+        c_l = self._c_l[i] + frac * (self._c_l[i + 1] - self._c_l[i])
+
+        t_cr = d_0 / v_c_ms
+        t_e = d_0 / V_LIMIT_MS + c_e * (1 - v_c_ms / V_LIMIT_MS)
+        t_l = d_0 / V_COAST_MS + c_l * (1 - v_c_ms / V_COAST_MS)
+        return CriticalTimes(np.pi / (2 * c_e), np.pi / (2 * c_l), t_cr, t_e, t_l)
+
+
+def gamma_intervals(t_0, g_e_curr, g_s_next, g_e_next) -> tuple:
+    """
+    Build the set of green windows Γ from the Green Window Estimator outputs.
+    Like the critical times, the windows are in seconds relative to t_0.
+    """
+    if g_e_curr == -1:
+        # Case 1: No current green phase
+        return ((g_s_next, g_e_next),)
+    # Case 2: Current green phase exists (it started before t_0)
+    return ((0.0, g_e_curr), (g_s_next, g_e_next))
+
+
+def identify_scenario(gamma_intervals, t_cr, t_e, t_l):
+    """
+    Identify the scenario based on the current time, Gamma intervals, and thresholds.
+
+    Args:
+        gamma_intervals (list): List of green intervals [[start1, end1], [start2, end2], ...].
+        t_cr (float): Critical time (e.g., estimated time to reach the stop-bar).
+        t_e (float): Earliest relevant time.
+        t_l (float): Latest relevant time.
+
+    Returns:
+        tuple: Identified scenario ("Scenario 1", 1), ("Scenario 2", 2), etc.
+    """
+
+    # Scenario 1: Check if the cruise arrival time t_cr falls within any green windows. If you maintain cruise speed, you will arrive while the light is green.
+    for interval in gamma_intervals:
+        if len(interval) == 2:
+            start, end = interval
+            if start <= t_cr < end:
+                log.debug("Scenario 1 matched.")
+                return "Scenario 1", 1
+
+    # Scenario 2: Check if the interval [t_e, t_cr] overlaps with any green windows. You could arrive during a green light if you accelerate slightly.
+    for interval in gamma_intervals:
+        if len(interval) == 2:
+            start, end = interval
+            # Determine the intersection between [t_e, t_cr] and [start, end]
+            if max(t_e, start) < min(t_cr, end):
+                log.debug("Scenario 2 matched.")
+                return "Scenario 2", 2
+
+    # Scenario 3: Check if there is no gamma overlap in the interval [t_cr, t_l]. Stopping is inevitable.
+    overlap_found = False
+    for interval in gamma_intervals:
+        if len(interval) == 2:
+            start, end = interval
+            if max(t_cr, start) < min(t_l, end):
+                overlap_found = True
+                break
+    if not overlap_found:
+        log.debug("Scenario 3 matched.")
+        return "Scenario 3", 3
+
+    # Default: Scenario 4 if none of the above conditions are met. Possibly useful for Eco-Approach strategies (e.g., creeping forward or brief idling).
+    log.debug("Scenario 4 matched.")
+    return "Scenario 4", 4
+
+
+def calculate_scen2_t_arr(t_e, t_cr, gamma) -> float:
+    """
+    Calculate t_arr for Scenario 2 based on the intersection between [t_e, t_cr] and gamma intervals.
+    """
+    intersections = []
+    for interval in gamma:
+        if len(interval) == 2:
+            start, end = interval
+            overlap_start = max(t_e, start)
+            overlap_end = min(t_cr, end)
+            if overlap_start < overlap_end:
+                intersections.append(overlap_start)
+    return min(intersections) if intersections else None
+
+
+def calculate_scen4_t_arr(t_l, t_cr, gamma) -> float:
+    """
+    Calculate t_arr for Scenario 4 based on the intersection between [t_l, t_cr] and gamma intervals.
+    """
+    intersections = []
+    for interval in gamma:
+        if len(interval) == 2:
+            start, end = interval
+            overlap_start = max(t_cr, start)
+            overlap_end = min(t_l, end)
+            if overlap_start < overlap_end:
+                intersections.append(overlap_start)
+    return min(intersections) if intersections else None
+
+
+def calculate_n_scen2and4(a_max, d_max, jerk_max, v_d, v_h, d_0) -> float:
+    valid_n_candidates = []
+
+    if abs(v_d) > 1e-6:
+        n_acc = a_max / abs(v_d)
+        n_dec = d_max / abs(v_d)
+        n_jerk = (jerk_max / abs(v_d))**0.5
+        valid_n_candidates.extend([n_acc, n_dec, n_jerk])
+
+    if abs(v_h) > 1e-6 and abs(d_0) > 1e-6:
+        n_lower_bound = ((np.pi / 2) - 1) * (v_h / d_0)
+    else:
+        n_lower_bound = 0.01
+
+    # Final value is the maximum n that is ≥ n_lower_bound and satisfies all upper bounds
+    return max(min(valid_n_candidates), n_lower_bound)
+
+
+def calculate_m_scen2and4(n, d_0, v_h) -> float:
+    pi_over_2 = np.pi / 2
+    safe_eps = 1e-6  # small number to prevent divide by zero
+
+    numerator_part1 = -pi_over_2 * n
+    inside_sqrt = (pi_over_2 * n)**2 - 4 * n**2 * ((pi_over_2 - 1) - (d_0 / v_h) * n)
+
+    if inside_sqrt < 0:
+        sqrt_term = 0.0
+    else:
+        sqrt_term = np.sqrt(inside_sqrt)
+
+    numerator = numerator_part1 - sqrt_term
+    denominator = 2 * ((pi_over_2 - 1) - (d_0 / v_h) * n)
+
+    if abs(denominator) < safe_eps:
+        return 1e6
+    return numerator / denominator
+
+
+def calculate_m_scen3(d_0, v_h) -> float:
+    return v_h / d_0 * np.pi
+
+
+def calculate_n_scen3(d_0, v_h) -> float:
+    return v_h / d_0 * np.pi
+
+
+# Scenario 2 target velocity calculations (piecewise function, evaluated over a whole time grid)
+def f(t, v_c, v_h, v_d, m, n, t_1, d_0, t_2, t_3) -> np.ndarray:
+    t = np.asarray(t, dtype=np.float64)
+    # Segments are checked in order, first match wins (same as the original if/elif chain)
+    conditions = [
+        (0 <= t) & (t <= np.pi / (2 * m)),
+        t <= t_1,
+        t <= d_0 / v_h,
+        t <= t_2,
+        t <= t_3,
+    ]
+    segments = [
+        v_h - v_d * np.cos(m * t),
+        v_h - (m / n) * v_d * np.cos(n * (t + (np.pi / n) - t_1)),
+        v_h + (m / n) * v_d,
+        v_h - (m / n) * v_d * np.cos(n * (t + (3 * np.pi / (2 * n)) - t_2)),
+        v_h - v_d * np.cos(m * (t - t_3)),
+    ]
+    return np.select(conditions, segments, default=v_c)
+
+
+# Scenario 3 target velocity function (stop-and-wait)
+def g(t, v_c, t_arr, g_next_s, t_5, m) -> np.ndarray:
+    t = np.asarray(t, dtype=np.float64)
+    conditions = [
+        (0 <= t) & (t < t_arr),
+        (t_arr <= t) & (t < g_next_s),
+        (g_next_s <= t) & (t < t_5),
+    ]
+    segments = [
+        # Beyond 0-π/m it should stay at 0
+        np.where(t > np.pi / m, 0.0, v_c/2 + (v_c/2) * np.cos(m*t)),
+        0.0,
+        v_c/2 + (v_c/2) * np.cos(m*(t-t_5)),
+    ]
+    return np.select(conditions, segments, default=v_c)
+
+
+# Scenario 4 target velocity calculations (same piecewise shape as Scenario 2, v_d is negative)
+def h(t, v_c, v_h, v_d, m, n, t_1, d_0, t_2, t_3) -> np.ndarray:
+    return f(t, v_c, v_h, v_d, m, n, t_1, d_0, t_2, t_3)
+
+
+# Parameters of a planned velocity profile. Times are in seconds relative to t_0, speeds in m/s;
+# fields a scenario does not use are None. gamma: green windows the plan was made for.
+ProfilePlan = namedtuple("ProfilePlan", ["scenario", "scenario_n", "t_0", "d_0", "v_c", "gamma", "t_arr",
+                                         "v_h", "v_d", "m", "n", "t_1", "t_2", "t_3", "t_5", "g_s_next", "t_end"])
+
+
+def _plan_scenario_2_4(scenario, t_0, d_0, v_c_ms, gamma, t_arr) -> ProfilePlan:
+    """
+    Scenario 2 / 4 profile reaching the stop-bar at t_arr (relative to t_0).
+    """
+    # Target average velocity given average target arrival time, t_arr
+    v_h = d_0 / t_arr   # target average velocity (m/s)
+    v_d = v_h - v_c_ms  # velocity difference (m/s)
+
+    # Parameters 'm' and 'n' for Scenarios 2 and 4
+    n = calculate_n_scen2and4(A_MAX, D_MAX, JERK_MAX, v_d, v_h, d_0)
+    m = calculate_m_scen2and4(n, d_0, v_h)
+
+    # Times used for function f(t|v_c, v_h)
+    t_1 = (np.pi / (2 * m)) + (np.pi / (2 * n))
+    t_2 = (d_0 / v_h) + (np.pi / (2 * n))
+    t_3 = (d_0 / v_h) + (np.pi / (2 * m)) + (np.pi / (2 * n))
+    log.debug("f() input: v_c=%.2f, v_h=%.2f, v_d=%.2f, m=%.4f, n=%.4f, t_arr=%s", v_c_ms, v_h, v_d, m, n, t_arr)
+    return ProfilePlan(scenario, SCENARIO_NUMBERS[scenario], t_0, d_0, v_c_ms, gamma, t_arr,
+                       v_h, v_d, m, n, t_1, t_2, t_3, None, None, t_3 + 1.0)
+
+
+def _plan_scenario_3(t_0, d_0, v_c_ms, gamma, g_s_next) -> ProfilePlan:
+    """
+    Stop-and-wait: the vehicle is brought to a full stop before the stop-bar and
+    waits for the next green window, starting g_s_next seconds after t_0.
+    """
+    # Assume the target velocity after acceleration is half of v_c_ms.
+    v_h = v_c_ms / 2.0
+    t_arr = d_0 / v_h
+
+    n = calculate_n_scen3(d_0, v_h)
+    m = calculate_m_scen3(d_0, v_h)
+
+    # t_4 is an offset after g_s_next and t_5 marks the end of the ramp-up phase.
+    t_4 = g_s_next + (np.pi / (2 * n))
+    t_5 = t_4 + (np.pi / (m * 2))
+    return ProfilePlan("Scenario 3", 3, t_0, d_0, v_c_ms, gamma, t_arr,
+                       v_h, None, m, n, None, None, None, t_5, g_s_next, t_5 + 1.0)
+
+
+def plan_velocity_profile(t_0, d_0, v_c, g_e_curr, g_s_next, g_e_next, scenario=None) -> ProfilePlan:
+    """
+    Identify the scenario and compute the parameters of the velocity profile from t_0 onwards.
+
+    Args:
+        t_0 (float): Current absolute time (seconds).
+        d_0 (float): Route distance to stop-bar (meters).
+        v_c (float): Current velocity (km/h).
+        g_e_curr, g_s_next, g_e_next (float): Green Window Estimator outputs.
+        scenario (str): Already identified scenario (e.g. from DMSI). Identified here when None.
+
+    Returns:
+        ProfilePlan, or None if no profile can be generated (e.g. stopped or over the speed limit).
+    """
+    v_c_ms = v_c * KMH_TO_MS
+    if v_c_ms < 0:
+        log.error("Speed must be greater than zero.")
+        return
+    elif v_c_ms > V_LIMIT_MS:
+        log.error("Speed is over speed limit!!!")
+        return
+    elif v_c_ms == 0:
+        # The profiles start from the current speed; stopped, the vehicle never reaches the stop-bar (t_cr is infinite)
+        log.debug("Vehicle stopped, no velocity profile.")
+        return
+
+    # Critical times are computed once and shared by identification and generation
+    ct = critical_times(d_0, v_c_ms)
+    t_cr, t_e, t_l = ct.t_cr, ct.t_e, ct.t_l
+    log.debug("Calculated d_0=%s, t_e=%s, t_l=%s, t_0=%s, t_cr=%s", d_0, t_e, t_l, t_0, t_cr)
+
+    gamma = gamma_intervals(t_0, g_e_curr, g_s_next, g_e_next)
+
+    if scenario is None:
+        scenario, _ = identify_scenario(gamma, t_cr, t_e, t_l)
+
+    if scenario == "Scenario 1":
+        v_h = min(v_c_ms, V_LIMIT_MS)
+        return ProfilePlan(scenario, 1, t_0, d_0, v_c_ms, gamma, t_cr,
+                           v_h, 0.0, None, None, None, None, None, None, None, 30.0)
+
+    elif scenario == "Scenario 2" or scenario == "Scenario 4":
+        if scenario == "Scenario 2":
+            t_arr = calculate_scen2_t_arr(t_e, t_cr, gamma)
+        else:
+            t_arr = calculate_scen4_t_arr(t_l, t_cr, gamma)
+
+        if t_arr is None:
+            log.error("No valid intersection in Scenario 2 or 4.")
+            return
+        return _plan_scenario_2_4(scenario, t_0, d_0, v_c_ms, gamma, t_arr)
+
+    elif scenario == "Scenario 3":
+        if v_c_ms <= V_COAST_MS:
+            log.error("v_c (in m/s) is below or equal to the coasting threshold. Scenario 3 cannot be computed.")
+            return
+
+        if g_s_next is None:
+            log.error("No valid green window start (g_s_next) found for Scenario 3.")
+            return
+        return _plan_scenario_3(t_0, d_0, v_c_ms, gamma, g_s_next)
+
+    log.error("Unknown scenario %s.", scenario)
+
+
+class VelocityProfile:
+    """
+    Closed-form velocity profile of a ProfilePlan.
+
+    Only the segment breakpoints are stored, with the coefficients of each segment,
+    v(t) = a + b·cos(w·(t - phi)) (b = 0 for constant segments), and the distance
+    covered before it starts: a few dozen floats per plan. The segments are those of
+    f() / h() (Scenarios 2 and 4) and g() (Scenario 3). velocity(), acceleration()
+    and distance() are exact at any time and cost one bisection over at most eight
+    breakpoints; sample() builds the (time, km/h) array at a fixed step when one is
+    needed (saving, plotting).
+
+    Times are absolute seconds (same clock as plan.t_0), speeds m/s, accelerations
+    m/s², distances meters from plan.t_0. Before plan.t_0 the profile holds its initial
+    speed, after its last breakpoint its final speed. As in f() and g(), Scenario 2 and 3
+    speeds are capped at V_LIMIT_MS; a capped cosine segment is split where it crosses
+    the limit, so distances stay exact.
+    """
+    __slots__ = ("scenario", "scenario_n", "t_0", "t_end", "breaks", "coefficients", "d_start", "right_closed")
+
+    def __init__(self, plan):
+        self.scenario = plan.scenario
+        self.scenario_n = plan.scenario_n
+        self.t_0 = plan.t_0
+        self.t_end = plan.t_end
+
+        # (segment end, a, b, w, phi); segments are matched first to last like the conditions of f() / g()
+        if plan.scenario_n == 1:
+            segments, cap, self.right_closed = [], math.inf, True
+            final = plan.v_h
+        elif plan.scenario_n in (2, 4):
+            v_h, v_d, m, n = plan.v_h, plan.v_d, plan.m, plan.n
+            segments = [
+                (math.pi / (2 * m), v_h, -v_d, m, 0.0),
+                (plan.t_1, v_h, -(m / n) * v_d, n, plan.t_1 - math.pi / n),
+                (plan.d_0 / v_h, v_h + (m / n) * v_d, 0.0, 0.0, 0.0),
+                (plan.t_2, v_h, -(m / n) * v_d, n, plan.t_2 - 3 * math.pi / (2 * n)),
+                (plan.t_3, v_h, -v_d, m, plan.t_3),
+            ]
+            cap = V_LIMIT_MS if plan.scenario_n == 2 else math.inf  # h() is not capped
+            self.right_closed = True  # f() segments are (start, end]
+            final = plan.v_c
+        else:
+            half, m = plan.v_c / 2, plan.m
+            segments = [
+                (min(plan.t_arr, math.pi / m), half, half, m, 0.0),
+                (plan.t_arr, 0.0, 0.0, 0.0, 0.0),
+                (plan.g_s_next, 0.0, 0.0, 0.0, 0.0),
+                (plan.t_5, half, half, m, plan.t_5),
+            ]
+            cap = V_LIMIT_MS
+            self.right_closed = False  # g() segments are [start, end)
+            final = plan.v_c
+        segments.append((math.inf, min(final, cap), 0.0, 0.0, 0.0))
+
+        breaks, coefficients, d_start = [], [], []
+        start, distance = 0.0, 0.0
+        for end, a, b, w, phi in segments:
+            if end <= start:
+                continue  # Shadowed by the previous segments
+            for piece in self._capped(start, end, a, b, w, phi, cap):
+                breaks.append(piece[0])
+                coefficients.append(piece[1:])
+                d_start.append(distance)
+                if piece[0] < math.inf:
+                    distance += self._integral(piece[1:], start, piece[0])
+                    start = piece[0]
+        self.breaks = tuple(breaks)
+        self.coefficients = tuple(coefficients)
+        self.d_start = tuple(d_start)
+
+    @staticmethod
+    def _capped(start, end, a, b, w, phi, cap) -> list:
+        """
+        Pieces (end, a, b, w, phi) of a segment once capped at `cap`. A cosine segment spans at most
+        half a period, so it is monotonic and crosses the cap at most once.
+        """
+        if b == 0.0 or end == math.inf:
+            return [(end, min(a, cap), 0.0, 0.0, 0.0)]
+        v_start = a + b * math.cos(w * (start - phi))
+        v_end = a + b * math.cos(w * (end - phi))
+        if max(v_start, v_end) <= cap:
+            return [(end, a, b, w, phi)]
+        if min(v_start, v_end) >= cap:
+            return [(end, cap, 0.0, 0.0, 0.0)]
+        # Phase where a + b·cos(θ) = cap, within the segment's phase range
+        base = math.acos(max(-1.0, min(1.0, (cap - a) / b)))
+        low, high = sorted((w * (start - phi), w * (end - phi)))
+        k = math.floor((low - math.pi) / (2 * math.pi))
+        crossing = next(theta for j in range(k, k + 3) for theta in (base + 2 * math.pi * j, -base + 2 * math.pi * j)
+                        if low <= theta <= high)
+        t_cross = phi + crossing / w
+        if v_start > cap:
+            return [(t_cross, cap, 0.0, 0.0, 0.0), (end, a, b, w, phi)]
+        return [(t_cross, a, b, w, phi), (end, cap, 0.0, 0.0, 0.0)]
+
+    @staticmethod
+    def _integral(coefficients, start, t) -> float:
+        a, b, w, phi = coefficients
+        if b == 0.0:
+            return a * (t - start)
+        return a * (t - start) + (b / w) * (math.sin(w * (t - phi)) - math.sin(w * (start - phi)))
+
+    def _segment(self, t) -> int:
+        return (bisect_left if self.right_closed else bisect_right)(self.breaks, t)
+
+    def velocity(self, t) -> float:
+        t = max(t - self.t_0, 0.0)
+        a, b, w, phi = self.coefficients[self._segment(t)]
+        return a + b * math.cos(w * (t - phi)) if b else a
+
+    def acceleration(self, t) -> float:
+        t -= self.t_0
+        if t < 0:
+            return 0.0
+        a, b, w, phi = self.coefficients[self._segment(t)]
+        return -b * w * math.sin(w * (t - phi)) if b else 0.0
+
+    def distance(self, t) -> float:
+        t -= self.t_0
+        if t <= 0:
+            return 0.0
+        i = self._segment(t)
+        start = self.breaks[i - 1] if i else 0.0
+        return self.d_start[i] + self._integral(self.coefficients[i], start, t)
+
+    def sample(self, dt=PROFILE_DT) -> np.ndarray:
+        """
+        (N, 2) float64 array of (absolute time, km/h) rows every dt seconds from t_0 to t_0 + t_end.
+        """
+        t = np.arange(0.0, self.t_end + dt, dt)
+        if len(self.coefficients) == 1:  # Scenario 1: constant speed
+            v = np.full_like(t, self.coefficients[0][0])
+        else:
+            i = np.searchsorted(self.breaks, t, side="left" if self.right_closed else "right")
+            a, b, w, phi = np.array(self.coefficients, dtype=np.float64)[i].T
+            v = a + b * np.cos(w * (t - phi))
+
+        # Compact (N, 2) float64 array: column 0 is time (s), column 1 is velocity (km/h)
+        return np.column_stack((t + self.t_0, v * 3.6))
+
+
+def warm_start_plan(plan, t_0, d_0, v_c, g_e_curr, g_s_next, g_e_next, speed_tolerance=2.0, window_tolerance=0.5,
+                    v_plan=None) -> ProfilePlan:
+    """
+    Keep following `plan` at t_0 if it still fits the measured state and the current green windows,
+    which skips scenario identification and the arrival time search. The plan keeps its own time base:
+    re-anchoring the cosine profiles at the measured speed on every call would restart them from zero
+    acceleration, and a braking or ramp-up manoeuvre that is under way would never progress.
+
+    The plan fits while:
+        - it has not ended and its speed at t_0 is within speed_tolerance (km/h) of v_c
+        - Scenario 1: cruising at v_c still arrives in a green window
+        - Scenarios 2 / 4: its arrival time is still in a green window
+        - Scenario 3: its green start (the end of the wait) is at most window_tolerance seconds before
+          a green window. Otherwise the wait and ramp-up are shifted to the nearest green start, as long
+          as the ramp-up has not started and the stop is still reached before it (re-planning from
+          standstill does not give a valid profile).
+    v_plan is the planned speed (km/h) at t_0 when the caller already has it (e.g. from the sampled profile).
+
+    Returns:
+        plan (shifted for Scenario 3), or None if it no longer fits. Plan from scratch then.
+    """
+    elapsed = t_0 - plan.t_0
+    if not 0 <= elapsed < plan.t_end:
+        return None
+    if v_plan is None:
+        v_plan = VelocityProfile(plan).velocity(t_0) * 3.6
+    if abs(v_plan - v_c) > speed_tolerance:
+        return None
+
+    gamma = gamma_intervals(t_0, g_e_curr, g_s_next, g_e_next)
+    if plan.scenario_n == 1:
+        if v_c <= 0:
+            return None
+        arrival = d_0 / (v_c * KMH_TO_MS)
+    elif plan.scenario_n in (2, 4):
+        arrival = plan.t_arr - elapsed
+    else:
+        green_start = plan.g_s_next - elapsed
+        if any(start - window_tolerance <= green_start < end for start, end in gamma):
+            return plan
+        shift = min((start - green_start for start, _ in gamma), key=abs)
+        if elapsed >= min(plan.g_s_next, plan.g_s_next + shift) or np.pi / plan.m > plan.g_s_next + shift:
+            return None
+        return plan._replace(g_s_next=plan.g_s_next + shift, t_5=plan.t_5 + shift, t_end=plan.t_end + shift)
+    return plan if any(start <= arrival < end for start, end in gamma) else None
+
+
+def sample_plan(plan, dt=PROFILE_DT) -> np.ndarray:
+    """
+    Materialize a plan as a float64 (N, 2) array of (absolute time, km/h) rows every dt seconds from plan.t_0.
+    """
+    return VelocityProfile(plan).sample(dt)
+
+
+def compute_velocity_profile(t_0, d_0, v_c, g_e_curr, g_s_next, g_e_next, scenario=None, dt=PROFILE_DT):
+    """
+    Generate the recommended velocity profile from t_0 onwards.
+
+    Args:
+        t_0 (float): Current absolute time (seconds).
+        d_0 (float): Route distance to stop-bar (meters).
+        v_c (float): Current velocity (km/h).
+        g_e_curr, g_s_next, g_e_next (float): Green Window Estimator outputs.
+        scenario (str): Already identified scenario (e.g. from DMSI). Identified here when None.
+        dt (float): Sampling period of the profile (seconds).
+
+    Returns:
+        tuple: (profile, t_start, t_end, scenario, scenario_n) where profile is a float64
+        (N, 2) array of (time, km/h) rows, or None if no profile could be generated.
+    """
+    plan = plan_velocity_profile(t_0, d_0, v_c, g_e_curr, g_s_next, g_e_next, scenario)
+    if plan is None:
+        return
+    return sample_plan(plan, dt), t_0, t_0 + plan.t_end, plan.scenario, plan.scenario_n
@@ -1,90 +1,85 @@
 import rtmaps.core as rt
 import rtmaps.types
 from rtmaps.base_component import BaseComponent
-from sys import argv
+import os
+import sys
 
-from pyubx2.ubxreader import (
-    ERR_LOG,
-    GET,
-    UBX_PROTOCOL,
-    VALCKSUM,
-    UBXReader,
-    NMEA_PROTOCOL,
-    RTCM3_PROTOCOL,
-)
+# Shared (RTMaps-independent) modules live next to this script
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from CaptureIndex import NAV_PVT_KIND, CaptureIndex
+from ReplayClock import ReplayClock
+from UbxLog import UbxIndex
 
+DEFAULT_UBX_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test_data_captures", "rawgps.ubx")
 
 
 class rtmaps_python(BaseComponent):
     """
     RTMaps component that:
       - play a ubx file and stream longtitude and latitude
+      - NAV-PVT fixes are indexed in Birth() (UbxLog.py, from the capture's sidecar index file
+        after the first run, see CaptureIndex.py), then one fix is written per Core(),
+        paced by its iTOW timestamp: `speed` 1.0 is real time, 50.0 is 50x, 0 is as fast as possible
+      - `start_time` seeks to a time (seconds into the capture), `loop` restarts from there at the end
     """
-    
+
     def __init__(self):
         BaseComponent.__init__(self)
 
     def Dynamic(self):
-        # Define inputs as 8-bit unsigned integer arrays.
-
-        # Define outputs as TEXT_ASCII for the hex representation.
         self.add_output("Longtitude", rtmaps.types.FLOAT64)
         self.add_output("Latitude", rtmaps.types.FLOAT64)
+        self.add_output("Speed", rtmaps.types.FLOAT64)  # Ground speed (km/h)
+
+        self.add_property("ubx_file", DEFAULT_UBX_FILE)
+        self.add_property("speed", 1.0)       # Replay speed multiplier (0 = no pacing)
+        self.add_property("start_time", 0.0)  # Seconds into the capture to start from
+        self.add_property("loop", False)
 
     def Birth(self):
-        print("Passing through Birth()")
+        filename = self.get_property("ubx_file")
+        print(f"Indexing file {filename}...")
+        capture_index = CaptureIndex.for_capture(filename)
+        self.index = UbxIndex(filename, capture_index.offsets[capture_index.select(kind=NAV_PVT_KIND)])
+        print(f"{len(self.index)} NAV-PVT fixes, {self.index.duration:.1f} s")
+
+        self.clock = ReplayClock(float(self.get_property("speed")))
+        self.loop = self.get_property("loop")
+        self.start = self.index.seek(float(self.get_property("start_time")))
+        self.position = self.start
+        self.finished = False
 
     def Core(self):
-        filename = r"C:\Users\hungn\OneDrive - email.ucr.edu\Documents\EcoCAR_RtmapV2x\.EAD RTMaps Code\.EAD RTMaps Code\test_data_captures\rawgps.ubx"
-
-        print(f"Opening file {filename}...")
-        with open(filename, "rb") as stream:
-
-            count = 0
-
-            ubr = UBXReader(
-                stream,
-                protfilter=UBX_PROTOCOL | NMEA_PROTOCOL | RTCM3_PROTOCOL,
-                quitonerror=ERR_LOG,
-                validate=VALCKSUM,
-                msgmode=GET,
-                parsebitfield=True,
-                errorhandler=errhandler,
-            )
-            for _, raw_data in ubr:
-                lat = getattr(raw_data, 'lat', 'N/A')  # Default to 'N/A' if 'lat' doesn't exist
-                lon = getattr(raw_data, 'lon', 'N/A')  # Default to 'N/A' if 'lon' doesn't exist
-                
-                if lat is not None and lon is not 'N/A':
-                    lat = float(lat)  # Convert to float if it's a string or other type
-                    lon = float(lon)  # Convert to float if it's a string or other type
-                else:
-                    lat = 0.0
-                    lon = 0.0
-                self.write("Longtitude", lon)
-                self.write("Latitude", lat)
-                #self.write("Ubx_stream", raw_data)
-                count += 1
-
-        print(f"\n{count} messages read.\n")
-        print("Test Complete")
+        if self.finished:
+            return
+
+        if self.position >= len(self.index):
+            if not self.loop or self.start >= len(self.index):
+                print("Test Complete")
+                self.finished = True
+                return
+            self.seek_index(self.start)
+
+        fix = self.index.fix(self.position)
+        self.position += 1
+
+        wait = self.clock.delay(fix.t)
+        if wait > 0:
+            self.sleep(wait)
+        self.write("Longtitude", fix.lon)
+        self.write("Latitude", fix.lat)
+        self.write("Speed", fix.speed_kmh)
+
+    def seek(self, t):
+        """
+        Continue the replay from t seconds into the capture.
+        """
+        self.seek_index(self.index.seek(t))
+
+    def seek_index(self, i):
+        self.position = i
+        self.clock.reset()
 
     def Death(self):
+        self.index.close()
         print("Passing through Death()")
-
-    
-
-# Helper function to convert an Ioelt's data (array of bytes) into a single hex string
-def to_hex_string(ioelt):
-    # If the ioelt exists, has a 'data' attribute, and isn't empty:
-    if ioelt and hasattr(ioelt, 'data') and ioelt.data.size > 0:
-        # Convert each byte in the array to a two-digit hex string, then concatenate
-        return ''.join(format(byte, '02x') for byte in ioelt.data)
-    return ""
-
-def errhandler(err):
-    """
-    Handles errors output by iterator.
-    """
-
-    print(f"\nERROR: {err}\n")
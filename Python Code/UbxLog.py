@@ -0,0 +1,127 @@
+"""
+Indexed access to UBX GPS captures (RTMaps-independent).
+
+The capture is scanned once for UBX frames (checksums verified, resynchronizing
+after corrupt bytes) and the byte offset and iTOW of every NAV-PVT message is
+kept in a UbxIndex. Fixes are then decoded on demand straight from the
+memory-mapped file, so a replay can seek to any time, loop or restart without
+parsing the stream again. pyubx2 is not needed.
+
+Example:
+    index = UbxIndex("../test_data_captures/rawgps.ubx")
+    i = index.seek(120.0)        # first fix at or after 120 s into the capture
+    fix = index.fix(i)           # UbxFix(t, lat, lon, speed_kmh, heading, fix_type, num_sv)
+    for fix in index.fixes(start=i):
+        ...
+"""
+import mmap
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+UBX_SYNC = b"\xb5\x62"
+UBX_HEADER_SIZE = 6   # sync (2), class, id, length (2)
+UBX_CHECKSUM_SIZE = 2
+
+NAV_PVT = (0x01, 0x07)
+NAV_PVT_LENGTH = 92
+
+ITOW_WEEK_MS = 604800000  # iTOW wraps at the end of each GPS week
+
+UbxFix = namedtuple("UbxFix", ["t", "lat", "lon", "speed_kmh", "heading", "fix_type", "num_sv"])
+
+# NAV-PVT payload fields used for a fix: iTOW, fixType, numSV, lon, lat, gSpeed, headMot
+_NAV_PVT = struct.Struct("<I16xB2xB ii 28x ii")
+
+
+def ubx_checksum(frame) -> bytes:
+    """
+    8-bit Fletcher checksum over class, id, length and payload.
+    """
+    # ck_b sums the running ck_a, i.e. byte i is counted (n - i) times
+    values = np.frombuffer(frame, dtype=np.uint8).astype(np.int64)
+    ck_a = int(values.sum()) & 0xFF
+    ck_b = int(values @ np.arange(len(values), 0, -1)) & 0xFF
+    return bytes((ck_a, ck_b))
+
+
+def scan_ubx(data):
+    """
+    Yield (offset, msg_class, msg_id, payload length) for every valid UBX frame in data
+    (bytes or mmap). NMEA/RTCM sentences and corrupt frames are skipped.
+    """
+    size = len(data)
+    offset = data.find(UBX_SYNC)
+    while 0 <= offset and offset + UBX_HEADER_SIZE <= size:
+        msg_class, msg_id, length = struct.unpack_from("<BBH", data, offset + 2)
+        end = offset + UBX_HEADER_SIZE + length + UBX_CHECKSUM_SIZE
+        if end <= size and data[end - 2:end] == ubx_checksum(data[offset + 2:end - 2]):
+            yield offset, msg_class, msg_id, length
+            offset = data.find(UBX_SYNC, end)
+        else:
+            offset = data.find(UBX_SYNC, offset + 1)  # Resynchronize
+
+
+class UbxIndex:
+    """
+    Offsets and times of the NAV-PVT fixes of a UBX capture.
+
+    Attributes:
+        path: Capture file
+        offsets: Byte offset of each NAV-PVT frame
+        times: Seconds since the first fix (from iTOW, unwrapped across GPS weeks)
+    """
+
+    def __init__(self, path, offsets=None):
+        """
+        offsets: NAV-PVT frame offsets if already known (e.g. from the capture's CaptureIndex sidecar),
+        otherwise the capture is scanned.
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if offsets is None:
+            offsets = [offset for offset, msg_class, msg_id, length in scan_ubx(self._data)
+                       if (msg_class, msg_id) == NAV_PVT and length == NAV_PVT_LENGTH]
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        itow = [struct.unpack_from("<I", self._data, int(offset) + UBX_HEADER_SIZE)[0] for offset in self.offsets]
+        self.times = self._unwrap_itow(np.asarray(itow, dtype=np.int64))
+
+    @staticmethod
+    def _unwrap_itow(itow) -> np.ndarray:
+        if not len(itow):
+            return np.zeros(0)
+        weeks = np.concatenate(([0], np.cumsum(np.diff(itow) < -ITOW_WEEK_MS // 2)))
+        ms = itow + weeks * ITOW_WEEK_MS
+        return (ms - ms[0]) * 1e-3
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    def seek(self, t) -> int:
+        """
+        Index of the first fix at or after t seconds into the capture (len(self) if past the end).
+        """
+        return int(np.searchsorted(self.times, t, side="left"))
+
+    def fix(self, i) -> UbxFix:
+        _, fix_type, num_sv, lon, lat, g_speed, head_mot = _NAV_PVT.unpack_from(
+            self._data, int(self.offsets[i]) + UBX_HEADER_SIZE)
+        return UbxFix(float(self.times[i]), lat * 1e-7, lon * 1e-7, g_speed * 3.6e-3, head_mot * 1e-5, fix_type, num_sv)
+
+    def fixes(self, start=0):
+        """
+        Yield the fixes from index start to the end of the capture.
+        """
+        for i in range(start, len(self)):
+            yield self.fix(i)
+
+    def close(self):
+        self._data.close()
+        self._file.close()
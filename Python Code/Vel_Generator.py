@@ -22,13 +22,15 @@ class rtmaps_python(BaseComponent):
     def Dynamic(self):
         # Adding an input called "in" of ANY type
         self.add_input("feed", rtmaps.types.FLOAT64) 
+        self.add_input("dt", rtmaps.types.FLOAT64)  # Optional: timestep (s), overrides time_step
         self.add_output("v_c", rtmaps.types.FLOAT64)
+        self.add_property("time_step", 0.1)  # Timestep (s) of the acceleration limit, same as GPS_Generator's
         
 # Birth() will be called once at diagram execution startup
     def Birth(self):
         print("Passing through Birth()")
         self.v_c = 48.0
-        self.dt = 0.1
+        self.dt = float(self.get_property("time_step"))
 
 # Core() is called every time you have a new inputs available, depending on your chosen reading policy
     def Core(self):
@@ -36,6 +38,8 @@ class rtmaps_python(BaseComponent):
         d_max = 10
         max_delta = 0.0
         delta_v = 0.0
+        if self.inputs["dt"].ioelt is not None:
+            self.dt = float(self.inputs["dt"].ioelt.data)
         # Just copy the input to the output here
         if  hasattr(self.inputs["feed"].ioelt, "data"):
             target = self.inputs["feed"].ioelt.data
@@ -47,8 +51,8 @@ class rtmaps_python(BaseComponent):
                 max_delta = d_max * self.dt
             
             delta_v = max(-max_delta, min(delta_v, max_delta))
-            #self.v_c += delta_v
-            self.v_c = target
+            self.v_c += delta_v
+            #self.v_c = target
 
         # Update speed
         self.outputs["v_c"].write(self.v_c)
@@ -1,30 +1,111 @@
 import rtmaps.core as rt
 import rtmaps.types
 from rtmaps.base_component import BaseComponent
-from scapy.all import rdpcap
+import numpy as np
+import os
+import sys
+
+# Shared (RTMaps-independent) modules live next to this script
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from CaptureIndex import CaptureIndex
+from PcapReader import J2735_KINDS, extract_j2735_frame, read_pcap_records, read_pcap_records_at
+from ReplayClock import ReplayClock
+
+# message_type property values
+MESSAGE_TYPES = {name: msg_id for msg_id, name in J2735_KINDS.items()}
 
 # Python class that will be called from RTMaps.
 class rtmaps_python(BaseComponent):
-    
+    """
+    RTMaps component that replays a pcap capture:
+      - Packets are streamed from the file (PcapReader.py), one per Core(), so large
+        captures start immediately and are never loaded into memory as a whole
+      - Packets are released with their recorded spacing, `speed` times faster
+        (0 = as fast as possible)
+      - Every packet is written to pcap_out; J2735 MAP / SPaT / BSM MessageFrames are also
+        written as byte arrays to MAP_byte / SPAT_byte / BSM_byte (e.g. for MapMatcher v2 and
+        GreenWindowEstimator)
+      - `start_time`, `message_type` and `intersection_id` replay only part of the capture, using
+        its sidecar index file (CaptureIndex.py, built on first use) to jump straight to it
+    """
+
     def __init__(self):
         BaseComponent.__init__(self)
 
     def Dynamic(self):
         self.add_output("pcap_out", rtmaps.types.ANY)  # Define PCAP output
+        self.add_output("MAP_byte", rtmaps.types.UINTEGER8)
+        self.add_output("SPAT_byte", rtmaps.types.UINTEGER8)
+        self.add_output("BSM_byte", rtmaps.types.UINTEGER8)
         self.add_property("pcap_file", "C:/path_to_your_file.pcap")  # File path property
+        self.add_property("speed", 1.0)   # Replay speed multiplier (1.0 = capture timestamps, 0 = no pacing)
+        self.add_property("loop", False)  # Restart from the beginning at the end of the capture
+        self.add_property("start_time", 0.0)     # Seconds into the capture to start from
+        self.add_property("message_type", "")    # "map", "spat" or "bsm" to replay only that message type ("" = all)
+        self.add_property("intersection_id", -1) # Only MAP/SPaT of this intersection (-1 = all)
 
     def Birth(self):
-        print("Loading PCAP file...")
-        pcap_path = self.get_property("pcap_file")
-        self.packets = rdpcap(pcap_path)  # Load PCAP into memory
-        self.index = 0  # Track replay index
+        print("Opening PCAP file...")
+        self.pcap_path = self.get_property("pcap_file")
+        self.loop = self.get_property("loop")
+        self.clock = ReplayClock(float(self.get_property("speed")))
+        self.message_type = self.get_property("message_type").strip().lower()
+        if self.message_type and self.message_type not in MESSAGE_TYPES:
+            print(f"Unknown message_type '{self.message_type}', expected one of {', '.join(sorted(MESSAGE_TYPES))} "
+                  f"(empty for all): replaying all message types.")
+            self.message_type = ""
+        self.offsets = self.select_offsets()
+        self.records = self.open_records()
+        self.count = 0  # Packets replayed
+        self.finished = False
 
     def Core(self):
-        if self.index < len(self.packets):
-            packet = bytes(self.packets[self.index])  # Convert packet to bytes
-            self.write("pcap_out", packet)  # Send packet to RTMaps
-            self.index += 1
-            self.sleep(0.01)  # Simulate real-time processing
+        if self.finished:
+            return
+
+        record = next(self.records, None)
+        if record is None:
+            if not self.loop or self.count == 0:
+                print(f"End of PCAP reached ({self.count} packets).")
+                self.finished = True
+                return
+            self.records = self.open_records()
+            self.clock.reset()
+            record = next(self.records)
+
+        ts, link_type, packet = record
+        wait = self.clock.delay(ts)
+        if wait > 0:
+            self.sleep(wait)  # Recorded spacing between packets
+
+        self.write("pcap_out", packet)  # Send packet to RTMaps
+        self.count += 1
+
+        frame = extract_j2735_frame(packet, link_type)
+        if frame is not None and frame[0] in J2735_KINDS:
+            self.write(f"{J2735_KINDS[frame[0]].upper()}_byte", np.frombuffer(frame[1], dtype=np.uint8))
+
+    def select_offsets(self):
+        """
+        Offsets of the records to replay, or None to stream the whole capture (no index needed).
+        """
+        start_time = float(self.get_property("start_time"))
+        intersection_id = int(self.get_property("intersection_id"))
+        if start_time <= 0 and not self.message_type and intersection_id < 0:
+            return None
+
+        index = CaptureIndex.for_capture(self.pcap_path)
+        rows = index.select(kind=MESSAGE_TYPES[self.message_type] if self.message_type else None,
+                            key=intersection_id if intersection_id >= 0 else None,
+                            start=start_time)
+        print(f"{len(rows)} of {len(index.select())} packets selected.")
+        return index.offsets[rows]
+
+    def open_records(self):
+        if self.offsets is None:
+            return read_pcap_records(self.pcap_path)
+        return read_pcap_records_at(self.pcap_path, self.offsets)
 
     def Death(self):
-        print("Finished processing PCAP.")
\ No newline at end of file
+        self.records.close()
+        print("Finished processing PCAP.")
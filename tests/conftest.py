@@ -0,0 +1,11 @@
+"""
+Shared pytest setup: the modules under test live in "Python Code" and are imported by name, as the components do.
+"""
+import os
+import sys
+
+# Read by AsyncLog at import: keep test runs off the console and out of the log file
+os.environ.setdefault("EAD_LOG_CONSOLE", "OFF")
+os.environ.setdefault("EAD_LOG_FILE", "")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Python Code"))
@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+import pytest
+
+import AsyncLog
+
+
+@pytest.fixture
+def log_lines(tmp_path):
+    path = str(tmp_path / "ead.log")
+    AsyncLog.configure(level="DEBUG", path=path, console_level="OFF")
+
+    def read():
+        AsyncLog.flush()
+        with open(path) as f:
+            return [line.split("] ", 1)[1].rstrip("\n") for line in f]
+
+    yield read
+    AsyncLog.configure(level="INFO", path=None, console_level="OFF")
+
+
+def test_statement_rate_limit(log_lines):
+    log = AsyncLog.Logger("test", interval=0.2)
+    for i in range(6):
+        if i == 5:
+            time.sleep(0.25)
+        log.info("tick %d", i)
+
+    assert log_lines() == ["tick 0", "tick 5 (4 suppressed)"]
+
+
+def test_distinct_errors_from_one_statement_are_all_logged(log_lines):
+    log = AsyncLog.Logger("test", interval=10.0)
+    for value in (1, 2, 2, 3, np.arange(2), np.arange(2)):
+        log.error("bad value %s", value)
+
+    assert log_lines() == ["bad value 1", "bad value 2", "bad value 3", "bad value [0 1]"]
+
+
+def test_levels(log_lines):
+    AsyncLog.configure(level="WARNING")
+    log = AsyncLog.Logger("test")
+    log.debug("debug")
+    log.info("info")
+    log.warning("warning %s", "x")
+
+    assert log_lines() == ["warning x"]
+    assert not log.enabled_for(AsyncLog.INFO)
+
+
+def test_format_errors_are_written_not_raised(log_lines):
+    AsyncLog.Logger("test").info("%d items", "many")
+    assert "format error" in log_lines()[0]
+
+
+def test_console_only_by_default(monkeypatch):
+    monkeypatch.delenv("EAD_LOG_FILE", raising=False)
+    writer = AsyncLog._writer_from_environment()
+    writer.close()
+    assert writer.path is None
+
+
+@pytest.mark.parametrize("value, level", [(None, AsyncLog.INFO), ("", AsyncLog.INFO), ("debug", AsyncLog.DEBUG),
+                                          ("OFF", AsyncLog.OFF), ("30", 30), ("nonsense", AsyncLog.INFO)])
+def test_parse_level(value, level):
+    assert AsyncLog.parse_level(value) == level
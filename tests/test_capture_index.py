@@ -0,0 +1,76 @@
+import os
+import shutil
+import struct
+
+import numpy as np
+import pytest
+
+import J2735
+import ReplayHarness
+from CaptureIndex import NAV_PVT_KIND, CaptureIndex
+from PcapReader import read_j2735_frames
+from UbxLog import NAV_PVT, NAV_PVT_LENGTH, UBX_SYNC, UbxIndex, ubx_checksum
+
+CAPTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "test_data_captures", "capture_data", "V2X_Test_041525_SPaT_MAP_Grn_499.pcap")
+
+
+def ubx_frame(msg_class, msg_id, payload=b""):
+    body = struct.pack("<BBH", msg_class, msg_id, len(payload)) + payload
+    return UBX_SYNC + body + ubx_checksum(body)
+
+
+def nav_pvt(itow_ms):
+    return ubx_frame(*NAV_PVT, struct.pack("<I", itow_ms) + bytes(NAV_PVT_LENGTH - 4))
+
+
+@pytest.fixture
+def pcap_copy(tmp_path):
+    path = str(tmp_path / "capture.pcap")
+    shutil.copy(CAPTURE, path)
+    return path
+
+
+def test_ubx_polls_and_short_frames_are_not_fixes(tmp_path):
+    path = str(tmp_path / "drive.ubx")
+    with open(path, "wb") as f:
+        f.write(nav_pvt(1000) + ubx_frame(*NAV_PVT) + b"$GPGGA,junk*00\r\n"
+                + ubx_frame(*NAV_PVT, struct.pack("<I", 1100) + bytes(8)) + nav_pvt(1200))
+
+    index = CaptureIndex.build(path)
+    rows = index.select(kind=NAV_PVT_KIND)
+    assert len(rows) == 2
+    np.testing.assert_allclose(index.times[rows], [1.0, 1.2])
+    assert UbxIndex(path, index.offsets[rows]).offsets.tolist() == UbxIndex(path).offsets.tolist()
+
+
+def test_sidecar_reused_until_the_capture_changes(pcap_copy):
+    built = CaptureIndex.for_capture(pcap_copy)
+    assert os.path.exists(CaptureIndex.sidecar_path(pcap_copy))
+    assert len(CaptureIndex.load(pcap_copy)) == len(built)
+
+    with open(pcap_copy, "ab") as f:
+        f.write(b"\x00")
+    assert CaptureIndex.load(pcap_copy) is None
+
+
+def test_pcap_rows_match_the_stream(pcap_copy):
+    index = CaptureIndex.build(pcap_copy)
+    spat = sum(kind == "spat" for _, kind, _ in read_j2735_frames(pcap_copy))
+    assert len(index.select(kind=J2735.MSG_SPAT)) == spat
+    assert len(index.select(kind=J2735.MSG_SPAT, key=1002)) == spat
+    assert len(index.select(kind=J2735.MSG_SPAT, key=9999)) == 0
+
+
+@pytest.mark.parametrize("message_type, expected", [("SPaT ", {"SPAT_byte"}), ("spats", {"MAP_byte", "SPAT_byte"})])
+def test_pcap_example_message_type(pcap_copy, message_type, expected):
+    ReplayHarness.install_rtmaps_shim()
+    player = ReplayHarness.load_component("pcap_example.py", {"pcap_file": pcap_copy, "speed": 0.0,
+                                                              "message_type": message_type})
+    player.Birth()
+    for _ in range(20):
+        player.Core()
+    player.Death()
+
+    written = {name for name, output in player.outputs.items() if output.count and name != "pcap_out"}
+    assert written == expected
@@ -0,0 +1,79 @@
+import pytest
+
+from CoreProfiler import CORE_STATS_FIELDS, CoreProfiler, LatencyHistogram, profiled_core
+
+
+def test_histogram_small_values_are_exact():
+    histogram = LatencyHistogram()
+    for value in range(1, 11):
+        histogram.record(value)
+    assert histogram.percentiles([10, 50, 100]) == [1, 5, 10]
+    assert histogram.mean_ns == 5.5
+
+
+@pytest.mark.parametrize("value", [64, 1000, 123456, 7654321, 2 ** 35])
+def test_histogram_bucket_error(value):
+    histogram = LatencyHistogram()
+    histogram.record(value)
+    histogram.record(value * 2)
+    assert histogram.percentiles([50])[0] == pytest.approx(value, rel=1 / 32)
+    p100, = histogram.percentiles([100])
+    assert p100 == pytest.approx(value * 2, rel=1 / 32) and p100 <= histogram.max_ns
+
+
+def test_histogram_empty_and_max():
+    histogram = LatencyHistogram()
+    assert histogram.percentiles([50, 99]) == [0, 0]
+    histogram.record(10 ** 12)  # Past the last bucket (about 68 s)
+    assert histogram.counts[-1] == 1
+    assert histogram.percentiles([99])[0] == histogram.bucket_value(len(histogram.counts) - 1)
+    assert histogram.max_ns == 10 ** 12
+
+
+class Output:
+    def __init__(self):
+        self.data = []
+
+    def write(self, value):
+        self.data.append(value)
+
+
+class Component:
+    def __init__(self, enabled):
+        self.profiler = CoreProfiler("test", enabled, budget_ms=0.0)
+        self.outputs = {"core_latency_us": Output(), "core_stats": Output()}
+        self.skip = False
+
+    @profiled_core
+    def Core(self):
+        if self.skip:
+            return self.profiler.early_return("skipped")
+        self.profiler.count("recomputes")
+        return 42
+
+
+def test_enabled_profiler_counts_and_publishes():
+    component = Component(enabled=True)
+    assert component.Core() == 42
+    component.skip = True
+    component.Core()
+
+    counters = component.profiler.counters
+    assert (counters["calls"], counters["over_budget"], counters["recomputes"]) == (2, 2, 1)
+    assert (counters["early_returns"], counters["early_return:skipped"]) == (1, 1)
+    assert len(component.outputs["core_latency_us"].data) == 2
+    stats, = component.outputs["core_stats"].data  # At most once per publish_interval
+    assert len(stats) == len(CORE_STATS_FIELDS)
+    assert stats[CORE_STATS_FIELDS.index("calls")] == 1
+    assert "early_return:skipped: 1" in component.profiler.summary()
+
+
+def test_disabled_profiler_records_nothing():
+    component = Component(enabled=False)
+    assert component.Core() == 42
+    component.skip = True
+    component.Core()
+    assert not component.profiler.counters
+    assert component.profiler.histogram.total == 0
+    assert component.outputs["core_latency_us"].data == []
+    assert component.profiler.summary() == "[test] Core() profiling disabled"
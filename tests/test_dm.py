@@ -0,0 +1,63 @@
+import pytest
+
+import ReplayHarness
+
+DT = 0.1  # s
+
+
+@pytest.fixture(params=[False, True], ids=["drift", "receding_horizon"])
+def dm(request, tmp_path):
+    ReplayHarness.install_rtmaps_shim()
+    component = ReplayHarness.load_component("DM.py", {"profile_dir": str(tmp_path), "profile_core": True,
+                                                       "receding_horizon": request.param})
+    component.Birth()
+    yield component
+    component.Death()
+
+
+def tick(dm, t, d_0, v_c, green=(30.0, 60.0)):
+    t_us = int(round(t * 1e6))
+    for name, value in (("d_0", d_0), ("v_c", v_c), ("t_0", t_us),
+                        ("g_e_curr", -1.0), ("g_s_next", green[0] - t), ("g_e_next", green[1] - t)):
+        ReplayHarness.set_input(dm, name, value, t_us)
+    dm.Core()
+    return ReplayHarness.read_output(dm, "v_t_kmh")
+
+
+def test_start_from_standstill(dm):
+    # Stopped for 2 s, 150 m before the stop-bar, then pulling away at 2 m/s² up to 40 km/h
+    d_0, v_c = 150.0, 0.0
+    outputs = []
+    for i in range(80):
+        t = i * DT
+        if t >= 2.0:
+            v_c = min(v_c + 2.0 * 3.6 * DT, 40.0)
+        outputs.append(tick(dm, t, d_0, v_c))
+        d_0 -= v_c / 3.6 * DT
+
+    assert outputs[:20] == [None] * 20  # No profile while stopped
+    assert dm.profiler.counters["early_return:no_profile"] == 20
+    assert all(v is not None and 0.0 < v <= 56.33 for v in outputs[20:])
+    assert dm.profiler.counters["recomputes"] >= 1
+
+
+@pytest.mark.parametrize("v_c", [12.87, 56.33])
+def test_singular_speeds(dm, v_c):
+    # Cruising exactly at the coasting speed or the speed limit, with a green at the cruise arrival
+    t_arr = 100.0 / (v_c / 3.6)
+    assert tick(dm, 0.0, 100.0, v_c, green=(t_arr - 5.0, t_arr + 20.0)) == pytest.approx(v_c)
+
+
+@pytest.mark.parametrize("use_lookup_table", [True, False], ids=["table", "closed_form"])
+@pytest.mark.parametrize("v_c, expected", [(0.0, "Scenario 2"), (12.87, "Scenario 1"), (56.33, "Scenario 3"),
+                                           (60.0, "Invalid Speed")])
+def test_dmsi_speed_range(tmp_path, use_lookup_table, v_c, expected):
+    ReplayHarness.install_rtmaps_shim()
+    dmsi = ReplayHarness.load_component("DMSI.py", {"use_lookup_table": use_lookup_table,
+                                                    "lookup_table_file": str(tmp_path / "table.npz")})
+    dmsi.Birth()
+    for name, value in (("d_0", 150.0), ("v_c_in", v_c), ("t_0", 0), ("g_e_curr", -1.0), ("g_s_next", 20.0),
+                        ("g_e_next", 50.0)):
+        ReplayHarness.set_input(dmsi, name, value, 0)
+    dmsi.Core()
+    assert ReplayHarness.read_output(dmsi, "scenario") == expected
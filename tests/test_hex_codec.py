@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import ReplayHarness
+from HexCodec import EMPTY_HEX, DebugPrinter, bytes_to_hex, hex_to_bytes
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("0012 80d2\n38", [0x00, 0x12, 0x80, 0xd2, 0x38]),
+    ("ABcd", [0xab, 0xcd]),
+    ("", []),
+    ("abc", []),   # Odd length
+    ("zz", []),
+    (None, []),
+])
+def test_hex_to_bytes(text, expected):
+    data = hex_to_bytes(text)
+    assert data.dtype == np.uint8
+    assert data.tolist() == expected
+
+
+def test_bytes_to_hex():
+    assert bytes_to_hex(np.array([0, 18, 255], dtype=np.uint8)) == "0012ff"
+    assert bytes_to_hex(b"\x80\xd2") == "80d2"
+    assert bytes_to_hex([1, 2]) == "0102"
+    assert bytes_to_hex(None) == bytes_to_hex([]) == EMPTY_HEX
+    assert bytes_to_hex(hex_to_bytes("0012 80d2")) == "001280d2"
+
+
+class FailingPrinter(DebugPrinter):
+    def __call__(self, message):
+        raise AssertionError("debug message built while debug_print is off")
+
+
+@pytest.mark.parametrize("input_index, name", [(0, "MAP"), (1, "SPAT"), (2, "BSM")])
+def test_md_viewer_skips_disabled_debug_output(input_index, name):
+    ReplayHarness.install_rtmaps_shim()
+    viewer = ReplayHarness.load_component("MD_viewer.py", {"profile_core": True})
+    viewer.Birth()
+    viewer.debug = FailingPrinter(enabled=False)
+
+    viewer.input_that_answered = input_index
+    ReplayHarness.set_input(viewer, f"{name}_i", np.array([0x00, 0x12], dtype=np.uint8))
+    viewer.Core()
+
+    assert ReplayHarness.read_output(viewer, f"{name}_o") == "0012"
+    assert viewer.profiler.counters["errors"] == 0
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+import J2735
+from PcapReader import read_j2735_frames
+
+CAPTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "test_data_captures", "capture_data", "V2X_Test_041525_SPaT_MAP_Grn_499.pcap")
+
+
+@pytest.fixture(scope="module")
+def frames():
+    first = {}
+    for _, kind, frame in read_j2735_frames(CAPTURE):
+        first.setdefault(kind, frame)
+    return first
+
+
+def test_decode_map(frames):
+    msg_id, value = J2735.decode_message_frame(frames["map"])
+    assert msg_id == J2735.MSG_MAP
+
+    intersection, = J2735.decode_map(value).intersections
+    assert intersection.id == 1002
+    assert (intersection.ref_lat, intersection.ref_lon) == pytest.approx((33.975691, -117.3399063))
+    ingress, egress = intersection.lanes
+    assert (ingress.lane_id, ingress.directional_use, ingress.name) == (1, 10.0, "Wb1")
+    assert egress.directional_use == 1.0
+    assert ingress.nodes.shape == (4, 2)
+    assert ingress.nodes[0] == pytest.approx((-117.3396957, 33.9757438))  # Stop-bar first
+    assert [c.signal_group for c in ingress.connections] == [1]
+
+
+def test_decode_spat(frames):
+    msg_id, value = J2735.decode_message_frame(frames["spat"])
+    assert msg_id == J2735.MSG_SPAT
+
+    intersection, = J2735.decode_spat(value).intersections
+    assert (intersection.id, intersection.moy) == (1002, 275585)
+    movement, = intersection.states
+    event, = movement.events
+    assert movement.signal_group == 1
+    assert J2735.MOVEMENT_PHASE_STATES[event.state] == "protected-Movement-Allowed"
+    assert (event.min_end_time, event.max_end_time, event.likely_time) == (499, 499, 499)
+    assert intersection.timestamp is None  # Optional field not sent
+
+
+@pytest.mark.parametrize("kind", ["map", "spat"])
+def test_truncated_message_raises_decode_error(frames, kind):
+    _, value = J2735.decode_message_frame(frames[kind])
+    decode = J2735.decode_map if kind == "map" else J2735.decode_spat
+    with pytest.raises(J2735.DecodeError):
+        decode(value[:len(value) // 2])
+
+
+def test_bit_reader_primitives():
+    r = J2735.BitReader(bytes([0b10110011, 0b01000001, 0x81, 0x02]))
+    assert r.bit() is True
+    assert r.bits(3) == 0b011
+    assert r.constrained(10, 25) == 10 + 0b0011  # 4 bits, across the byte boundary
+    assert r.optional_bits(3) == [False, True, False]
+    r.align()
+    assert r.length() == 0x102  # Two-octet form
+    with pytest.raises(J2735.DecodeError):
+        r.bits(1)
+
+    with pytest.raises(J2735.DecodeError):
+        J2735.BitReader(bytes([0xC0])).length()  # Fragmented
+
+
+def test_time_mark_remaining():
+    # 12:34.5 past the hour, TimeMark at 13:00.0
+    assert J2735.time_mark_remaining(7800, 12, 34500) == pytest.approx(25.5)
+    # Wraps at the top of the hour
+    assert J2735.time_mark_remaining(10, 59, 59000) == pytest.approx(2.0)
+    assert J2735.time_mark_remaining(J2735.TIME_MARK_UNKNOWN, 34, 34500) is None
+    assert J2735.time_mark_remaining(7800, None, 34500) is None
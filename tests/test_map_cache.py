@@ -0,0 +1,94 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import ReplayHarness
+from MapCache import MapCache
+from PcapReader import read_j2735_frames
+
+CAPTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "test_data_captures", "capture_data", "V2X_Test_041525_SPaT_MAP.pcap")
+
+
+def intersection(offset=0.0):
+    return {
+        "refPoint": {"lat": 339757438, "lon": -1173396957},
+        "lanes": [{"lane_id": 1.0, "directionalUse": 10,
+                   "nodes": {"node_count": 2, "node_list": [(-117.33, 33.97 + offset), (-117.32, 33.97)]}}],
+    }
+
+
+def test_update_detects_changed_content():
+    cache = MapCache()
+    assert cache.update(1002.0, intersection(), revision=3)
+    assert not cache.update(1002.0, intersection(), revision=3)
+    assert cache.update(1002.0, intersection(1e-4), revision=3)
+    assert cache.is_current_revision(1002.0, 3)
+    assert not cache.is_current_revision(1002.0, None)
+    assert cache.current_hash(1003.0) is None
+
+
+def test_persisted_and_reloaded(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = MapCache(path)
+    cache.update(1002.0, intersection(), revision=3)
+    cache.close()
+
+    reloaded = MapCache(path)
+    reloaded.close()
+    assert reloaded.is_current_revision(1002.0, 3)
+    assert dict(reloaded.items())[1002.0] == intersection()  # Node tuples restored
+
+
+def test_save_does_not_wait_for_the_file(tmp_path):
+    release = threading.Event()
+
+    class SlowCache(MapCache):
+        def write(self, data):
+            release.wait(5.0)
+            super().write(data)
+
+    path = str(tmp_path / "cache.json")
+    cache = SlowCache(path)
+    cache.update(1002.0, intersection())
+    cache.update(1003.0, intersection())  # Replaces the first snapshot if it was not picked up yet
+    assert not os.path.exists(path)
+
+    release.set()
+    cache.close()
+    assert sorted(dict(MapCache(path).items())) == [1002.0, 1003.0]
+
+
+@pytest.fixture
+def map_matcher():
+    ReplayHarness.install_rtmaps_shim()
+    component = ReplayHarness.load_component("MapMatcher v2.py", {"map_cache_file": "", "profile_core": True})
+    component.Birth()
+    return component
+
+
+def feed_map(component, frame, ts):
+    ReplayHarness.set_input(component, "MAP_byte", np.frombuffer(frame, dtype=np.uint8), ts)
+    component.update_map_from_frame()
+
+
+def test_alternating_rsus_are_not_decoded_again(map_matcher):
+    frame = next(bytes(f) for _, kind, f in read_j2735_frames(CAPTURE) if kind == "map")
+    other_rsu = frame + b"\x00"  # Same MAP, different bytes
+    for ts in range(10):
+        feed_map(map_matcher, frame if ts % 2 else other_rsu, ts)
+
+    counters = map_matcher.profiler.counters
+    assert (counters["map_decoded"], counters["map_repeated"]) == (2, 8)
+    assert list(map_matcher.intersections) == [1002.0]
+
+
+def test_frame_decoded_again_when_its_intersection_changed(map_matcher):
+    frame = next(bytes(f) for _, kind, f in read_j2735_frames(CAPTURE) if kind == "map")
+    feed_map(map_matcher, frame, 1)
+    map_matcher.map_cache.entries[1002.0]["hash"] = "changed by another MAP"
+    feed_map(map_matcher, frame, 2)
+
+    assert map_matcher.profiler.counters["map_decoded"] == 2
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from MapGeometry import INGRESS, Lane, LaneIndex, LocalFrame
+
+REF_LON, REF_LAT = -83.7, 42.3
+
+
+@pytest.fixture
+def frame():
+    return LocalFrame(REF_LON, REF_LAT)
+
+
+@pytest.fixture
+def lane(frame):
+    # Stop-bar at the reference point, nodes 50 m then 100 m north: traffic drives south
+    nodes = [frame.to_global(0.0, 0.0), frame.to_global(0.0, 50.0), frame.to_global(0.0, 100.0)]
+    return Lane(1002, 1, INGRESS, nodes, frame, signal_groups=(2,))
+
+
+def test_local_frame_round_trip(frame):
+    east, north = frame.to_local(REF_LON + 0.001, REF_LAT + 0.001)
+    assert north == pytest.approx(111.32)
+    assert 0 < east < north
+    assert frame.to_global(east, north) == pytest.approx((REF_LON + 0.001, REF_LAT + 0.001))
+    assert LocalFrame.from_ref_point({"lon": REF_LON * 1e7, "lat": REF_LAT * 1e7}).ref_lat == pytest.approx(REF_LAT)
+
+
+def test_lane_geometry(lane):
+    np.testing.assert_allclose(lane.seg_lengths, [50.0, 50.0])
+    np.testing.assert_allclose(lane.seg_headings, [180.0, 180.0])
+    assert lane.project(3.0, 70.0) == pytest.approx((70.0, 3.0))
+    assert lane.project(0.0, -20.0) == pytest.approx((0.0, 20.0))  # Past the stop-bar clamps to it
+    np.testing.assert_allclose(lane.point_at(75.0), [0.0, 75.0], atol=1e-9)
+    np.testing.assert_allclose(lane.point_at(500.0), [0.0, 100.0], atol=1e-9)
+
+
+def test_zero_length_segment_has_no_heading(frame):
+    nodes = [frame.to_global(0.0, 0.0), frame.to_global(0.0, 0.0), frame.to_global(0.0, 30.0)]
+    lane = Lane(1002, 1, INGRESS, nodes, frame)
+    assert np.isnan(lane.seg_headings[0])
+    assert lane.project(0.0, 10.0) == pytest.approx((10.0, 0.0))
+    np.testing.assert_allclose(lane.point_at(0.0), [0.0, 0.0], atol=1e-9)
+
+
+def intersection(frame, *lanes):
+    return {"refPoint": {"lon": REF_LON * 1e7, "lat": REF_LAT * 1e7},
+            "lanes": [{"lane_id": lane_id, "directionalUse": use, "nodes": {"node_list": nodes}}
+                      for lane_id, use, nodes in lanes]}
+
+
+def test_lane_index(frame):
+    north = [frame.to_global(0.0, 0.0), frame.to_global(0.0, 100.0)]
+    index = LaneIndex()
+    index.set_intersection(1002, intersection(frame, (1, INGRESS, north), (2, 20.0, north), (3, INGRESS, north[:1])))
+    assert len(index) == 1  # Egress and single-node lanes are not matched
+
+    assert [lane.lane_id for lane in index.candidates(*frame.to_global(20.0, 50.0))] == [1]
+    assert index.candidates(*frame.to_global(0.0, 2000.0)) == ()
+
+    index.remove_intersection(1002)
+    assert len(index) == 0
+    assert index.candidates(*frame.to_global(20.0, 50.0)) == ()
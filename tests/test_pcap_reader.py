@@ -0,0 +1,76 @@
+import struct
+
+import pytest
+
+from PcapReader import (LINKTYPE_ETHERNET, PCAP_HEADER_SIZE, extract_j2735_frame, is_pcap, read_j2735_frames,
+                        read_pcap_records, read_pcap_records_at)
+
+SPAT_FRAME = bytes.fromhex("00138080")
+MAP_FRAME = bytes.fromhex("00128080")
+
+
+def udp_packet(payload, protocol=17, vlan=False):
+    ether = bytes(12) + (b"\x81\x00\x00\x01" if vlan else b"") + b"\x08\x00"
+    ip = bytes([0x45]) + bytes(8) + bytes([protocol]) + bytes(10)
+    return ether + ip + bytes(8) + payload
+
+
+def unsecured(frame):
+    return bytes([0x03, 0x80, len(frame)]) + frame
+
+
+def write_pcap(path, records, endian="<", nanoseconds=False):
+    magic = 0xA1B23C4D if nanoseconds else 0xA1B2C3D4
+    with open(path, "wb") as f:
+        f.write(struct.pack(endian + "IHHiIII", magic, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+        for ts_sec, ts_frac, packet in records:
+            f.write(struct.pack(endian + "IIII", ts_sec, ts_frac, len(packet), len(packet)) + packet)
+    return str(path)
+
+
+@pytest.mark.parametrize("endian", ["<", ">"])
+@pytest.mark.parametrize("nanoseconds, frac", [(False, 500000), (True, 500000000)])
+def test_read_pcap_records(tmp_path, endian, nanoseconds, frac):
+    packets = [udp_packet(SPAT_FRAME), udp_packet(MAP_FRAME)]
+    path = write_pcap(tmp_path / "capture.pcap", [(100, 0, packets[0]), (101, frac, packets[1])], endian, nanoseconds)
+
+    assert is_pcap(path)
+    records = list(read_pcap_records(path))
+    assert [(ts, link_type, bytes(packet)) for ts, link_type, packet in records] == [
+        (100.0, LINKTYPE_ETHERNET, packets[0]), (101.5, LINKTYPE_ETHERNET, packets[1])]
+
+    second = PCAP_HEADER_SIZE + 16 + len(packets[0])
+    assert [bytes(packet) for _, _, packet in read_pcap_records_at(path, [second, PCAP_HEADER_SIZE])] == packets[::-1]
+
+
+def test_truncated_last_record_is_ignored(tmp_path):
+    path = write_pcap(tmp_path / "capture.pcap", [(100, 0, udp_packet(SPAT_FRAME)), (101, 0, udp_packet(MAP_FRAME))])
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 3)
+    assert len(list(read_pcap_records(path))) == 1
+
+
+def test_not_a_pcap(tmp_path):
+    path = tmp_path / "capture.ubx"
+    path.write_bytes(b"\xb5\x62" + bytes(30))
+    assert not is_pcap(str(path))
+    with pytest.raises(ValueError):
+        list(read_pcap_records(str(path)))
+
+
+@pytest.mark.parametrize("packet, expected", [
+    (udp_packet(SPAT_FRAME), (19, SPAT_FRAME)),
+    (udp_packet(unsecured(MAP_FRAME), vlan=True), (18, MAP_FRAME)),
+    (udp_packet(SPAT_FRAME, protocol=6), None),  # TCP
+    (udp_packet(b"\x00\x13"), None),
+    (bytes(10), None),
+])
+def test_extract_j2735_frame(packet, expected):
+    assert extract_j2735_frame(packet) == expected
+
+
+def test_read_j2735_frames(tmp_path):
+    records = [(100, 0, udp_packet(b"junk", protocol=6)), (100, 250000, udp_packet(MAP_FRAME)),
+               (101, 0, udp_packet(unsecured(SPAT_FRAME)))]
+    path = write_pcap(tmp_path / "capture.pcap", records)
+    assert list(read_j2735_frames(path)) == [(0.0, "map", MAP_FRAME), (0.75, "spat", SPAT_FRAME)]
@@ -0,0 +1,62 @@
+import os
+import resource
+
+import numpy as np
+import pytest
+
+import ProfileLog
+
+PROFILE = np.column_stack((np.arange(0.0, 2.0, 0.1), np.linspace(40.0, 20.0, 20)))
+
+
+def write(directory, name, t_start=0.0, profile=PROFILE):
+    path = os.path.join(directory, name + ProfileLog.PROFILE_EXTENSION)
+    ProfileLog.write_profile(path, profile, 2, t_start, -1, 20.0, 50.0, 40.0)
+    return path
+
+
+def test_round_trip(tmp_path):
+    record = ProfileLog.read_profile(write(str(tmp_path), "a", 12.5))
+
+    assert (record.scenario_n, record.t_start, record.g_e_curr, record.g_s_next, record.g_e_next, record.v_c) == \
+        (2, 12.5, -1.0, 20.0, 50.0, 40.0)
+    np.testing.assert_array_equal(record.time, PROFILE[:, 0])
+    np.testing.assert_array_equal(record.velocity_kmh, PROFILE[:, 1].astype(np.float32))
+
+
+def test_read_profile_dir_orders_by_start_time(tmp_path):
+    for name, t_start in (("b", 30.0), ("a", 10.0), ("c", 20.0)):
+        write(str(tmp_path), name, t_start)
+    (tmp_path / "notes.txt").write_text("not a profile")
+
+    assert [r.t_start for r in ProfileLog.read_profile_dir(str(tmp_path))] == [10.0, 20.0, 30.0]
+
+
+def test_read_profile_dir_keeps_no_file_open(tmp_path):
+    n = 300
+    for i in range(n):
+        write(str(tmp_path), f"p{i}", float(i))
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(128, hard), hard))
+    try:
+        records = ProfileLog.read_profile_dir(str(tmp_path))
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    assert len(records) == n
+    assert records[-1].velocity_kmh[-1] == np.float32(20.0)
+
+
+def test_rejects_bad_files(tmp_path):
+    not_a_profile = tmp_path / "x.vprof"
+    not_a_profile.write_bytes(b"JSON" + bytes(ProfileLog.PROFILE_HEADER.itemsize))
+    with pytest.raises(ValueError, match="not a velocity profile"):
+        ProfileLog.read_profile(str(not_a_profile))
+
+    path = write(str(tmp_path), "truncated")
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 4)
+    for mmap in (True, False):
+        with pytest.raises(ValueError, match="truncated"):
+            ProfileLog.read_profile(path, mmap=mmap)
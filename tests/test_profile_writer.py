@@ -0,0 +1,60 @@
+import glob
+import os
+
+import numpy as np
+
+import ProfileLog
+import TrajectoryCore
+from ProfileWriter import ProfileWriter
+
+PROFILE = np.column_stack((np.arange(0.0, 3.0, 0.1), np.full(30, 40.0)))
+
+
+def profile_files(directory):
+    return glob.glob(os.path.join(directory, "*" + ProfileLog.PROFILE_EXTENSION))
+
+
+def test_writes_arrays_and_velocity_profiles(tmp_path):
+    writer = ProfileWriter(str(tmp_path))
+    writer.submit(PROFILE, "Scenario 1", 0.0, -1, 20.0, 50.0, 40.0)
+    plan = TrajectoryCore.plan_velocity_profile(100.0, 150.0, 40.0, -1, 20.0, 50.0)
+    writer.submit(TrajectoryCore.VelocityProfile(plan), plan.scenario, 100.0, -1, 20.0, 50.0, 40.0)
+    writer.close()
+
+    assert (writer.written, writer.failed) == (2, 0)
+    records = ProfileLog.read_profile_dir(str(tmp_path))
+    assert [r.scenario_n for r in records] == [1, plan.scenario_n]
+    assert records[1].time[0] == 100.0
+
+
+def test_bad_profile_does_not_stop_the_worker(tmp_path):
+    writer = ProfileWriter(str(tmp_path))
+    writer.submit("not a profile", "Scenario 1", 0.0, -1, 20.0, 50.0, 40.0)
+    writer.submit(PROFILE, "Scenario 1", 1.0, -1, 20.0, 50.0, 40.0)
+    writer.close()
+
+    assert (writer.written, writer.failed) == (1, 1)
+    assert len(profile_files(str(tmp_path))) == 1
+
+
+def test_uncreatable_folder_counts_failures(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    writer = ProfileWriter(str(blocker / "profiles"))
+    for t in range(3):
+        writer.submit(PROFILE, "Scenario 1", float(t), -1, 20.0, 50.0, 40.0)
+    writer.close()
+
+    assert not writer.thread.is_alive()
+    assert (writer.written, writer.failed) == (0, 3)
+
+
+def test_full_queue_drops_the_oldest_profile(tmp_path):
+    writer = ProfileWriter(str(tmp_path), max_pending=1)
+    writer.queue.put(None)  # Stop the worker so the queue stays full
+    writer.thread.join()
+
+    assert writer.submit(PROFILE, "Scenario 1", 0.0, -1, 20.0, 50.0, 40.0)
+    assert not writer.submit(PROFILE, "Scenario 1", 1.0, -1, 20.0, 50.0, 40.0)
+    assert writer.dropped == 1
+    assert writer.queue.get_nowait()[2] == 1.0
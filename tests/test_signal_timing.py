@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+import ReplayHarness
+from SignalTiming import SignalTimingEstimator, TickStats
+
+GREEN, RED = 6.0, 3.0
+
+
+def test_tracker_for_single_signal_group():
+    timing = SignalTimingEstimator()
+    timing.update(1002.0, 2.0, 10.0, GREEN, 250)
+
+    assert timing.tracker_for(1002.0) is timing.tracker_for(1002.0, 2.0)
+    assert timing.tracker_for(1002.0).green_windows(10.0, 1) == [(0.0, 25.0)]
+    assert timing.tracker_for(1003.0) is None
+
+
+def test_tracker_for_needs_the_group_when_several_are_broadcast():
+    timing = SignalTimingEstimator()
+    timing.update(1002.0, 2.0, 10.0, GREEN, 250)
+    timing.update(1002.0, 4.0, 10.0, RED, 300)
+
+    assert timing.tracker_for(1002.0) is None
+    assert timing.tracker_for(1002.0, 4.0).phase == "red"
+    assert timing.signal_groups(1002.0) == [2.0, 4.0]
+
+
+def test_samples_without_signal_group_serve_the_matched_group():
+    timing = SignalTimingEstimator()
+    timing.update(62607.0, None, 10.0, GREEN, 250)
+
+    assert timing.tracker_for(62607.0, 2.0) is timing.tracker_for(62607.0)
+    assert timing.tracker_for(62607.0, 2.0).green_windows(10.0, 1) == [(0.0, 25.0)]
+    assert timing.signal_groups(62607.0) == [None]
+
+    # Once real groups are heard, an unknown group no longer stands in for them
+    timing.update(62607.0, 4.0, 10.0, RED, 300)
+    assert timing.tracker_for(62607.0, 2.0) is None
+    assert timing.signal_groups(62607.0) == [None, 4.0]
+
+
+@pytest.fixture
+def gwe():
+    ReplayHarness.install_rtmaps_shim()
+    component = ReplayHarness.load_component("GreenWindowEstimator.py", {"timing_model_file": "", "profile_core": True})
+    component.Birth()
+    return component
+
+
+def feed_spat(gwe, t_us, signal_group, state, countdown):
+    for name, value in (("t0", t_us), ("IntersectionID_SPaT", 1002.0), ("SignalGroup_SPaT", signal_group),
+                        ("current_state", state), ("countdown", countdown)):
+        ReplayHarness.set_input(gwe, name, value, t_us)
+    gwe.Core()
+
+
+def test_gwe_without_matched_signal_group(gwe):
+    ReplayHarness.set_input(gwe, "Intersection_ID_matched", 1002.0)
+    feed_spat(gwe, 1000000, 2.0, "protected-Movement-Allowed", 250)
+    assert ReplayHarness.read_output(gwe, "g_e_curr") == 25.0
+
+    # A second movement makes the intersection ambiguous: no window rather than whichever group came last
+    gwe.outputs["g_e_curr"].ioelt = None
+    for t_us in (1100000, 1200000):
+        feed_spat(gwe, t_us, 4.0, "stop-And-Remain", 300)
+        feed_spat(gwe, t_us, 2.0, "protected-Movement-Allowed", 250)
+    assert ReplayHarness.read_output(gwe, "g_e_curr") is None
+    assert gwe.profiler.counters["early_return:no_signal_group"] == 4
+    assert gwe.ambiguous_intersections == {1002.0}
+
+    ReplayHarness.set_input(gwe, "SignalGroup_matched", 4.0)
+    feed_spat(gwe, 1300000, 4.0, "stop-And-Remain", 300)
+    assert ReplayHarness.read_output(gwe, "g_e_curr") == -1.0
+
+
+def test_tick_stats_ring_buffer_wraps():
+    ticks = TickStats(size=4)
+    for interval in (0.1, 0.1, 0.1, 0.1, 0.12, 0.12):
+        assert ticks.add(interval)
+    assert len(ticks) == 4
+    assert ticks.mean() == pytest.approx(np.mean([0.1, 0.1, 0.12, 0.12]))
+    assert ticks.std() == pytest.approx(np.std([0.1, 0.1, 0.12, 0.12]))
+
+
+def test_tick_stats_rejects_outliers():
+    ticks = TickStats(size=10)
+    for _ in range(5):
+        ticks.add(0.1)
+    assert not ticks.add(0.2)  # A missed SPaT message
+    assert not ticks.add(0.0)
+    assert ticks.rejected == 2
+    assert ticks.add(0.105)
+    assert ticks.mean() == pytest.approx(0.605 / 6)
+
+
+def test_tick_stats_restarts_after_a_rate_change():
+    ticks = TickStats(size=10)
+    for _ in range(10):
+        ticks.add(0.1)
+    accepted = [ticks.add(1.0) for _ in range(5)]
+    assert accepted == [False] * 4 + [True]
+    assert len(ticks) == 1 and ticks.mean() == 1.0
+    assert np.isnan(ticks.std())
+
+
+def test_gwe_legacy_spat_fields_with_matched_signal_group(gwe):
+    # MapMatcher gives the lane's signal group from the MAP; the SPaT arrives on the per-field inputs
+    # without SignalGroup_SPaT
+    ReplayHarness.set_input(gwe, "Intersection_ID_matched", 1002.0)
+    ReplayHarness.set_input(gwe, "SignalGroup_matched", 2.0)
+    for name, value in (("t0", 1000000), ("IntersectionID_SPaT", 1002.0), ("current_state", "protected-Movement-Allowed"),
+                        ("countdown", 250)):
+        ReplayHarness.set_input(gwe, name, value, 1000000)
+    gwe.Core()
+
+    assert ReplayHarness.read_output(gwe, "g_e_curr") == 25.0
+    assert gwe.profiler.counters["early_returns"] == 0
@@ -0,0 +1,35 @@
+from StreamMerge import StreamMerger, merge_streams
+
+
+def test_merge_with_offsets():
+    merger = StreamMerger()
+    merger.add("gps", [(0.0, "gps", 1), (1.0, "gps", 2), (2.0, "gps", 3)])
+    merger.add("v2x", [(1.0, "spat", "a"), (2.0, "spat", "b")], offset=-0.5)
+    assert list(merger) == [(0.0, "gps", 1), (0.5, "spat", "a"), (1.0, "gps", 2), (1.5, "spat", "b"),
+                            (2.0, "gps", 3)]
+
+
+def test_ties_keep_stream_order():
+    events = list(merge_streams([(1.0, "b", 0)], [(1.0, "a", 0), (1.0, "a", 1)], [(0.0, "c", {})]))
+    assert events == [(0.0, "c", {}), (1.0, "b", 0), (1.0, "a", 0), (1.0, "a", 1)]
+
+
+def test_late_events_are_held_at_the_stream_time():
+    merger = StreamMerger().add("v2x", [(1.0, "spat", 0), (0.8, "spat", 1), (1.2, "spat", 2)])
+    merger.add("gps", [(0.9, "gps", 0)])
+    assert list(merger) == [(0.9, "gps", 0), (1.0, "spat", 0), (1.0, "spat", 1), (1.2, "spat", 2)]
+    assert merger.late == {"v2x": 1, "gps": 0}
+
+
+def test_next_event_is_pulled_after_the_previous_one_was_handled():
+    handled = []
+
+    def closed_loop():
+        for i in range(3):
+            yield i * 0.1, "gps", list(handled)
+
+    merger = StreamMerger().add("gps", closed_loop())
+    for _, _, seen in merger:
+        assert seen == handled
+        handled.append(len(handled))
+    assert handled == [0, 1, 2]
@@ -0,0 +1,8 @@
+import TrajectoryBenchmark
+
+
+def test_errors_are_not_counted_as_calls_without_a_profile():
+    results = TrajectoryBenchmark.run_benchmark(TrajectoryBenchmark.build_grid(50.0, 14.0), repeat=1)
+    profiles = results["compute_velocity_profile"]
+    assert profiles["errors"] > 0
+    assert profiles["calls"] - profiles["no_profile"] == sum(profiles["scenarios"].values())
@@ -0,0 +1,70 @@
+import math
+
+import pytest
+
+import TrajectoryCore
+from TrajectoryCore import KMH_TO_MS
+
+D_0 = 150.0
+V_C = 40.0  # km/h
+
+
+@pytest.fixture
+def ct():
+    return TrajectoryCore.critical_times(D_0, V_C * KMH_TO_MS)
+
+
+def test_gamma_intervals_are_relative_to_t_0():
+    assert TrajectoryCore.gamma_intervals(1000.0, -1, 20.0, 50.0) == ((20.0, 50.0),)
+    assert TrajectoryCore.gamma_intervals(1000.0, 5.0, 20.0, 50.0) == ((0.0, 5.0), (20.0, 50.0))
+
+
+def test_critical_times_order(ct):
+    assert ct.t_cr == pytest.approx(D_0 / (V_C * KMH_TO_MS))
+    assert ct.t_e < ct.t_cr < ct.t_l
+
+
+def test_critical_times_are_cached():
+    TrajectoryCore.critical_times.cache_clear()
+    first = TrajectoryCore.critical_times(D_0, V_C * KMH_TO_MS)
+    assert TrajectoryCore.critical_times(D_0, V_C * KMH_TO_MS) is first
+    assert TrajectoryCore.critical_times.cache_info().hits == 1
+
+
+@pytest.mark.parametrize("window, expected", [
+    (lambda ct: (ct.t_cr - 2.0, ct.t_cr + 10.0), 1),
+    (lambda ct: ((ct.t_e + ct.t_cr) / 2, ct.t_cr), 2),
+    (lambda ct: (ct.t_l + 5.0, ct.t_l + 35.0), 3),
+    (lambda ct: ((ct.t_cr + ct.t_l) / 2, ct.t_l + 30.0), 4),
+])
+def test_identify_scenario(ct, window, expected):
+    gamma = (window(ct),)
+    assert TrajectoryCore.identify_scenario(gamma, ct.t_cr, ct.t_e, ct.t_l)[1] == expected
+
+
+def test_current_green_window_counts_for_scenario_1(ct):
+    gamma = TrajectoryCore.gamma_intervals(0.0, ct.t_cr + 5.0, ct.t_cr + 35.0, ct.t_cr + 65.0)
+    assert TrajectoryCore.identify_scenario(gamma, ct.t_cr, ct.t_e, ct.t_l) == ("Scenario 1", 1)
+
+
+@pytest.mark.parametrize("v_c, t_e, t_l", [
+    (0.0, None, D_0 / TrajectoryCore.V_COAST_MS),
+    (TrajectoryCore.V_COAST, None, D_0 / TrajectoryCore.V_COAST_MS),
+    (TrajectoryCore.V_LIMIT, D_0 / TrajectoryCore.V_LIMIT_MS, None),
+])
+def test_critical_times_at_singular_speeds(v_c, t_e, t_l):
+    ct = TrajectoryCore.critical_times(D_0, v_c * KMH_TO_MS)
+    assert ct.t_cr == (D_0 / (v_c * KMH_TO_MS) if v_c else math.inf)
+    assert math.isfinite(ct.t_e) and math.isfinite(ct.t_l) and ct.t_e <= ct.t_cr
+    if t_e is not None:
+        assert ct.t_e == pytest.approx(t_e)
+    if t_l is not None:
+        assert ct.t_l == pytest.approx(t_l)
+    assert TrajectoryCore.CriticalTimeTable(step=0.05).lookup(D_0, v_c * KMH_TO_MS) == ct
+
+
+@pytest.mark.parametrize("v_c, planned", [(0.0, False), (TrajectoryCore.V_COAST, True),
+                                          (TrajectoryCore.V_LIMIT, True), (60.0, False), (-1.0, False)])
+def test_plan_velocity_profile_speed_range(v_c, planned):
+    plan = TrajectoryCore.plan_velocity_profile(0.0, D_0, v_c, -1, 20.0, 50.0)
+    assert (plan is not None) == planned
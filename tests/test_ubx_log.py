@@ -0,0 +1,67 @@
+import struct
+
+import numpy as np
+import pytest
+
+from UbxLog import ITOW_WEEK_MS, NAV_PVT, NAV_PVT_LENGTH, UBX_SYNC, UbxIndex, scan_ubx, ubx_checksum
+
+
+def ubx_frame(msg_class, msg_id, payload=b""):
+    body = struct.pack("<BBH", msg_class, msg_id, len(payload)) + payload
+    return UBX_SYNC + body + ubx_checksum(body)
+
+
+def nav_pvt(itow_ms, lat=42.3, lon=-83.7, speed_ms=10.0, heading=90.0):
+    payload = struct.pack("<I16xB2xBii28xii", itow_ms, 3, 12, round(lon * 1e7), round(lat * 1e7),
+                          round(speed_ms * 1e3), round(heading * 1e5))
+    return ubx_frame(*NAV_PVT, payload + bytes(NAV_PVT_LENGTH - len(payload)))
+
+
+def write_ubx(tmp_path, *chunks):
+    path = tmp_path / "drive.ubx"
+    path.write_bytes(b"".join(chunks))
+    return str(path)
+
+
+def test_ubx_checksum():
+    # UBX-CFG-PRT poll from the u-blox protocol description
+    assert ubx_checksum(bytes([0x06, 0x00, 0x00, 0x00])) == b"\x06\x18"
+
+
+def test_scan_resynchronizes_after_corrupt_frames():
+    good = ubx_frame(0x01, 0x02, bytes(4))
+    corrupt = bytearray(ubx_frame(0x01, 0x03, bytes(4)))
+    corrupt[-1] ^= 0xFF
+    data = b"$GPGGA,\xb5junk*00\r\n" + good + bytes(corrupt) + good + good[:5]
+
+    offset = data.find(good)
+    assert [(o, c, i, n) for o, c, i, n in scan_ubx(data)] == [
+        (offset, 0x01, 0x02, 4), (offset + 2 * len(good), 0x01, 0x02, 4)]
+
+
+def test_fix_decoding(tmp_path):
+    index = UbxIndex(write_ubx(tmp_path, nav_pvt(1000), ubx_frame(0x01, 0x02, bytes(4)), nav_pvt(1100, speed_ms=12.5)))
+    assert len(index) == 2
+    fix = index.fix(1)
+    assert fix.t == pytest.approx(0.1)
+    assert (fix.lat, fix.lon) == pytest.approx((42.3, -83.7))
+    assert fix.speed_kmh == pytest.approx(45.0)
+    assert (fix.heading, fix.fix_type, fix.num_sv) == (pytest.approx(90.0), 3, 12)
+    index.close()
+
+
+def test_seek_and_fixes(tmp_path):
+    index = UbxIndex(write_ubx(tmp_path, *(nav_pvt(1000 + 200 * i) for i in range(5))))
+    assert index.duration == pytest.approx(0.8)
+    assert index.seek(0.3) == 2
+    assert index.seek(0.4) == 2
+    assert index.seek(5.0) == len(index)
+    assert [fix.t for fix in index.fixes(start=3)] == pytest.approx([0.6, 0.8])
+    index.close()
+
+
+def test_itow_unwraps_across_gps_weeks(tmp_path):
+    itow = [ITOW_WEEK_MS - 200, ITOW_WEEK_MS - 100, 0, 100]
+    index = UbxIndex(write_ubx(tmp_path, *(nav_pvt(t) for t in itow)))
+    np.testing.assert_allclose(index.times, [0.0, 0.1, 0.2, 0.3])
+    index.close()
@@ -0,0 +1,28 @@
+import pytest
+
+import ReplayHarness
+
+
+@pytest.fixture
+def vel():
+    ReplayHarness.install_rtmaps_shim()
+    component = ReplayHarness.load_component("Vel_Generator.py", {"time_step": 0.1})
+    component.Birth()
+    yield component
+    component.Death()
+
+
+def step(vel, target):
+    ReplayHarness.set_input(vel, "feed", target)
+    vel.Core()
+    return ReplayHarness.read_output(vel, "v_c")
+
+
+def test_speed_follows_the_target_within_the_acceleration_limit(vel):
+    assert [step(vel, 50.0) for _ in range(3)] == pytest.approx([49.0, 50.0, 50.0])  # 10 km/h/s from 48 km/h
+    assert step(vel, 30.0) == pytest.approx(49.0)
+
+
+def test_dt_input_overrides_time_step(vel):
+    ReplayHarness.set_input(vel, "dt", 0.5)
+    assert step(vel, 30.0) == pytest.approx(43.0)